@@ -0,0 +1,8 @@
+"""Benchmarks dos caminhos quentes (deck, partida e servidor).
+
+Uso (a partir da raiz do repositório):
+
+    python -m benchmarks run --save benchmarks/baseline.json
+    python -m benchmarks compare benchmarks/baseline.json
+    python -m benchmarks compare benchmarks/baseline.json --against outro.json
+"""
@@ -0,0 +1,64 @@
+"""CLI dos benchmarks: `run` mede e (opcionalmente) salva; `compare` aponta regressões."""
+
+import argparse
+import json
+import sys
+from typing import Optional, Sequence
+
+from . import bench_deck, bench_game  # noqa: F401  (registram os benchmarks)
+from .core import _fmt, compare, metadata, run_all
+
+try:
+    from . import bench_server  # noqa: F401
+except ImportError as e:  # aiohttp ausente: só os benchmarks do jogo
+    print(f"skipping server benchmarks: {e}", file=sys.stderr)
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="roda os benchmarks")
+    run.add_argument("--save", help="grava os resultados (JSON) neste arquivo")
+    cmp_ = sub.add_parser("compare", help="compara com um baseline salvo")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("--against", help="resultados salvos a comparar (padrão: roda agora)")
+    cmp_.add_argument("--threshold", type=float, default=0.15, help="piora relativa tolerada (padrão 0.15 = 15%%)")
+    for p in (run, cmp_):
+        p.add_argument("-k", dest="selected", help="só benchmarks cujo nome contém este texto")
+        p.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_all(args.selected, args.repeat)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump({"meta": metadata(), "results": results}, f, indent=2, sort_keys=True)
+            print(f"saved {len(results)} results to {args.save}")
+        return 0
+
+    baseline = _load(args.baseline)["results"]
+    if args.against:
+        current = _load(args.against)["results"]
+    else:
+        current = run_all(args.selected, args.repeat)
+    if args.selected:
+        baseline = {k: v for k, v in baseline.items() if args.selected in k}
+        current = {k: v for k, v in current.items() if args.selected in k}
+    rows = compare(baseline, current, args.threshold)
+    print(f"\n{'benchmark':55s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+    for name, old, new, ratio, status in rows:
+        flag = {"regression": "  << REGRESSION", "improved": "  improved"}.get(status, f"  {status}" if status in ("new", "missing") else "")
+        shown = f"{ratio:7.2f}" if ratio else f"{'-':>7s}"
+        print(f"{name:55s} {_fmt(old) if old else '-':>10s} {_fmt(new) if new else '-':>10s} {shown}{flag}")
+    regressions = [r for r in rows if r[4] == "regression"]
+    print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Operações de `Deck` em vários tamanhos de baralho."""
+
+from game.card import CardType
+from game.catalog import CardCatalog
+from game.deck import Deck
+
+from .core import benchmark
+
+SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def catalog_of(size: int) -> CardCatalog:
+    """Catálogo sintético com `size` cartas brancas e `size` pretas."""
+    return CardCatalog.from_texts((f"branca {i}" for i in range(size)), ((f"preta {i} ____", 1) for i in range(size)))
+
+
+def _shuffled(size: int, card_type: CardType, seed: int = 1) -> Deck:
+    import random
+
+    deck = Deck.from_catalog(catalog_of(size), card_type, rng=random.Random(seed))
+    deck.shuffle()
+    return deck
+
+
+@benchmark("deck.draw", SIZES)
+def draw(n):
+    deck = _shuffled(n, CardType.WHITE)
+
+    def run():
+        for _ in range(n):
+            deck.draw_ids(1)
+    return run, n
+
+
+@benchmark("deck.draw_white", SIZES)
+def draw_white(n):
+    deck = _shuffled(n, CardType.WHITE)
+
+    def run():
+        for _ in range(n):
+            deck.draw_white_ids(1)
+    return run, n
+
+
+@benchmark("deck.draw_random_black", SIZES)
+def draw_random_black(n):
+    deck = _shuffled(n, CardType.BLACK)
+    # metade já comprada do topo: o sorteio passa a usar `take_at`
+    deck.draw_ids(n // 2)
+    count = n - n // 2
+
+    def run():
+        for _ in range(count):
+            deck.draw_random_black_id()
+    return run, count
+
+
+@benchmark("deck.reshuffle", SIZES)
+def reshuffle(n):
+    # descarte inteiro volta ao deck, é embaralhado e uma mão é comprada
+    deck = _shuffled(n, CardType.WHITE)
+    discard = deck.draw_ids(n)
+
+    def run():
+        deck.add_ids(discard)
+        deck.shuffle()
+        deck.draw_ids(7)
+    return run, 1
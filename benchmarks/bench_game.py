@@ -0,0 +1,78 @@
+"""`GameState`: início de partida, rodadas completas (com desempate) e `snapshot()`."""
+
+from game.card import CardType
+from game.deck import Deck
+from game.game_state import GameState
+from game.player import Player
+
+from .bench_deck import catalog_of
+from .core import benchmark
+
+PLAYERS = (3, 10, 50)
+ROUNDS = 50
+
+
+def new_game(players: int, hand_size: int = 7) -> GameState:
+    catalog = catalog_of(max(1_000, players * hand_size * 4))
+    return GameState(
+        [Player(f"p{i}", f"P{i}") for i in range(players)],
+        Deck.from_catalog(catalog, CardType.WHITE),
+        Deck.from_catalog(catalog, CardType.BLACK),
+        hand_size=hand_size,
+        seed=42,
+    )
+
+
+def play_round(gs: GameState) -> None:
+    """Uma rodada completa: todos submetem, um empate geral e um desempate."""
+    ids = [p.id for p in gs.players]
+    n = len(ids)
+    for pid in ids:
+        gs.submit_card(pid, 0)
+    # cada um vota no próximo: todos empatam com 1 voto
+    for i, pid in enumerate(ids):
+        gs.cast_vote(pid, ids[(i + 1) % n])
+    # desempate: todos votam em p0 (p0 vota em p1)
+    for pid in ids:
+        gs.cast_vote(pid, ids[1] if pid == ids[0] else ids[0])
+
+
+@benchmark("game.start", PLAYERS, "players")
+def start(players):
+    gs = new_game(players)
+    return gs.start, 1
+
+
+@benchmark("game.round_with_runoff", PLAYERS, "players")
+def rounds(players):
+    gs = new_game(players)
+    gs.start()
+
+    def run():
+        for _ in range(ROUNDS):
+            play_round(gs)
+    return run, ROUNDS
+
+
+@benchmark("game.snapshot.changed", PLAYERS, "players")
+def snapshot_changed(players):
+    gs = new_game(players)
+    gs.start()
+
+    def run():
+        for _ in range(1_000):
+            gs.touch()
+            gs.snapshot()
+    return run, 1_000
+
+
+@benchmark("game.snapshot.cached", PLAYERS, "players")
+def snapshot_cached(players):
+    gs = new_game(players)
+    gs.start()
+    gs.snapshot()
+
+    def run():
+        for _ in range(10_000):
+            gs.snapshot()
+    return run, 10_000
@@ -0,0 +1,150 @@
+"""`notify_room` e `handle_message` com WebSockets falsos (2 a 500 conexões).
+
+A sala tem até 10 jogadores; as demais conexões são espectadores. Requer
+aiohttp instalado (o módulo do servidor importa aiohttp).
+"""
+
+import asyncio
+import json
+
+from .bench_deck import catalog_of
+from .core import benchmark
+
+CONNS = (2, 10, 100, 500)
+MAX_PLAYERS = 10
+
+
+class FakeWebSocket:
+    """Imita a parte de `web.WebSocketResponse` usada pelo servidor."""
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.bytes = 0
+
+    async def send_str(self, data: str) -> None:
+        self.sent += 1
+        self.bytes += len(data)
+
+
+_loop = None
+
+
+def _server():
+    """Servidor limpo e um loop novo; encerra as salas (atores) do benchmark anterior."""
+    global _loop
+    from server import app as srv
+
+    if _loop is not None:
+        for room in srv.ROOMS.values():
+            room.stop()
+        for box in srv.OUTBOXES.values():
+            box.close()
+        _loop.run_until_complete(asyncio.sleep(0))
+        _loop.close()
+    _loop = asyncio.new_event_loop()
+    srv.CATALOG = catalog_of(2_000)
+    # a semente fixa (`seed` no create) deixa as mãos iguais entre execuções
+    srv.ALLOW_CLIENT_SEED = True
+    srv.ROOMS.clear()
+    srv.CONN_OPTIONS.clear()
+    srv.OUTBOXES.clear()
+    return srv, _loop
+
+
+async def _drain(srv, sockets):
+    """Espera os writers enviarem tudo o que está na fila de cada conexão."""
+    for ws in sockets:
+        await srv.drain(ws)
+
+
+def _room(srv, loop, conns: int, delta: bool = False):
+    """Sala `bench` já iniciada, com `conns` conexões (até 10 jogadores)."""
+    sockets = [FakeWebSocket() for _ in range(conns)]
+
+    async def setup():
+        first = sockets[0]
+        await srv.handle_message(first, json.dumps({"action": "create", "room": "bench", "seed": 1}))
+        room = srv.ROOMS["bench"]
+        for i, ws in enumerate(sockets):
+            if delta:
+                await srv.handle_message(ws, json.dumps({"action": "hello", "delta": True}))
+            if i < MAX_PLAYERS:
+                await srv.handle_message(ws, json.dumps({"action": "join", "room": "bench", "player_id": f"p{i}", "name": f"P{i}"}))
+            else:
+                # espectador: só recebe os broadcasts
+                room.conns.add(ws)
+        # todos prontos: a última mensagem inicia a partida automaticamente
+        for i, ws in enumerate(sockets[:MAX_PLAYERS]):
+            await srv.handle_message(ws, json.dumps({"action": "ready", "room": "bench", "player_id": f"p{i}"}))
+        assert room.game.started
+        await _drain(srv, sockets)
+        return room
+
+    return sockets, loop.run_until_complete(setup())
+
+
+def _notify(conns: int, delta: bool):
+    srv, loop = _server()
+    sockets, room = _room(srv, loop, conns, delta)
+    broadcasts = 20
+
+    async def broadcast():
+        # clientes saudáveis: cada broadcast é enviado antes do próximo (sem coalescer)
+        for _ in range(broadcasts):
+            room.game.touch()
+            await srv.notify_room(room, {"event": "submitted", "room": "bench", "state": room.snapshot()})
+            await _drain(srv, sockets)
+
+    def run():
+        loop.run_until_complete(broadcast())
+    return run, broadcasts
+
+
+@benchmark("server.notify_room", CONNS, "conns")
+def notify_full(conns):
+    return _notify(conns, delta=False)
+
+
+@benchmark("server.notify_room.delta", CONNS, "conns")
+def notify_delta(conns):
+    return _notify(conns, delta=True)
+
+
+@benchmark("server.handle_message.round", CONNS, "conns")
+def handle_round(conns):
+    # uma rodada pelo protocolo: submit de cada jogador e votos (cada mensagem faz broadcast)
+    srv, loop = _server()
+    sockets, room = _room(srv, loop, conns)
+    players = sockets[:MAX_PLAYERS]
+    ids = [f"p{i}" for i in range(len(players))]
+    messages = []
+    for ws, pid in zip(players, ids):
+        messages.append((ws, json.dumps({"action": "submit", "room": "bench", "player_id": pid, "card_index": 0})))
+    for i, (ws, pid) in enumerate(zip(players, ids)):
+        target = ids[1] if i == 0 else ids[0]
+        messages.append((ws, json.dumps({"action": "vote", "room": "bench", "voter_id": pid, "voted_player_id": target})))
+
+    async def play():
+        for ws, raw in messages:
+            await srv.handle_message(ws, raw)
+        await _drain(srv, sockets)
+
+    def run():
+        loop.run_until_complete(play())
+    return run, len(messages)
+
+
+@benchmark("server.handle_message.state", CONNS, "conns")
+def handle_state(conns):
+    srv, loop = _server()
+    sockets, _ = _room(srv, loop, conns)
+    raw = json.dumps({"action": "state", "room": "bench"})
+
+    async def ask():
+        for ws in sockets:
+            await srv.handle_message(ws, raw)
+        await _drain(srv, sockets)
+
+    def run():
+        loop.run_until_complete(ask())
+    return run, len(sockets)
@@ -0,0 +1,105 @@
+"""Registro e medição dos benchmarks.
+
+Um benchmark é uma função `setup(param) -> (run, ops)`: `setup` prepara o
+estado (fora da medição) e `run()` executa `ops` operações, que são o que é
+cronometrado. Cada repetição chama `setup` de novo, então `run` pode
+consumir o estado (ex.: comprar o deck inteiro).
+"""
+
+import gc
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+Setup = Callable[[int], Tuple[Callable[[], None], int]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Setup
+    params: Tuple[int, ...]
+    param_name: str
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, params: Iterable[int], param_name: str = "n") -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS.append(Benchmark(name, setup, tuple(params), param_name))
+        return setup
+    return register
+
+
+def key(bench: Benchmark, param: int) -> str:
+    return f"{bench.name}[{bench.param_name}={param}]"
+
+
+def measure(bench: Benchmark, param: int, repeat: int) -> Dict[str, float]:
+    """Tempo por operação (ns): mínimo e mediana de `repeat` repetições."""
+    samples = []
+    ops = 1
+    for _ in range(repeat):
+        run, ops = bench.setup(param)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        samples.append(elapsed * 1e9 / ops)
+    return {"min_ns": min(samples), "median_ns": statistics.median(samples), "ops": ops, "repeat": repeat}
+
+
+def run_all(selected: Optional[str] = None, repeat: int = 5, log: Callable[[str], None] = print) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for bench in BENCHMARKS:
+        for param in bench.params:
+            name = key(bench, param)
+            if selected and selected not in name:
+                continue
+            results[name] = measure(bench, param, repeat)
+            log(f"{name:55s} {_fmt(results[name]['min_ns']):>10s}/op")
+    return results
+
+
+def metadata() -> Dict[str, str]:
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(baseline: Dict[str, Dict[str, float]], current: Dict[str, Dict[str, float]], threshold: float) -> List[Tuple[str, float, float, float, str]]:
+    """Compara o mínimo por operação; `status` é `regression`/`improved`/`ok`/`new`/`missing`."""
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current:
+            rows.append((name, baseline[name]["min_ns"], 0.0, 0.0, "missing"))
+            continue
+        if name not in baseline:
+            rows.append((name, 0.0, current[name]["min_ns"], 0.0, "new"))
+            continue
+        old, new = baseline[name]["min_ns"], current[name]["min_ns"]
+        ratio = new / old if old else 1.0
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, old, new, ratio, status))
+    return rows
+
+
+def _fmt(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f}{unit}"
+    return f"{ns:.0f}ns"
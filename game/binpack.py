@@ -0,0 +1,188 @@
+"""Formato binário pré-compilado de packs de cartas (`.cahpack`).
+
+Layout (little-endian):
+
+- cabeçalho (32 bytes): magic `CAHPACK1`, versão (u16), reservado (u16),
+  número de cartas (u32) e offsets/tamanhos das seções (u32 cada):
+  tabela, índice de textos, blob de textos e tamanho do blob;
+- tabela de largura fixa, 8 bytes por carta: id (u32), tipo (u8),
+  blanks (u8), padding (u16);
+- índice de textos: `count + 1` offsets (u32) dentro do blob;
+- blob UTF-8 contíguo com os textos de todas as cartas.
+
+`load_pack` abre o arquivo com um único `mmap`; apenas as colunas de tipo e
+blanks são copiadas (1 byte por carta) e o texto é decodificado sob demanda.
+`load_pack_cached` compila packs de texto (`load_from_files`) uma vez e
+reaproveita o resultado enquanto o conteúdo não mudar.
+
+Uso: `python -m game.binpack compile white.txt black.txt -o cards.cahpack`
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Optional, Sequence
+
+from .card import CardType
+from .catalog import CardCatalog, type_code
+from .packs import iter_pack_lines
+
+MAGIC = b"CAHPACK1"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHIIIII")
+_ROW = struct.Struct("<IBBH")
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cah-packs")
+
+
+class PackTexts(Sequence[str]):
+    """Textos de um `.cahpack` mapeado; decodifica cada carta quando acessada."""
+
+    def __init__(self, mm, offsets: Sequence[int], blob_start: int) -> None:
+        self._mm = mm
+        self._offsets = offsets
+        self._blob_start = blob_start
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        base = self._blob_start
+        return self._mm[base + self._offsets[index]:base + self._offsets[index + 1]].decode("utf-8")
+
+
+def compile_pack(white_path: str, black_path: str, out_path: str) -> int:
+    """Compila os packs de texto de `load_from_files` para `out_path`.
+
+    As cartas recebem os mesmos ids que `load_from_files` atribui (brancas
+    primeiro). Retorna o número de cartas gravadas.
+    """
+    table = bytearray()
+    offsets = array("I", [0])
+    blob = bytearray()
+    sources = ((white_path, CardType.WHITE), (black_path, CardType.BLACK))
+    for path, card_type in sources:
+        code = type_code(card_type)
+        for text, blanks in iter_pack_lines(path, black=card_type == CardType.BLACK):
+            blob += text.encode("utf-8")
+            offsets.append(len(blob))
+            table += _ROW.pack(len(offsets) - 1, code, blanks, 0)
+    count = len(offsets) - 1
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    table_offset = _HEADER.size
+    offsets_offset = table_offset + len(table)
+    text_offset = offsets_offset + offsets.itemsize * len(offsets)
+    header = _HEADER.pack(MAGIC, VERSION, 0, count, table_offset, offsets_offset, text_offset, len(blob))
+    # grava num arquivo temporário e troca atomicamente (leitores nunca veem um pack parcial)
+    tmp_path = f"{out_path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(table)
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, out_path)
+    return count
+
+
+def load_pack(path: str) -> CardCatalog:
+    """Carrega um `.cahpack` com um único `mmap` e retorna o catálogo."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mm) < _HEADER.size:
+        raise ValueError(f"{path!r} is not a card pack (too small)")
+    magic, version, _, count, table_offset, offsets_offset, text_offset, text_size = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path!r} is not a version {VERSION} card pack")
+    if text_offset + text_size > len(mm):
+        raise ValueError(f"{path!r} is truncated")
+    view = memoryview(mm)
+    table = view[table_offset:table_offset + _ROW.size * count]
+    # colunas de largura fixa: tipo no byte 4 e blanks no byte 5 de cada linha
+    types = table[4::_ROW.size].tobytes()
+    blanks = table[5::_ROW.size].tobytes()
+    raw_offsets = view[offsets_offset:offsets_offset + 4 * (count + 1)]
+    if sys.byteorder == "little":
+        offsets: Sequence[int] = raw_offsets.cast("I")
+    else:
+        offsets = array("I", raw_offsets.tobytes())
+        offsets.byteswap()
+    return CardCatalog(types, blanks, PackTexts(mm, offsets, text_offset))
+
+
+def _fingerprint(*paths: str) -> str:
+    parts = []
+    for p in paths:
+        st = os.stat(p)
+        parts.append(f"{os.path.abspath(p)}:{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def _content_hash(*paths: str) -> str:
+    h = hashlib.sha256()
+    for p in paths:
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        # separa os arquivos para que (a, bc) e (ab, c) tenham hashes diferentes
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_pack_cached(white_path: str, black_path: str, cache_dir: Optional[str] = None) -> CardCatalog:
+    """Carrega packs de texto através de um cache de `.cahpack` por hash de conteúdo.
+
+    Um índice (`index.json`) associa tamanho/mtime dos arquivos ao hash; se nada
+    mudou, o pack compilado é aberto direto com `mmap`, sem ler os textos. Caso
+    contrário o conteúdo é re-hasheado e o pack só é recompilado se o hash mudou.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    index_path = os.path.join(cache_dir, "index.json")
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    fingerprint = _fingerprint(white_path, black_path)
+    digest = index.get(fingerprint)
+    if digest:
+        pack_path = os.path.join(cache_dir, f"{digest}.cahpack")
+        if os.path.exists(pack_path):
+            return load_pack(pack_path)
+    digest = _content_hash(white_path, black_path)
+    pack_path = os.path.join(cache_dir, f"{digest}.cahpack")
+    if not os.path.exists(pack_path):
+        compile_pack(white_path, black_path, pack_path)
+    index[fingerprint] = digest
+    tmp_index = f"{index_path}.tmp{os.getpid()}"
+    with open(tmp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_index, index_path)
+    return load_pack(pack_path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m game.binpack", description="Compila packs de cartas para o formato binário.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    comp = sub.add_parser("compile", help="compila white.txt/black.txt em um .cahpack")
+    comp.add_argument("white")
+    comp.add_argument("black")
+    comp.add_argument("-o", "--output", required=True)
+    args = parser.parse_args(argv)
+    if args.command == "compile":
+        count = compile_pack(args.white, args.black, args.output)
+        print(f"{args.output}: {count} cards")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
 from typing import List, Tuple
 
-from .card import Card, CardType
+from .card import CardType
+from .catalog import CardCatalog, default_catalog, type_code
 from .deck import Deck
+from .packs import ConcatTexts, MappedTexts, iter_pack_lines
 
 
 def _sample_white_texts() -> List[str]:
@@ -84,46 +86,41 @@ def _sample_black_texts() -> List[Tuple[str, int]]:
 def make_cah_like_decks(white_texts: List[str] | None = None, black_texts: List[Tuple[str, int]] | None = None) -> Tuple[Deck, Deck]:
     """Cria dois decks: (white_deck, black_deck).
 
-    Se `white_texts` / `black_texts` não forem fornecidos, usa exemplos embutidos.
-    Para usar cartas reais, passe uma lista com os textos desejados ou carregue de arquivos.
+    Se `white_texts` / `black_texts` não forem fornecidos, usa o catálogo padrão
+    (compartilhado pelo processo, criado uma única vez a partir dos exemplos
+    embutidos). Para usar cartas reais, passe uma lista com os textos desejados
+    ou carregue de arquivos; nesse caso um novo `CardCatalog` é criado.
+    Os dois decks compartilham o mesmo catálogo.
     """
-    white_texts = white_texts if white_texts is not None else _sample_white_texts()
-    black_texts = black_texts if black_texts is not None else _sample_black_texts()
+    if white_texts is None and black_texts is None:
+        catalog = default_catalog()
+    else:
+        white_texts = white_texts if white_texts is not None else _sample_white_texts()
+        black_texts = black_texts if black_texts is not None else _sample_black_texts()
+        catalog = CardCatalog.from_texts(white_texts, black_texts)
+    return Deck.from_catalog(catalog, CardType.WHITE), Deck.from_catalog(catalog, CardType.BLACK)
 
-    white_cards = [Card(i + 1, text, type=CardType.WHITE) for i, text in enumerate(white_texts)]
-    black_cards = [Card(i + 1 + len(white_cards), text, type=CardType.BLACK, blanks=blanks) for i, (text, blanks) in enumerate(black_texts)]
 
-    from .deck import Deck
-
-    return Deck(white_cards), Deck(black_cards)
-
-
-def load_from_files(white_path: str, black_path: str) -> Tuple[Deck, Deck]:
+def load_from_files(white_path: str, black_path: str, lazy: bool = True) -> Tuple[Deck, Deck]:
     """Carrega cartas a partir de dois arquivos de texto simples.
 
     - `white_path`: cada linha é uma carta branca (texto).
     - `black_path`: cada linha tem formato: <blanks>\t<prompt texto>
       ex: `1\tNada melhor do que {}.`
-    Retorna `(white_deck, black_deck)`.
+    Retorna `(white_deck, black_deck)`, que compartilham um `CardCatalog`.
+
+    Com `lazy=True` (padrão) os arquivos são mapeados em memória e o catálogo
+    guarda só os offsets de cada carta; o texto é decodificado quando a carta é
+    exibida. Com `lazy=False` os arquivos são lidos linha a linha para listas.
     """
-    whites: List[str] = []
-    blacks: List[Tuple[str, int]] = []
-    with open(white_path, encoding="utf-8") as f:
-        for line in f:
-            t = line.strip()
-            if t:
-                whites.append(t)
-    with open(black_path, encoding="utf-8") as f:
-        for line in f:
-            s = line.strip()
-            if not s:
-                continue
-            parts = s.split("\t", 1)
-            if len(parts) == 2 and parts[0].isdigit():
-                blanks = int(parts[0])
-                text = parts[1]
-            else:
-                blanks = 1
-                text = s
-            blacks.append((text, blanks))
-    return make_cah_like_decks(whites, blacks)
+    if lazy:
+        whites = MappedTexts(white_path)
+        blacks = MappedTexts(black_path, black=True)
+        types = bytes([type_code(CardType.WHITE)]) * len(whites) + bytes([type_code(CardType.BLACK)]) * len(blacks)
+        catalog = CardCatalog(types, bytes(len(whites)) + bytes(blacks.blanks), ConcatTexts(whites, blacks))
+    else:
+        catalog = CardCatalog.from_texts(
+            (text for text, _ in iter_pack_lines(white_path)),
+            iter_pack_lines(black_path, black=True),
+        )
+    return Deck.from_catalog(catalog, CardType.WHITE), Deck.from_catalog(catalog, CardType.BLACK)
@@ -0,0 +1,213 @@
+import hashlib
+import re
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from .card import Card, CardType
+
+# códigos compactos de tipo usados nas tabelas do catálogo
+_TYPE_CODES: Tuple[CardType, ...] = (CardType.WHITE, CardType.BLACK)
+_CODE_OF: Dict[CardType, int] = {t: i for i, t in enumerate(_TYPE_CODES)}
+
+
+def type_code(card_type: CardType) -> int:
+    """Código de 1 byte usado para `card_type` nas tabelas do catálogo."""
+    return _CODE_OF[card_type]
+
+
+class CardCatalog:
+    """Catálogo imutável de cartas, compartilhado por todas as salas.
+
+    Cada carta é identificada por um id inteiro denso (1..n). Tipo e número de
+    respostas ficam em tabelas de bytes e o texto é guardado uma única vez, em
+    qualquer sequência indexável (`texts[id - 1]`). Decks, mãos e descartes
+    guardam apenas os ids; `card()` cria uma `Card` só quando ela precisa ser
+    exibida.
+    """
+
+    __slots__ = ("_types", "_blanks", "_texts", "_ids_by_type", "_digest")
+
+    def __init__(self, types: Sequence[int], blanks: Sequence[int], texts: Sequence[str]) -> None:
+        if not (len(types) == len(blanks) == len(texts)):
+            raise ValueError("types, blanks and texts must have the same length")
+        self._types = bytes(types)
+        self._blanks = bytes(blanks)
+        self._texts = texts
+        # índice por tipo, montado sob demanda em `ids()`
+        self._ids_by_type: Dict[CardType, array] = {}
+        self._digest: str = ""
+
+    @classmethod
+    def from_texts(cls, white_texts: Iterable[str], black_texts: Iterable[Tuple[str, int]]) -> "CardCatalog":
+        """Cria o catálogo com as brancas primeiro (ids 1..W) e depois as pretas."""
+        texts: List[str] = list(white_texts)
+        types = bytearray([_CODE_OF[CardType.WHITE]]) * len(texts)
+        blanks = bytearray(len(texts))
+        for text, n in black_texts:
+            texts.append(text)
+            types.append(_CODE_OF[CardType.BLACK])
+            blanks.append(n)
+        return cls(types, blanks, texts)
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[Card]) -> "CardCatalog":
+        """Cria um catálogo privado a partir de cartas avulsas.
+
+        As cartas mantêm os próprios ids (não precisam ser densos) e o
+        `metadata`; ver `_LooseCatalog`.
+        """
+        return _LooseCatalog(cards)
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __contains__(self, card_id: object) -> bool:
+        return isinstance(card_id, int) and 1 <= card_id <= len(self._types)
+
+    def text(self, card_id: int) -> str:
+        return self._texts[card_id - 1]
+
+    def type_of(self, card_id: int) -> CardType:
+        return _TYPE_CODES[self._types[card_id - 1]]
+
+    def blanks(self, card_id: int) -> int:
+        return self._blanks[card_id - 1]
+
+    def digest(self) -> str:
+        """Hash (hex) do conteúdo do catálogo: ids, tipos, respostas e textos.
+
+        Dois catálogos com o mesmo digest dão o mesmo significado a cada id, o
+        que permite conferir se um estado salvo (ids) pertence a este catálogo.
+        Calculado uma vez (O(n)) e guardado.
+        """
+        if not self._digest:
+            h = self._hash()
+            for text in self._texts:
+                # o separador impede que ("a", "bc") e ("ab", "c") colidam
+                h.update(text.encode("utf-8"))
+                h.update(b"\0")
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def _hash(self) -> "hashlib._Hash":
+        h = hashlib.sha256()
+        h.update(len(self._types).to_bytes(8, "big"))
+        h.update(self._types)
+        h.update(self._blanks)
+        return h
+
+    def check_ids(self, card_ids: Sequence[int]) -> None:
+        """Levanta `ValueError` se algum dos ids não pertence ao catálogo."""
+        if len(card_ids) and (min(card_ids) < 1 or max(card_ids) > len(self._types)):
+            self._reject(card_ids)
+
+    def _reject(self, card_ids: Iterable[int]) -> None:
+        foreign = next(cid for cid in card_ids if cid not in self)
+        raise ValueError(f"card {foreign} is not in this catalog")
+
+    def owns(self, card: Card) -> bool:
+        """Se `card` é a carta do catálogo com esse id (mesmo texto e tipo)."""
+        return card.id in self and self.text(card.id) == card.text and self.type_of(card.id) == card.type
+
+    def card(self, card_id: int) -> Card:
+        """Cria uma `Card` (visão) para o id informado."""
+        return Card(card_id, self.text(card_id), type=self.type_of(card_id), blanks=self.blanks(card_id))
+
+    def cards(self, card_ids: Iterable[int]) -> List[Card]:
+        return [self.card(cid) for cid in card_ids]
+
+    def ids(self, card_type: CardType) -> array:
+        """Retorna uma cópia dos ids de um tipo, em ordem crescente."""
+        ids = self._ids_by_type.get(card_type)
+        if ids is None:
+            ids = array("I")
+            # percorre trechos contíguos do mesmo tipo em vez de carta a carta
+            for run in re.finditer(re.escape(bytes([_CODE_OF[card_type]])) + b"+", self._types):
+                ids.extend(range(run.start() + 1, run.end() + 1))
+            self._ids_by_type[card_type] = ids
+        return array("I", ids)
+
+    def __repr__(self) -> str:  # pragma: no cover - trivial
+        return f"CardCatalog({len(self)} cards)"
+
+
+class _LooseCatalog(CardCatalog):
+    """Catálogo privado de um deck montado com cartas avulsas (`Deck(cards)`).
+
+    Guarda as cartas em linhas densas, como o `CardCatalog`, mas mantém os ids
+    de quem as criou por meio de um mapa id -> linha, além do `metadata` de
+    cada carta. Cartas repetidas (mesmo id) ocupam uma única linha.
+    """
+
+    __slots__ = ("_rows", "_metadata")
+
+    def __init__(self, cards: Iterable[Card]) -> None:
+        texts: List[str] = []
+        types = bytearray()
+        blanks = bytearray()
+        rows: Dict[int, int] = {}
+        metadata: Dict[int, Dict[str, Any]] = {}
+        for c in cards:
+            row = rows.get(c.id)
+            if row is not None:
+                if (texts[row], types[row], blanks[row]) != (c.text, _CODE_OF[c.type], c.blanks):
+                    raise ValueError(f"two different cards share the id {c.id}")
+                continue
+            rows[c.id] = len(texts)
+            texts.append(c.text)
+            types.append(_CODE_OF[c.type])
+            blanks.append(c.blanks)
+            if c.metadata:
+                metadata[c.id] = c.metadata
+        super().__init__(types, blanks, texts)
+        self._rows = rows
+        self._metadata = metadata
+
+    def __contains__(self, card_id: object) -> bool:
+        return isinstance(card_id, int) and card_id in self._rows
+
+    def text(self, card_id: int) -> str:
+        return self._texts[self._rows[card_id]]
+
+    def type_of(self, card_id: int) -> CardType:
+        return _TYPE_CODES[self._types[self._rows[card_id]]]
+
+    def blanks(self, card_id: int) -> int:
+        return self._blanks[self._rows[card_id]]
+
+    def _hash(self) -> "hashlib._Hash":
+        # os ids não são 1..n: entram no hash, na ordem das linhas
+        h = super()._hash()
+        for cid in self._rows:
+            h.update(cid.to_bytes(8, "big", signed=True))
+        return h
+
+    def check_ids(self, card_ids: Sequence[int]) -> None:
+        rows = self._rows
+        if not all(cid in rows for cid in card_ids):
+            self._reject(card_ids)
+
+    def card(self, card_id: int) -> Card:
+        card = super().card(card_id)
+        meta = self._metadata.get(card_id)
+        if meta:
+            # cópia: alterar a carta exibida não altera o catálogo
+            card.metadata = dict(meta)
+        return card
+
+    def ids(self, card_type: CardType) -> array:
+        ids = self._ids_by_type.get(card_type)
+        if ids is None:
+            code = _CODE_OF[card_type]
+            ids = array("I", sorted(cid for cid, row in self._rows.items() if self._types[row] == code))
+            self._ids_by_type[card_type] = ids
+        return array("I", ids)
+
+
+@lru_cache(maxsize=None)
+def default_catalog() -> CardCatalog:
+    """Catálogo padrão do processo, criado uma única vez a partir das cartas embutidas."""
+    from .cards_data import _sample_black_texts, _sample_white_texts
+
+    return CardCatalog.from_texts(_sample_white_texts(), _sample_black_texts())
@@ -1,72 +1,455 @@
 import random
-from typing import Iterable, List
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from .card import Card, CardType
+from .catalog import CardCatalog
+from .persist import decode_array, encode_array
+
+
+def _card_id(catalog: CardCatalog, card: Card | int) -> int:
+    """Id de `card` no catálogo; uma `Card` de outro catálogo levanta `ValueError`."""
+    if isinstance(card, int):
+        return card
+    if not catalog.owns(card):
+        raise ValueError(f"card {card.id} ({card.text!r}) is not in this deck's catalog")
+    return card.id
+
+
+class _Pile:
+    """Pilha de ids de cartas de um único `CardType`.
+
+    Os ids ficam num `array('I')` com um índice `head` para o topo, de modo
+    que comprar do topo e adicionar ao fundo custam O(1). Cada carta tem um
+    número de sequência (`seqs`) que define a ordem global entre pilhas de
+    tipos diferentes dentro do mesmo `Deck`.
+
+    Embaralhamento preguiçoso: as posições `[fixed, lazy_end)` ainda não têm
+    ordem definida. Cada posição só é sorteada (um passo de Fisher–Yates)
+    quando uma carta vai ser comprada ou exibida, então embaralhar custa O(1)
+    e cada compra custa O(1) a mais. `[head, fixed)` já está sorteado.
+    """
+
+    __slots__ = ("ids", "seqs", "head", "fixed", "lazy_end")
+
+    def __init__(self) -> None:
+        self.ids: array = array("I")
+        self.seqs: array = array("Q")
+        self.head: int = 0
+        self.fixed: int = 0
+        self.lazy_end: int = 0
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.head
+
+    def top_seq(self) -> int:
+        return self.seqs[self.head]
+
+    def lazy_count(self) -> int:
+        """Quantas cartas restantes pertencem ao bloco embaralhado."""
+        return max(self.lazy_end - self.head, 0)
+
+    def shuffle_lazily(self) -> None:
+        self.fixed = self.head
+        self.lazy_end = len(self.ids)
+
+    def fix(self, upto: int, rng: random.Random) -> None:
+        """Sorteia as posições até `upto` (exclusivo) que ainda estão no bloco preguiçoso."""
+        ids = self.ids
+        end = self.lazy_end
+        stop = min(upto, end)
+        for pos in range(max(self.fixed, self.head), stop):
+            j = rng.randrange(pos, end)
+            ids[pos], ids[j] = ids[j], ids[pos]
+        if stop > self.fixed:
+            self.fixed = stop
+
+    def preview(self, count: int, rng: random.Random) -> array:
+        """Os próximos `count` ids, sem sortear posições nem consumir `rng`.
+
+        Refaz os passos de `fix` numa cópia do estado do RNG, anotando as
+        trocas à parte: o resultado é o que `take(count)` devolveria se nada
+        mais usar o RNG antes.
+        """
+        ids = self.ids
+        head = self.head
+        stop = min(head + count, len(ids))
+        start = max(self.fixed, head)
+        end = self.lazy_end
+        if start >= min(stop, end):
+            return ids[head:stop]
+        sim = random.Random()
+        sim.setstate(rng.getstate())
+        moved: Dict[int, int] = {}
+        out = ids[head:start]
+        for pos in range(start, stop):
+            if pos >= end:
+                out.append(ids[pos])
+                continue
+            j = sim.randrange(pos, end)
+            out.append(moved.get(j, ids[j]))
+            moved[j] = moved.get(pos, ids[pos])
+        return out
+
+    def take(self, count: int, rng: random.Random) -> array:
+        end = min(self.head + count, len(self.ids))
+        self.fix(end, rng)
+        taken = self.ids[self.head:end]
+        self.head = end
+        self._compact()
+        return taken
+
+    def take_at(self, index: int) -> int:
+        """Remove o id na posição `index` (relativa ao topo) em O(1).
+
+        A carta do topo ocupa o lugar da removida; as sequências ficam onde
+        estão, então a ordem relativa entre pilhas continua válida.
+        """
+        pos = self.head + index
+        card_id = self.ids[pos]
+        self.ids[pos] = self.ids[self.head]
+        self.head += 1
+        self._compact()
+        return card_id
+
+    def append(self, card_id: int, seq: int) -> None:
+        self.ids.append(card_id)
+        self.seqs.append(seq)
+
+    def remaining(self) -> array:
+        return self.ids[self.head:]
+
+    def dump(self) -> dict:
+        # só a parte restante; as posições do bloco preguiçoso ficam relativas ao topo
+        head = self.head
+        return {
+            "ids": encode_array(self.ids[head:]),
+            "seqs": encode_array(self.seqs[head:]),
+            "fixed": max(self.fixed - head, 0),
+            "lazy_end": max(self.lazy_end - head, 0),
+        }
+
+    @classmethod
+    def restore(cls, data: dict) -> "_Pile":
+        pile = cls()
+        pile.ids = decode_array("I", data["ids"])
+        pile.seqs = decode_array("Q", data["seqs"])
+        pile.fixed = data["fixed"]
+        pile.lazy_end = data["lazy_end"]
+        return pile
+
+    def clear(self) -> None:
+        self.ids = array("I")
+        self.seqs = array("Q")
+        self.head = 0
+        self.fixed = 0
+        self.lazy_end = 0
+
+    def _compact(self) -> None:
+        # descarta o prefixo já comprado quando ele passa de metade do array
+        # (custo amortizado O(1) por carta)
+        if self.head == len(self.ids):
+            self.clear()
+        elif self.head > 32 and self.head * 2 > len(self.ids):
+            del self.ids[:self.head]
+            del self.seqs[:self.head]
+            self.fixed = max(self.fixed - self.head, 0)
+            self.lazy_end = max(self.lazy_end - self.head, 0)
+            self.head = 0
 
 
 class Deck:
-    """Coleção de cartas com operações básicas (embaralhar, comprar, reset)."""
+    """Coleção de cartas com operações básicas (embaralhar, comprar, reset).
+
+    O deck guarda apenas ids de um `CardCatalog`, separados por `CardType`,
+    então comprar `k` cartas de um tipo, adicionar cartas e reciclar o descarte
+    custam O(k). A ordem global do baralho (usada por `draw` e `cards`) é
+    preservada por números de sequência.
+
+    Os métodos `*_ids` trabalham direto com ids; os demais devolvem `Card`
+    (visões do catálogo) e existem para exibição e compatibilidade.
+
+    Toda a aleatoriedade vem de `rng` (por padrão um `random.Random` próprio do
+    deck; `GameState` injeta o RNG da sala). Com `lazy_shuffle` (padrão),
+    `shuffle()` é O(1): as posições só são sorteadas quando compradas.
+    """
+
+    def __init__(self, cards: Iterable[Card] | None = None, catalog: CardCatalog | None = None, rng: random.Random | None = None):
+        cards = list(cards) if cards is not None else []
+        if catalog is None:
+            # cartas avulsas: cria um catálogo privado (com os ids das cartas)
+            catalog = CardCatalog.from_cards(cards)
+        self._init(catalog, array("I", (_card_id(catalog, c) for c in cards)), rng)
+
+    def _init(self, catalog: CardCatalog, ids: array, rng: random.Random | None = None) -> None:
+        self.catalog: CardCatalog = catalog
+        self.rng: random.Random = rng if rng is not None else random.Random()
+        self.lazy_shuffle: bool = True
+        self._original: array = ids
+        # decks criados por `from_catalog` guardam o tipo, e `dump()` não precisa copiar `_original`
+        self._original_type: Optional[CardType] = None
+        self._piles: Dict[CardType, _Pile] = {t: _Pile() for t in CardType}
+        self._next_seq: int = 0
+        self._count: int = 0
+        self.add_ids(ids)
+
+    @classmethod
+    def from_ids(cls, catalog: CardCatalog, card_ids: Iterable[int], rng: random.Random | None = None) -> "Deck":
+        deck = cls.__new__(cls)
+        deck._init(catalog, array("I", card_ids), rng)
+        return deck
 
-    def __init__(self, cards: Iterable[Card] | None = None):
-        self._original: List[Card] = list(cards) if cards is not None else []
-        self.cards: List[Card] = list(self._original)
+    @classmethod
+    def from_catalog(cls, catalog: CardCatalog, card_type: CardType, rng: random.Random | None = None) -> "Deck":
+        """Cria um deck com todas as cartas de um tipo do catálogo."""
+        deck = cls.__new__(cls)
+        deck._init(catalog, array("I"), rng)
+        deck._original = catalog.ids(card_type)
+        deck._original_type = card_type
+        deck._add_typed(card_type, deck._original)
+        return deck
+
+    def _add_typed(self, card_type: CardType, card_ids: array) -> None:
+        """Adiciona ao fundo ids que já se sabe serem todos de `card_type` (sem olhar o catálogo)."""
+        pile = self._piles[card_type]
+        pile.ids.extend(card_ids)
+        pile.seqs.extend(range(self._next_seq, self._next_seq + len(card_ids)))
+        self._next_seq += len(card_ids)
+        self._count += len(card_ids)
+
+    @property
+    def ids(self) -> array:
+        """Ids restantes na ordem de compra (cópia; custo O(n)).
+
+        Se houver um embaralhamento preguiçoso pendente, ele é concluído antes.
+        """
+        self._realize()
+        piles = [p for p in self._piles.values() if len(p)]
+        if len(piles) == 1:
+            return piles[0].remaining()
+        merged = []
+        for p in piles:
+            merged.extend(zip(p.seqs[p.head:], p.ids[p.head:]))
+        merged.sort(key=lambda item: item[0])
+        return array("I", (cid for _, cid in merged))
+
+    @property
+    def cards(self) -> List[Card]:
+        """Cartas restantes na ordem de compra (cópia; custo O(n))."""
+        return self.catalog.cards(self.ids)
 
     def shuffle(self) -> None:
-        random.shuffle(self.cards)
+        if self.lazy_shuffle:
+            # O(1) por pilha: todas as cartas restantes viram o bloco preguiçoso
+            for p in self._piles.values():
+                p.shuffle_lazily()
+            return
+        remaining = self.ids
+        self.rng.shuffle(remaining)
+        self._clear()
+        self.add_ids(remaining)
+
+    def _realize(self) -> None:
+        """Conclui o embaralhamento preguiçoso pendente (O(n)); usado por `ids`/`cards`."""
+        lazy = [p for p in self._piles.values() if p.lazy_count()]
+        for p in lazy:
+            p.fix(p.lazy_end, self.rng)
+        if len(lazy) > 1:
+            # intercala aleatoriamente os blocos das pilhas, reaproveitando as
+            # sequências do bloco (cada pilha continua com sequências crescentes)
+            labels = [i for i, p in enumerate(lazy) for _ in range(p.head, p.lazy_end)]
+            self.rng.shuffle(labels)
+            seqs = sorted(s for p in lazy for s in p.seqs[p.head:p.lazy_end])
+            cursor = [p.head for p in lazy]
+            for seq, i in zip(seqs, labels):
+                lazy[i].seqs[cursor[i]] = seq
+                cursor[i] += 1
+        for p in lazy:
+            p.lazy_end = p.fixed = p.head
+
+    def _clear(self) -> None:
+        for p in self._piles.values():
+            p.clear()
+        self._next_seq = 0
+        self._count = 0
+
+    def _next_pile(self) -> Tuple[Optional[_Pile], bool]:
+        """Retorna a pilha com a próxima carta e se há outras pilhas não vazias."""
+        best: Optional[_Pile] = None
+        others = False
+        for p in self._piles.values():
+            if not len(p):
+                continue
+            if best is None:
+                best = p
+                continue
+            others = True
+            if p.top_seq() < best.top_seq():
+                best = p
+        return best, others
+
+    def draw_ids(self, count: int = 1) -> array:
+        drawn = array("I")
+        while len(drawn) < count:
+            need = count - len(drawn)
+            lazy = [p for p in self._piles.values() if p.lazy_count()]
+            if len(lazy) == 1:
+                # o bloco embaralhado vem antes de tudo que foi adicionado depois
+                pile = lazy[0]
+                need = min(need, pile.lazy_count())
+            elif lazy:
+                # escolhe a pilha com peso proporcional ao que resta do bloco:
+                # equivale a comprar uma carta uniforme do bloco inteiro
+                r = self.rng.randrange(sum(p.lazy_count() for p in lazy))
+                for pile in lazy:
+                    r -= pile.lazy_count()
+                    if r < 0:
+                        break
+                need = 1
+            else:
+                pile, others = self._next_pile()
+                if pile is None:
+                    break
+                # com uma única pilha não vazia, compra o restante de uma vez
+                if others:
+                    need = 1
+            drawn.extend(pile.take(need, self.rng))
+        self._count -= len(drawn)
+        return drawn
 
     def draw(self, count: int = 1) -> List[Card]:
-        drawn: List[Card] = []
-        for _ in range(count):
-            if not self.cards:
-                break
-            drawn.append(self.cards.pop(0))
+        return self.catalog.cards(self.draw_ids(count))
+
+    def draw_white_ids(self, count: int = 1) -> array:
+        drawn = self._piles[CardType.WHITE].take(count, self.rng)
+        self._count -= len(drawn)
         return drawn
 
     def draw_white(self, count: int = 1) -> List[Card]:
         """Draw up to `count` white cards from this deck (skips non-white)."""
-        drawn: List[Card] = []
-        remaining: List[Card] = []
-        for c in self.cards:
-            if len(drawn) >= count:
-                remaining.append(c)
-                continue
-            if c.type == CardType.WHITE:
-                drawn.append(c)
-            else:
-                remaining.append(c)
-        self.cards = remaining + self.cards[len(drawn):]
-        return drawn
+        return self.catalog.cards(self.draw_white_ids(count))
+
+    def draw_black_id(self) -> int | None:
+        drawn = self._piles[CardType.BLACK].take(1, self.rng)
+        if not drawn:
+            return None
+        self._count -= 1
+        return drawn[0]
 
     def draw_black(self) -> Card | None:
         """Draw the first black card from deck or None if none available."""
-        for i, c in enumerate(self.cards):
-            if c.type == CardType.BLACK:
-                return self.cards.pop(i)
-        return None
+        cid = self.draw_black_id()
+        return self.catalog.card(cid) if cid is not None else None
+
+    def draw_random_black_id(self) -> int | None:
+        pile = self._piles[CardType.BLACK]
+        if not len(pile):
+            return None
+        self._count -= 1
+        if pile.fixed <= pile.head and pile.lazy_count() == len(pile):
+            # pilha inteira ainda embaralhada: o topo sorteado já é uniforme
+            return pile.take(1, self.rng)[0]
+        return pile.take_at(self.rng.randrange(len(pile)))
 
     def draw_random_black(self) -> Card | None:
         """Remove and return a random black card from the deck, or None if none available."""
-        black_indices = [i for i, c in enumerate(self.cards) if c.type == CardType.BLACK]
-        if not black_indices:
-            return None
-        idx = random.choice(black_indices)
-        return self.cards.pop(idx)
+        cid = self.draw_random_black_id()
+        return self.catalog.card(cid) if cid is not None else None
+
+    def peek(self, card_type: CardType, count: int = 1) -> List[Card]:
+        """Retorna (sem remover) até `count` cartas do topo do tipo pedido.
+
+        Não altera o deck nem consome o RNG: exibir o estado não muda as
+        próximas compras (ver `_Pile.preview`).
+        """
+        return self.catalog.cards(self._piles[card_type].preview(count, self.rng))
+
+    def count(self, card_type: CardType) -> int:
+        return len(self._piles[card_type])
 
-    def add(self, card: Card) -> None:
-        self.cards.append(card)
+    def deal_ids(self, players: int, count: int) -> List[array]:
+        """Distribui `count` ids para cada um de `players` jogadores, em rodízio.
 
-    def add_many(self, cards: Iterable[Card]) -> None:
-        """Adiciona múltiplas cartas ao final do baralho."""
-        self.cards.extend(cards)
+        Retorna uma lista de mãos (uma por jogador). Se o baralho acabar no meio,
+        os primeiros jogadores do rodízio podem receber uma carta a mais.
+        """
+        if players <= 0:
+            return []
+        drawn = self.draw_ids(players * count)
+        return [drawn[i::players] for i in range(players)]
+
+    def deal(self, players: int, count: int) -> List[List[Card]]:
+        return [self.catalog.cards(hand) for hand in self.deal_ids(players, count)]
+
+    def add_ids(self, card_ids: Iterable[int]) -> None:
+        """Adiciona ids do catálogo deste deck ao final do baralho.
+
+        Levanta `ValueError` (sem adicionar nada) se algum id não é do catálogo.
+        """
+        if not isinstance(card_ids, array):
+            card_ids = array("I", card_ids)
+        self.catalog.check_ids(card_ids)
+        types = self.catalog.type_of
+        piles = self._piles
+        seq = self._next_seq
+        for cid in card_ids:
+            piles[types(cid)].append(cid, seq)
+            seq += 1
+        self._count += seq - self._next_seq
+        self._next_seq = seq
+
+    def add(self, card: Card | int) -> None:
+        """Adiciona uma carta (ou id) do catálogo deste deck ao final do baralho."""
+        self.add_ids((_card_id(self.catalog, card),))
+
+    def add_many(self, cards: Iterable[Card | int]) -> None:
+        """Adiciona múltiplas cartas (ou ids) ao final do baralho."""
+        self.add_ids([_card_id(self.catalog, c) for c in cards])
 
     def reset(self) -> None:
-        self.cards = list(self._original)
+        self._clear()
+        self.add_ids(self._original)
+
+    def dump(self) -> dict:
+        """Estado completo do deck (inclusive embaralhamento preguiçoso pendente) em forma serializável.
+
+        Não consome o RNG: `restore()` continua exatamente do mesmo ponto.
+        """
+        if self._original_type is not None:
+            original = {"type": self._original_type.value}
+        else:
+            original = {"ids": encode_array(self._original)}
+        return {
+            "piles": {t.value: p.dump() for t, p in self._piles.items() if len(p)},
+            "next_seq": self._next_seq,
+            "lazy_shuffle": self.lazy_shuffle,
+            "original": original,
+        }
+
+    @classmethod
+    def restore(cls, catalog: CardCatalog, data: dict, rng: random.Random | None = None) -> "Deck":
+        """Recria um deck a partir de `dump()` (os ids devem ser do mesmo `catalog`)."""
+        deck = cls.__new__(cls)
+        deck._init(catalog, array("I"), rng)
+        original = data["original"]
+        if "type" in original:
+            deck._original_type = CardType(original["type"])
+            deck._original = catalog.ids(deck._original_type)
+        else:
+            deck._original = decode_array("I", original["ids"])
+        for value, pile_data in data["piles"].items():
+            pile = _Pile.restore(pile_data)
+            deck._piles[CardType(value)] = pile
+            deck._count += len(pile)
+        deck._next_seq = data["next_seq"]
+        deck.lazy_shuffle = data["lazy_shuffle"]
+        return deck
 
     def __len__(self) -> int:
-        return len(self.cards)
+        return self._count
 
     def is_empty(self) -> bool:
-        return len(self.cards) == 0
+        return self._count == 0
 
     def __repr__(self) -> str:  # pragma: no cover - trivial
-        return f"Deck({len(self.cards)} cards)"
+        return f"Deck({self._count} cards)"
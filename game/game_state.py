@@ -1,36 +1,100 @@
+import random
+from array import array
 from typing import List, Dict, Optional
 
 from .card import Card
+from .catalog import CardCatalog
 from .deck import Deck
+from .persist import decode_array, encode_array
 from .player import Player
 from .turn_manager import TurnManager
 from .voting import VotingSession
 
 
+class _FrozenDict(dict):
+    """`dict` somente leitura usado nos snapshots em cache.
+
+    Continua sendo um `dict` (serializa com `json.dumps` e compara normalmente),
+    mas recusa alterações; use `dict(snapshot)` para obter uma cópia mutável.
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("snapshot is read-only; copy it with dict(...) first")
+
+    __setitem__ = __delitem__ = _readonly  # type: ignore[assignment]
+    update = pop = popitem = clear = setdefault = _readonly  # type: ignore[assignment]
+
+    def __ior__(self, other):  # type: ignore[override]
+        self._readonly()
+
+
 class GameState:
     """Estado principal do jogo: jogadores, deck, pilha de descarte e turnos.
 
     Responsável por operações de alto nível como iniciar jogo e jogar cartas.
+    Mãos, submissões e descartes guardam ids do `CardCatalog` dos decks; as
+    cartas só são materializadas em `snapshot()`, `hand_texts()` e afins.
+
+    Toda a aleatoriedade do jogo (embaralhar, sortear cartas pretas) usa um
+    `random.Random` próprio, criado a partir de `seed`. A semente fica no
+    `dump()`, então uma partida pode ser reproduzida exatamente; ela não
+    aparece no `snapshot()` público, que iria para os jogadores (com ela dá
+    para prever todas as mãos e cartas pretas).
+
+    `version` cresce a cada método que altera o estado; `snapshot()` devolve o
+    mesmo objeto (imutável) enquanto a versão não mudar. Quem alterar
+    jogadores/cartas por fora desses métodos deve chamar `touch()`.
     """
 
-    def __init__(self, players: List[Player], white_deck: Deck, black_deck: Optional[Deck] = None, hand_size: int = 3) -> None:
+    def __init__(self, players: List[Player], white_deck: Deck, black_deck: Optional[Deck] = None, hand_size: int = 3, seed: Optional[int] = None) -> None:
+        # `players` mantém a ordem; `_players_by_id` é o índice para buscas O(1).
+        # Use `add_player`/`remove_player` em vez de alterar a lista diretamente.
         self.players: List[Player] = players
+        self._players_by_id: Dict[str, Player] = {p.id: p for p in players}
+        self.seed: int = seed if seed is not None else random.SystemRandom().randrange(2 ** 63)
+        self.rng: random.Random = random.Random(self.seed)
         self.white_deck: Deck = white_deck
         self.black_deck: Optional[Deck] = black_deck
-        self.discard: List[Card] = []
+        # os decks passam a usar o RNG da sala
+        white_deck.rng = self.rng
+        if black_deck is not None:
+            black_deck.rng = self.rng
+        self.catalog: CardCatalog = white_deck.catalog
+        self.discard: array = array("I")
         # descarte separado para cartas pretas (prompt cards)
-        self.black_discard: List[Card] = []
+        self.black_discard: array = array("I")
+        # id da carta preta da rodada atual (no catálogo do deck preto)
+        self.current_black_id: Optional[int] = None
         self.turns: TurnManager = TurnManager([p.id for p in players])
         self.hand_size = hand_size
         self.started = False
-        # submissões de cartas nesta rodada: player_id -> Card
-        self.submissions: Dict[str, Card] = {}
+        # submissões de cartas nesta rodada: player_id -> id da carta
+        self.submissions: Dict[str, int] = {}
         # sessão de votação atual, é criada quando todas as submissões são feitas
         self.voting: Optional[VotingSession] = None
         self.voting_open: bool = False
         # suporte a múltiplas rodadas
-        self.max_rounds: Optional[int] = None  # None = infinito
+        self._max_rounds: Optional[int] = None  # None = infinito
         self.current_round: int = 0
+        # versão do estado e snapshot em cache (válido enquanto a versão não mudar)
+        self.version: int = 0
+        self._snapshot: Optional[_FrozenDict] = None
+        self._snapshot_version: int = -1
+
+    @property
+    def max_rounds(self) -> Optional[int]:
+        return self._max_rounds
+
+    @max_rounds.setter
+    def max_rounds(self, value: Optional[int]) -> None:
+        self._max_rounds = value
+        self.touch()
+
+    def touch(self) -> None:
+        """Marca o estado como alterado (invalida o snapshot em cache)."""
+        self.version += 1
 
     def start(self) -> None:
         # shuffle available decks
@@ -47,38 +111,13 @@ class GameState:
         self.current_round = 0
         for p in self.players:
             p.clear_hand()
-            # garantir que cada jogador receba exatamente `hand_size` cartas
-            for _ in range(self.hand_size):
-                self._replenish_deck_if_needed()
-                if self.white_deck.is_empty():
-                    # se mesmo após tentar reabastecer não houver cartas, paramos
-                    break
-                p.draw(self.white_deck, 1)
+        # garantir que cada jogador receba exatamente `hand_size` cartas
+        self._deal_to_players(self.hand_size)
         self.started = True
         # draw a black card for the round (if available)
-        self.current_black_card: Optional[Card] = None
-        if self.black_deck:
-            try:
-                # ensure black deck has cards (replenish from black_discard if needed)
-                try:
-                    self._replenish_black_if_needed()
-                except Exception:
-                    pass
-                # draw a random black card from the black deck so prompts are not predictable
-                try:
-                    self.current_black_card = self.black_deck.draw_random_black()
-                except Exception:
-                    # fallback to the older methods if random draw not available
-                    maybe = self.black_deck.draw(1)
-                    if maybe:
-                        self.current_black_card = maybe[0]
-                    else:
-                        try:
-                            self.current_black_card = self.black_deck.draw_black()
-                        except Exception:
-                            self.current_black_card = None
-            except Exception:
-                self.current_black_card = None
+        self.current_black_id = None
+        self._draw_black_card()
+        self.touch()
 
     def play_card(self, player_id: str, card_index: int) -> Card:
         """API antiga (mantida para compatibilidade): joga imediatamente para descarte.
@@ -86,10 +125,11 @@ class GameState:
         Use `submit_card` para fluxo de votação.
         """
         player = self._get_player(player_id)
-        card = player.play(card_index)
-        self.discard.append(card)
+        card_id = player.play(card_index)
+        self.discard.append(card_id)
         self.turns.advance()
-        return card
+        self.touch()
+        return self.catalog.card(card_id)
 
     def submit_card(self, player_id: str, card_index: int) -> None:
         """Submete uma carta para a votação desta rodada.
@@ -101,52 +141,222 @@ class GameState:
         if self.is_finished():
             raise RuntimeError("Game has finished; cannot submit cards")
         player = self._get_player(player_id)
-        card = player.play(card_index)
-        self.submissions[player_id] = card
-        # se todos submeteram, inicializa sessão de votação
-        if len(self.submissions) == len(self.players):
+        self.submissions[player_id] = player.play(card_index)
+        self._open_voting_if_ready()
+        self.touch()
+
+    def expire_submissions(self) -> List[str]:
+        """Encerra as submissões da rodada quando o prazo acaba.
+
+        Cada jogador que ainda não submeteu joga uma carta sorteada (pelo RNG
+        da sala) da própria mão; quem está sem cartas fica de fora. A votação
+        é aberta com as submissões que houver; sem nenhuma (ninguém tinha
+        cartas) a rodada termina sem vencedor. Retorna os ids dos jogadores
+        que não submeteram a tempo.
+        """
+        if not self.started or self.voting_open or self.is_finished():
+            return []
+        missing = [p for p in self.players if p.id not in self.submissions]
+        for player in missing:
+            if player.hand:
+                self.submissions[player.id] = player.play(self.rng.randrange(len(player.hand)))
+        self._open_voting_if_ready(force=True)
+        if not self.voting_open:
+            self._finish_round(None)
+        self.touch()
+        return [p.id for p in missing]
+
+    def _open_voting_if_ready(self, force: bool = False) -> None:
+        # se todos submeteram (ou o prazo acabou), inicializa sessão de votação
+        if self.submissions and (force or len(self.submissions) == len(self.players)):
             # todos os jogadores votam; permite votar mesmo para quem não submeteu
             voter_ids = [p.id for p in self.players]
             self.voting = VotingSession(self.submissions, voters=voter_ids)
             self.voting_open = True
 
+    def add_player(self, player: Player) -> Player:
+        """Adiciona `player` ao fim da ordem de jogadores e dos turnos.
+
+        Se já existir um jogador com o mesmo id, retorna o existente sem alterar nada.
+        """
+        existing = self._players_by_id.get(player.id)
+        if existing is not None:
+            return existing
+        self.players.append(player)
+        self._players_by_id[player.id] = player
+        self.turns.add(player.id)
+        self.touch()
+        return player
+
+    def remove_player(self, player_id: str) -> Player:
+        """Remove o jogador, devolvendo sua mão e submissão ao descarte.
+
+        Se a votação estiver aberta, ela é reiniciada só com os jogadores que
+        restaram; se faltava apenas a submissão dele, a votação é aberta.
+        """
+        player = self._players_by_id.pop(player_id, None)
+        if player is None:
+            raise ValueError(f"Player with id {player_id!r} not found")
+        self.players.remove(player)
+        self.turns.remove(player_id)
+        self.discard.extend(player.hand)
+        player.clear_hand()
+        submitted = self.submissions.pop(player_id, None)
+        if submitted is not None:
+            self.discard.append(submitted)
+        if self.voting_open:
+            self.voting = None
+            self.voting_open = False
+        self._open_voting_if_ready()
+        self.touch()
+        return player
+
+    def get_player(self, player_id: str) -> Optional[Player]:
+        return self._players_by_id.get(player_id)
+
+    def has_player(self, player_id: str) -> bool:
+        return player_id in self._players_by_id
+
     def _replenish_black_if_needed(self) -> None:
         """Se o baralho preto estiver vazio e houver cartas no descarte preto, move-as de volta e embaralha."""
         if self.black_deck is None:
             return
         if self.black_deck.is_empty() and self.black_discard:
             try:
-                self.black_deck.add_many(self.black_discard)
+                self.black_deck.add_ids(self.black_discard)
                 self.black_deck.shuffle()
-                self.black_discard.clear()
+                del self.black_discard[:]
             except Exception:
                 # se algo falhar, garantimos que não levantamos exceção para o fluxo normal
                 pass
 
+    def _draw_black_card(self) -> None:
+        """Sorteia a carta preta da rodada a partir do baralho preto (se houver)."""
+        if self.black_deck is None:
+            return
+        try:
+            # ensure black deck has cards (replenish from black_discard if needed)
+            self._replenish_black_if_needed()
+            # draw a random black card so prompts are not predictable
+            self.current_black_id = self.black_deck.draw_random_black_id()
+        except Exception:
+            self.current_black_id = None
+
+    @property
+    def current_black_card(self) -> Optional[Card]:
+        if self.current_black_id is None or self.black_deck is None:
+            return None
+        return self.black_deck.catalog.card(self.current_black_id)
+
+    def hand_texts(self, player_id: str) -> List[str]:
+        """Textos das cartas na mão de `player_id`, na ordem da mão."""
+        text = self.catalog.text
+        return [text(cid) for cid in self._get_player(player_id).hand]
+
     def deal_one_to(self, player_id: str) -> None:
         player = self._get_player(player_id)
         player.draw(self.white_deck, 1)
+        self.touch()
+
+    def _deal_to_players(self, count: int) -> None:
+        """Distribui `count` cartas brancas para cada jogador, em rodízio.
+
+        Se o deck acabar no meio da distribuição, o descarte é reembaralhado de
+        volta no deck e os jogadores que ficaram com menos cartas são completados.
+        """
+        if not self.players:
+            return
+        self._replenish_deck_if_needed()
+        hands = self.white_deck.deal_ids(len(self.players), count)
+        for p, card_ids in zip(self.players, hands):
+            p.receive(card_ids)
+            missing = count - len(card_ids)
+            if missing > 0:
+                # se o deck acabou, reembaralha o discard de volta no deck
+                self._replenish_deck_if_needed()
+                p.draw(self.white_deck, missing)
 
     def _get_player(self, player_id: str) -> Player:
-        for p in self.players:
-            if p.id == player_id:
-                return p
-        raise ValueError(f"Player with id {player_id!r} not found")
+        player = self._players_by_id.get(player_id)
+        if player is None:
+            raise ValueError(f"Player with id {player_id!r} not found")
+        return player
 
     def snapshot(self) -> dict:
-        return {
-            "players": [{"id": p.id, "name": p.name, "hand_count": len(p.hand), "score": p.score} for p in self.players],
+        """Visão pública do estado (somente leitura, em cache até a próxima alteração)."""
+        if self._snapshot is not None and self._snapshot_version == self.version:
+            return self._snapshot
+        self._snapshot = self._build_snapshot()
+        self._snapshot_version = self.version
+        return self._snapshot
+
+    def _build_snapshot(self) -> _FrozenDict:
+        return _FrozenDict({
+            "players": tuple(_FrozenDict({"id": p.id, "name": p.name, "hand_count": len(p.hand), "score": p.score}) for p in self.players),
             "white_deck_count": len(self.white_deck),
             "discard_count": len(self.discard),
             "current_turn": self.turns.current(),
-            "submissions": list(self.submissions.keys()),
-            "submission_texts": {pid: getattr(card, 'text', str(card)) for pid, card in self.submissions.items()},
+            "submissions": tuple(self.submissions.keys()),
+            "submission_texts": _FrozenDict({pid: self.catalog.text(cid) for pid, cid in self.submissions.items()}),
             "voting_open": self.voting_open,
             "current_round": self.current_round,
             "max_rounds": self.max_rounds,
-            "black_card_text": getattr(self, 'current_black_card', None) and getattr(self.current_black_card, 'text', None),
+            "black_card_text": self.black_deck.catalog.text(self.current_black_id) if self.current_black_id is not None and self.black_deck is not None else None,
+        })
+
+    def dump(self) -> dict:
+        """Estado completo (inclusive o estado do RNG) em forma serializável em JSON.
+
+        `GameState.restore(dump, catalog)` continua a partida exatamente do
+        mesmo ponto: as próximas compras e sorteios são os mesmos.
+        """
+        version, internal, gauss_next = self.rng.getstate()
+        return {
+            "seed": self.seed,
+            "rng": [version, encode_array(array("I", internal)), gauss_next],
+            "players": [{"id": p.id, "name": p.name, "score": p.score, "hand": encode_array(p.hand)} for p in self.players],
+            "white_deck": self.white_deck.dump(),
+            "black_deck": self.black_deck.dump() if self.black_deck is not None else None,
+            "discard": encode_array(self.discard),
+            "black_discard": encode_array(self.black_discard),
+            "current_black_id": self.current_black_id,
+            "turns": {"player_ids": list(self.turns.player_ids), "index": self.turns.index},
+            "hand_size": self.hand_size,
+            "started": self.started,
+            "submissions": dict(self.submissions),
+            "voting": self.voting.dump() if self.voting is not None else None,
+            "voting_open": self.voting_open,
+            "max_rounds": self._max_rounds,
+            "current_round": self.current_round,
         }
 
+    @classmethod
+    def restore(cls, data: dict, catalog: CardCatalog) -> "GameState":
+        """Recria um `GameState` a partir de `dump()`; os ids devem ser de `catalog`."""
+        players = []
+        for pd in data["players"]:
+            p = Player(pd["id"], pd["name"])
+            p.score = pd["score"]
+            p.hand = decode_array("I", pd["hand"])
+            players.append(p)
+        white = Deck.restore(catalog, data["white_deck"])
+        black = Deck.restore(catalog, data["black_deck"]) if data["black_deck"] is not None else None
+        gs = cls(players, white, black, hand_size=data["hand_size"], seed=data["seed"])
+        version, internal, gauss_next = data["rng"]
+        gs.rng.setstate((version, tuple(decode_array("I", internal)), gauss_next))
+        gs.discard = decode_array("I", data["discard"])
+        gs.black_discard = decode_array("I", data["black_discard"])
+        gs.current_black_id = data["current_black_id"]
+        gs.turns.player_ids = list(data["turns"]["player_ids"])
+        gs.turns.index = data["turns"]["index"]
+        gs.started = data["started"]
+        gs.submissions = dict(data["submissions"])
+        gs.voting = VotingSession.restore(data["voting"]) if data["voting"] is not None else None
+        gs.voting_open = data["voting_open"]
+        gs._max_rounds = data["max_rounds"]
+        gs.current_round = data["current_round"]
+        return gs
+
     def cast_vote(self, voter_id: str, voted_player_id: str) -> Optional[str]:
         """Registra o voto de `voter_id` para `voted_player_id`.
 
@@ -156,58 +366,13 @@ class GameState:
         if not self.voting_open or self.voting is None:
             raise RuntimeError("No active voting session")
         self.voting.cast_vote(voter_id, voted_player_id)
+        self.touch()
         # quando todos votarem, resolve
-        if len(self.voting.votes) == len(self.players):
+        if self.voting.is_complete():
             # apura resultados e detecta empate
             leading = self.voting.leading_candidates()
             if len(leading) == 1:
-                winner_id = leading[0]
-                winner = self._get_player(winner_id)
-                winner.score += 1
-                # mover submissões para descarte
-                for c in self.submissions.values():
-                    self.discard.append(c)
-                # limpar estado de rodada
-                self.submissions.clear()
-                self.voting = None
-                self.voting_open = False
-                # cada jogador ganha exatamente 1 carta ao final da rodada (se houver no deck)
-                for p in self.players:
-                    # se o deck acabou, reembaralha o discard de volta no deck
-                    self._replenish_deck_if_needed()
-                    if not self.white_deck.is_empty():
-                        p.draw(self.white_deck, 1)
-                # incrementar o contador de rodadas
-                self.current_round += 1
-                # sortear uma nova carta preta para a próxima rodada (se houver baralho de pretas)
-                if self.black_deck:
-                    try:
-                        # tenta tirar aleatoriamente uma carta preta
-                        # antes de sortear, movemos a carta preta atual para o descarte (se existir)
-                        if getattr(self, 'current_black_card', None):
-                            try:
-                                self.black_discard.append(self.current_black_card)
-                            except Exception:
-                                pass
-                        try:
-                            # garantir reabastecimento se necessário
-                            try:
-                                self._replenish_black_if_needed()
-                            except Exception:
-                                pass
-                            self.current_black_card = self.black_deck.draw_random_black()
-                        except Exception:
-                            maybe = self.black_deck.draw(1)
-                            if maybe:
-                                self.current_black_card = maybe[0]
-                            else:
-                                try:
-                                    self.current_black_card = self.black_deck.draw_black()
-                                except Exception:
-                                    self.current_black_card = None
-                    except Exception:
-                        self.current_black_card = None
-                return winner_id
+                return self._finish_round(leading[0])
             else:
                 # empate -> abre uma nova rodada de votação apenas entre os empatados
                 tied_submissions = {pid: self.submissions[pid] for pid in leading}
@@ -219,6 +384,43 @@ class GameState:
                 return None
         return None
 
+    def expire_voting(self) -> Optional[str]:
+        """Encerra a votação quando o prazo acaba, só com os votos já dados.
+
+        Um empate é decidido por sorteio (RNG da sala) em vez de abrir outra
+        votação; sem nenhum voto a rodada termina sem vencedor. Retorna o
+        `player_id` vencedor, ou None.
+        """
+        if not self.voting_open or self.voting is None:
+            raise RuntimeError("No active voting session")
+        leading = self.voting.leading_candidates() if self.voting.votes else []
+        winner_id = self.rng.choice(leading) if leading else None
+        self._finish_round(winner_id)
+        self.touch()
+        return winner_id
+
+    def _finish_round(self, winner_id: Optional[str]) -> Optional[str]:
+        if winner_id is not None:
+            winner = self._get_player(winner_id)
+            winner.score += 1
+        # mover submissões para descarte
+        self.discard.extend(self.submissions.values())
+        # limpar estado de rodada
+        self.submissions.clear()
+        self.voting = None
+        self.voting_open = False
+        # cada jogador ganha exatamente 1 carta ao final da rodada (se houver no deck)
+        self._deal_to_players(1)
+        # incrementar o contador de rodadas
+        self.current_round += 1
+        # sortear uma nova carta preta para a próxima rodada (se houver baralho de pretas)
+        if self.black_deck is not None:
+            # antes de sortear, movemos a carta preta atual para o descarte (se existir)
+            if self.current_black_id is not None:
+                self.black_discard.append(self.current_black_id)
+            self._draw_black_card()
+        return winner_id
+
     def is_finished(self) -> bool:
         """Retorna True se o jogo atingiu o número máximo de rodadas (quando configurado)."""
         if self.max_rounds is None:
@@ -229,6 +431,6 @@ class GameState:
         """Se o deck estiver vazio e houver cartas no descarte, move-as para o deck e embaralha."""
         if self.white_deck.is_empty() and self.discard:
             # move todas as cartas do descarte para o deck branco e embaralha
-            self.white_deck.add_many(self.discard)
+            self.white_deck.add_ids(self.discard)
             self.white_deck.shuffle()
-            self.discard.clear()
+            del self.discard[:]
@@ -0,0 +1,113 @@
+import mmap
+from array import array
+from typing import Iterator, Sequence, Tuple
+
+# número máximo de respostas guardado por carta (as tabelas do catálogo usam 1 byte)
+MAX_BLANKS = 255
+_WHITESPACE = b" \t\r\n\x0b\x0c"
+
+
+def parse_black_line(line: str) -> Tuple[str, int]:
+    """Interpreta uma linha `<blanks>\\t<texto>` de um pack de cartas pretas.
+
+    Linhas sem o prefixo numérico valem como prompts de 1 resposta.
+    """
+    parts = line.split("\t", 1)
+    if len(parts) == 2 and parts[0].isdigit():
+        return parts[1], min(int(parts[0]), MAX_BLANKS)
+    return line, 1
+
+
+def iter_pack_lines(path: str, black: bool = False) -> Iterator[Tuple[str, int]]:
+    """Lê um pack linha a linha, gerando `(texto, blanks)` sem carregar o arquivo inteiro.
+
+    - cartas brancas: cada linha não vazia é uma carta (`blanks` = 0).
+    - cartas pretas (`black=True`): formato `<blanks>\\t<texto>`.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if not s:
+                continue
+            yield parse_black_line(s) if black else (s, 0)
+
+
+class MappedTexts(Sequence[str]):
+    """Textos de um pack mapeado em memória (`mmap`).
+
+    Na abertura o arquivo é percorrido uma vez para registrar apenas os
+    offsets (início/fim em bytes) de cada carta e o número de respostas; o
+    texto só é decodificado quando `texts[i]` é acessado. Várias instâncias
+    (ou processos) que mapeiam o mesmo arquivo compartilham as páginas do SO.
+    """
+
+    def __init__(self, path: str, black: bool = False) -> None:
+        self.path = path
+        self._starts = array("Q")
+        self._ends = array("Q")
+        self.blanks = bytearray()
+        with open(path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # arquivo vazio não pode ser mapeado
+                self._mm = b""
+        self._scan(black)
+
+    def _scan(self, black: bool) -> None:
+        mm = self._mm
+        size = len(mm)
+        pos = 0
+        while pos < size:
+            nl = mm.find(b"\n", pos)
+            end = size if nl < 0 else nl
+            start = pos
+            pos = end + 1
+            # strip sem copiar a linha
+            while start < end and mm[start] in _WHITESPACE:
+                start += 1
+            while end > start and mm[end - 1] in _WHITESPACE:
+                end -= 1
+            if start == end:
+                continue
+            blanks = 0
+            if black:
+                blanks = 1
+                tab = mm.find(b"\t", start, end)
+                if tab > start and mm[start:tab].isdigit():
+                    blanks = min(int(mm[start:tab]), MAX_BLANKS)
+                    start = tab + 1
+            self._starts.append(start)
+            self._ends.append(end)
+            self.blanks.append(blanks)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._mm[self._starts[index]:self._ends[index]].decode("utf-8")
+
+    def close(self) -> None:
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+
+class ConcatTexts(Sequence[str]):
+    """Concatena duas sequências de textos sem copiá-las (ex.: brancas + pretas)."""
+
+    def __init__(self, first: Sequence[str], second: Sequence[str]) -> None:
+        self._first = first
+        self._second = second
+
+    def __len__(self) -> int:
+        return len(self._first) + len(self._second)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        n = len(self._first)
+        return self._first[index] if index < n else self._second[index - n]
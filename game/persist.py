@@ -0,0 +1,25 @@
+"""Codificação compacta de arrays de ids para os dumps de estado (`dump()`/`restore()`).
+
+Os arrays viram base64 dos bytes little-endian, então um dump cabe num
+documento JSON e restaurar um deck custa uma cópia de memória, não um
+`int()` por carta.
+"""
+
+import base64
+import sys
+from array import array
+
+
+def encode_array(values: array) -> str:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def decode_array(typecode: str, text: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
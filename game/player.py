@@ -1,41 +1,41 @@
-from typing import List
+from array import array
+from typing import Iterable
 
-from .card import Card
 from .deck import Deck
 
 
 class Player:
     """Representa um jogador e sua mão de cartas.
 
-    Implementação simples focada em clareza e testabilidade.
+    Implementação simples focada em clareza e testabilidade. A mão guarda
+    apenas ids do `CardCatalog` do deck (use `catalog.cards(player.hand)`
+    para obter as cartas).
     """
 
     def __init__(self, player_id: str, name: str):
         self.id: str = player_id
         self.name: str = name
-        self.hand: List[Card] = []
+        self.hand: array = array("I")
         self.score: int = 0
 
     def draw(self, deck: Deck, count: int = 1) -> None:
         """Puxa `count` cartas do `deck` para a mão do jogador."""
-        cards = deck.draw(count)
-        self.hand.extend(cards)
+        self.hand.extend(deck.draw_ids(count))
 
-    def play(self, index: int) -> Card:
-        """Joga a carta no índice `index` da mão e a remove.
+    def play(self, index: int) -> int:
+        """Joga a carta no índice `index` da mão, a remove e retorna seu id.
 
         Lança IndexError se o índice for inválido.
         """
-        card = self.hand.pop(index)
-        return card
+        return self.hand.pop(index)
 
-    def receive(self, cards: List[Card]) -> None:
-        """Recebe uma lista de cartas (por exemplo, como recompensa)."""
-        self.hand.extend(cards)
+    def receive(self, card_ids: Iterable[int]) -> None:
+        """Recebe uma lista de ids de cartas (por exemplo, como recompensa)."""
+        self.hand.extend(card_ids)
 
     def clear_hand(self) -> None:
         """Remove todas as cartas da mão."""
-        self.hand.clear()
+        del self.hand[:]
 
     def __repr__(self) -> str:
         return f"Player(id={self.id!r}, name={self.name!r}, hand={len(self.hand)} cards, score={self.score})"
@@ -0,0 +1,285 @@
+"""Simulação headless de partidas para avaliar o balanceamento dos packs.
+
+Cada partida roda sobre `GameState`/`VotingSession` de verdade (as mesmas
+regras do servidor), sem rede e sem saída no terminal. Os votos vêm de uma
+política plugável (`POLICIES` ou qualquer função de nível de módulo com a
+mesma assinatura) e as estatísticas são agregadas por carta em `SimStats`:
+
+- cartas brancas: quantas vezes foram jogadas e quantas vezes venceram;
+- cartas pretas: em quantas rodadas apareceram;
+- pares (preta, branca): jogadas e vitórias de cada combinação.
+
+`run_simulation` divide as partidas em lotes, roda os lotes num
+`ProcessPoolExecutor` e vai juntando os resultados conforme os lotes
+terminam, regravando o arquivo de resultados periodicamente. Com a mesma
+semente o resultado é o mesmo, independentemente do número de processos.
+
+Não usamos NumPy: mãos e decks já são arrays de ids, então o custo por
+rodada fica dominado pelas regras do jogo, que precisam ser as mesmas do
+servidor.
+"""
+
+import csv
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .card import CardType
+from .catalog import CardCatalog, default_catalog
+from .deck import Deck
+from .game_state import GameState
+from .player import Player
+
+# política de voto: (rng, voter_id, candidatos [(player_id, card_id)] sem o próprio votante,
+# id da carta preta, catálogo) -> player_id escolhido
+VoterPolicy = Callable[[random.Random, str, List[Tuple[str, int]], Optional[int], CardCatalog], str]
+
+# limite de desempates seguidos numa rodada; depois disso a partida é abandonada
+MAX_RUNOFFS = 20
+
+
+def random_policy(rng: random.Random, voter_id: str, candidates: List[Tuple[str, int]], black_id: Optional[int], catalog: CardCatalog) -> str:
+    """Vota numa submissão qualquer (modelo nulo: todas as cartas empatam em média)."""
+    return candidates[rng.randrange(len(candidates))][0]
+
+
+def first_policy(rng: random.Random, voter_id: str, candidates: List[Tuple[str, int]], black_id: Optional[int], catalog: CardCatalog) -> str:
+    """Vota sempre na primeira submissão (mesma estratégia do `run.py`)."""
+    return candidates[0][0]
+
+
+def longest_policy(rng: random.Random, voter_id: str, candidates: List[Tuple[str, int]], black_id: Optional[int], catalog: CardCatalog) -> str:
+    """Prefere a resposta mais longa; empates são sorteados."""
+    sizes = [len(catalog.text(cid)) for _, cid in candidates]
+    best = max(sizes)
+    options = [pid for (pid, _), size in zip(candidates, sizes) if size == best]
+    return options[rng.randrange(len(options))]
+
+
+POLICIES: Dict[str, VoterPolicy] = {
+    "random": random_policy,
+    "first": first_policy,
+    "longest": longest_policy,
+}
+
+
+class SimStats:
+    """Contadores agregados de uma ou mais simulações (somáveis com `merge`)."""
+
+    def __init__(self, size: int) -> None:
+        # índices são ids do catálogo (1..size); a posição 0 não é usada
+        self.played = array("Q", bytes(8 * (size + 1)))
+        self.wins = array("Q", bytes(8 * (size + 1)))
+        self.prompts = array("Q", bytes(8 * (size + 1)))
+        # (id da preta, id da branca) -> [jogadas, vitórias]
+        self.pairs: Dict[Tuple[int, int], List[int]] = {}
+        self.games = 0
+        self.rounds = 0
+        self.abandoned = 0
+
+    def merge(self, other: "SimStats") -> None:
+        for mine, theirs in ((self.played, other.played), (self.wins, other.wins), (self.prompts, other.prompts)):
+            for i, value in enumerate(theirs):
+                if value:
+                    mine[i] += value
+        pairs = self.pairs
+        for key, (plays, wins) in other.pairs.items():
+            entry = pairs.get(key)
+            if entry is None:
+                pairs[key] = [plays, wins]
+            else:
+                entry[0] += plays
+                entry[1] += wins
+        self.games += other.games
+        self.rounds += other.rounds
+        self.abandoned += other.abandoned
+
+    def win_rate(self, card_id: int) -> float:
+        played = self.played[card_id]
+        return self.wins[card_id] / played if played else 0.0
+
+
+def _resolve_policy(policy: Union[str, VoterPolicy]) -> VoterPolicy:
+    if callable(policy):
+        return policy
+    try:
+        return POLICIES[policy]
+    except KeyError:
+        raise ValueError(f"unknown voter policy {policy!r} (choose from {sorted(POLICIES)})") from None
+
+
+def simulate_games(catalog: CardCatalog, games: int, rounds: int = 10, players: int = 4, hand_size: int = 7, seed: int = 0, policy: Union[str, VoterPolicy] = "random") -> SimStats:
+    """Simula `games` partidas de `rounds` rodadas e devolve as estatísticas.
+
+    A partida `i` usa a semente `seed + i`, então dividir um intervalo de
+    partidas em lotes dá o mesmo resultado que rodá-lo de uma vez.
+    """
+    if players < 3:
+        raise ValueError("at least 3 players are needed to break voting ties")
+    vote = _resolve_policy(policy)
+    stats = SimStats(len(catalog))
+    player_ids = [f"p{i}" for i in range(1, players + 1)]
+    for game_no in range(games):
+        gs = GameState(
+            [Player(pid, pid) for pid in player_ids],
+            Deck.from_catalog(catalog, CardType.WHITE),
+            Deck.from_catalog(catalog, CardType.BLACK),
+            hand_size=hand_size,
+            seed=seed + game_no,
+        )
+        rng = gs.rng
+        gs.start()
+        stats.games += 1
+        for _ in range(rounds):
+            if not _play_round(gs, rng, vote, stats):
+                stats.abandoned += 1
+                break
+            stats.rounds += 1
+    return stats
+
+
+def _play_round(gs: GameState, rng: random.Random, vote: VoterPolicy, stats: SimStats) -> bool:
+    black_id = gs.current_black_id
+    for p in gs.players:
+        if p.hand:
+            gs.submit_card(p.id, rng.randrange(len(p.hand)))
+    submitted = dict(gs.submissions)
+    if not gs.voting_open:
+        return False
+    if black_id is not None:
+        stats.prompts[black_id] += 1
+    pairs = stats.pairs
+    for cid in submitted.values():
+        stats.played[cid] += 1
+        entry = pairs.get((black_id or 0, cid))
+        if entry is None:
+            pairs[(black_id or 0, cid)] = [1, 0]
+        else:
+            entry[0] += 1
+    catalog = gs.catalog
+    for _ in range(MAX_RUNOFFS):
+        candidates = list(gs.voting.submissions.items())
+        winner = None
+        for p in gs.players:
+            options = [c for c in candidates if c[0] != p.id]
+            winner = gs.cast_vote(p.id, vote(rng, p.id, options, black_id, catalog))
+        if winner is not None:
+            cid = submitted[winner]
+            stats.wins[cid] += 1
+            pairs[(black_id or 0, cid)][1] += 1
+            return True
+    return False
+
+
+# --- execução em paralelo ---------------------------------------------------
+
+# especificação do catálogo passada aos processos: None (cartas de exemplo),
+# ("pack", caminho do .cahpack) ou ("text", white.txt, black.txt)
+CatalogSpec = Optional[Tuple[str, ...]]
+
+_worker_catalogs: Dict[CatalogSpec, CardCatalog] = {}
+
+
+def load_catalog(spec: CatalogSpec) -> CardCatalog:
+    """Carrega (uma vez por processo) o catálogo descrito por `spec`."""
+    catalog = _worker_catalogs.get(spec)
+    if catalog is None:
+        if spec is None:
+            catalog = default_catalog()
+        elif spec[0] == "pack":
+            from .binpack import load_pack
+
+            catalog = load_pack(spec[1])
+        elif spec[0] == "text":
+            from .binpack import load_pack_cached
+
+            catalog = load_pack_cached(spec[1], spec[2])
+        else:
+            raise ValueError(f"unknown catalog spec {spec!r}")
+        _worker_catalogs[spec] = catalog
+    return catalog
+
+
+def _run_shard(spec: CatalogSpec, games: int, rounds: int, players: int, hand_size: int, seed: int, policy: Union[str, VoterPolicy]) -> SimStats:
+    return simulate_games(load_catalog(spec), games, rounds, players, hand_size, seed, policy)
+
+
+def _shards(games: int, shard_size: int, seed: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, games, shard_size):
+        yield min(shard_size, games - start), seed + start
+
+
+def run_simulation(
+    games: int,
+    rounds: int = 10,
+    players: int = 4,
+    hand_size: int = 7,
+    seed: int = 0,
+    policy: Union[str, VoterPolicy] = "random",
+    catalog: CatalogSpec = None,
+    workers: Optional[int] = None,
+    shard_size: int = 200,
+    out_path: Optional[str] = None,
+    flush_interval: float = 5.0,
+    progress: Optional[Callable[[SimStats], None]] = None,
+) -> SimStats:
+    """Simula `games` partidas em lotes de `shard_size`, em até `workers` processos.
+
+    Com `out_path`, os resultados agregados são regravados (de forma atômica)
+    a cada `flush_interval` segundos enquanto os lotes terminam, e no final.
+    `workers=1` roda tudo no processo atual. Políticas customizadas precisam
+    ser funções de nível de módulo (são enviadas aos processos via pickle).
+    """
+    _resolve_policy(policy)
+    total = SimStats(len(load_catalog(catalog)))
+    last_flush = time.monotonic()
+
+    def collect(stats: SimStats) -> None:
+        nonlocal last_flush
+        total.merge(stats)
+        if progress is not None:
+            progress(total)
+        if out_path and time.monotonic() - last_flush >= flush_interval:
+            write_results(total, load_catalog(catalog), out_path)
+            last_flush = time.monotonic()
+
+    shards = list(_shards(games, shard_size, seed))
+    if workers == 1 or len(shards) <= 1:
+        for count, shard_seed in shards:
+            collect(_run_shard(catalog, count, rounds, players, hand_size, shard_seed, policy))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_shard, catalog, count, rounds, players, hand_size, shard_seed, policy) for count, shard_seed in shards]
+            for fut in as_completed(futures):
+                collect(fut.result())
+    if out_path:
+        write_results(total, load_catalog(catalog), out_path)
+    return total
+
+
+def write_results(stats: SimStats, catalog: CardCatalog, out_path: str) -> None:
+    """Grava as estatísticas por carta em `out_path` (CSV) e por par em `<out_path>.pairs.csv`.
+
+    Cada arquivo é escrito linha a linha num temporário e trocado atomicamente,
+    então quem lê nunca vê um arquivo pela metade.
+    """
+    _write_csv(out_path, ("id", "type", "text", "played", "wins", "win_rate", "prompt_rounds"), (
+        (cid, catalog.type_of(cid).value, catalog.text(cid), stats.played[cid], stats.wins[cid], f"{stats.win_rate(cid):.6f}", stats.prompts[cid])
+        for cid in range(1, len(catalog) + 1)
+    ))
+    _write_csv(f"{out_path}.pairs.csv", ("black_id", "white_id", "played", "wins", "win_rate"), (
+        (black, white, plays, wins, f"{wins / plays:.6f}")
+        for (black, white), (plays, wins) in sorted(stats.pairs.items())
+    ))
+
+
+def _write_csv(path: str, header: Sequence[str], rows) -> None:
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
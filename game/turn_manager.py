@@ -22,6 +22,11 @@ class TurnManager:
             return
         self.index = (self.index + 1) % len(self.player_ids)
 
+    def add(self, player_id: str) -> None:
+        """Adiciona `player_id` ao fim da ordem (ignora ids repetidos)."""
+        if player_id not in self.player_ids:
+            self.player_ids.append(player_id)
+
     def remove(self, player_id: str) -> None:
         if player_id not in self.player_ids:
             return
@@ -1,25 +1,35 @@
 from typing import Dict, Optional, Iterable, List
 
-from .card import Card
-
 
 class VotingSession:
     """Gerencia submissões e votos para uma rodada de votação.
 
-    - `submissions`: mapping de `player_id` -> `Card` (cartas submetidas)
+    - `submissions`: mapping de `player_id` -> id da carta submetida (ver `CardCatalog`)
     - `votes`: mapping de `voter_id` -> `voted_player_id`
     - `voters`: conjunto de `player_id` que estão autorizados a votar (normalmente todos os jogadores).
 
+    A contagem é incremental: cada voto (ou troca de voto) atualiza só os
+    candidatos envolvidos e o conjunto de líderes, então `cast_vote`,
+    `leading_candidates()` e `is_complete()` não percorrem os votos, mesmo
+    com milhares de votantes (ex.: plateia).
+
     Regras: não é permitido votar em si mesmo.
     """
 
-    def __init__(self, submissions: Dict[str, Card], voters: Optional[Iterable[str]] = None):
-        self.submissions: Dict[str, Card] = dict(submissions)
+    def __init__(self, submissions: Dict[str, int], voters: Optional[Iterable[str]] = None):
+        self.submissions: Dict[str, int] = dict(submissions)
         self.votes: Dict[str, str] = {}
         if voters is None:
             self.voters = set(self.submissions.keys())
         else:
             self.voters = set(voters)
+        self._counts: Dict[str, int] = {pid: 0 for pid in self.submissions}
+        # candidatos agrupados por número de votos (dict usado como conjunto ordenado)
+        self._by_count: Dict[int, Dict[str, None]] = {0: dict.fromkeys(self.submissions)} if self.submissions else {}
+        self._max: int = 0
+        # posição de cada candidato, para devolver líderes na ordem das submissões
+        self._order: Dict[str, int] = {pid: i for i, pid in enumerate(self.submissions)}
+        self._leaders: Optional[List[str]] = None
 
     def cast_vote(self, voter_id: str, voted_player_id: str) -> None:
         if voter_id not in self.voters:
@@ -28,19 +38,65 @@ class VotingSession:
             raise ValueError("Voted player is not part of this voting session")
         if voter_id == voted_player_id:
             raise ValueError("Cannot vote for yourself")
+        previous = self.votes.get(voter_id)
+        if previous == voted_player_id:
+            return
+        if previous is not None:
+            self._move(previous, -1)
+        self._move(voted_player_id, 1)
         self.votes[voter_id] = voted_player_id
 
+    def add_voter(self, voter_id: str) -> None:
+        """Autoriza mais um votante (ex.: espectador) nesta sessão."""
+        self.voters.add(voter_id)
+
+    def remove_voter(self, voter_id: str) -> None:
+        """Remove o votante e retira o voto dele, se houver."""
+        self.voters.discard(voter_id)
+        previous = self.votes.pop(voter_id, None)
+        if previous is not None:
+            self._move(previous, -1)
+
+    def _move(self, candidate: str, delta: int) -> None:
+        old = self._counts[candidate]
+        new = old + delta
+        bucket = self._by_count[old]
+        del bucket[candidate]
+        if not bucket:
+            del self._by_count[old]
+            # o único líder perdeu um voto: o novo máximo é exatamente `old - 1`
+            if old == self._max and delta < 0:
+                self._max = new
+        self._by_count.setdefault(new, {})[candidate] = None
+        self._counts[candidate] = new
+        if new > self._max:
+            self._max = new
+        self._leaders = None
+
+    def votes_for(self, player_id: str) -> int:
+        return self._counts.get(player_id, 0)
+
     def tally(self) -> Dict[str, int]:
-        counts: Dict[str, int] = {pid: 0 for pid in self.submissions.keys()}
-        for voted in self.votes.values():
-            counts[voted] = counts.get(voted, 0) + 1
-        return counts
+        return dict(self._counts)
 
     def leading_candidates(self) -> List[str]:
         """Retorna a lista de candidatos com maior número de votos (possível empate)."""
-        counts = self.tally()
-        if not counts:
-            return []
-        max_votes = max(counts.values())
-        return [pid for pid, c in counts.items() if c == max_votes]
+        if self._leaders is None:
+            leaders = self._by_count.get(self._max, {})
+            self._leaders = sorted(leaders, key=self._order.__getitem__)
+        return list(self._leaders)
+
+    def is_complete(self) -> bool:
+        """True quando todos os votantes autorizados já votaram."""
+        return len(self.votes) >= len(self.voters)
+
+    def dump(self) -> dict:
+        return {"submissions": dict(self.submissions), "votes": dict(self.votes), "voters": sorted(self.voters)}
 
+    @classmethod
+    def restore(cls, data: dict) -> "VotingSession":
+        """Recria a sessão de `dump()`; a contagem é reconstruída refazendo os votos."""
+        session = cls(data["submissions"], voters=data["voters"])
+        for voter, voted in data["votes"].items():
+            session.cast_vote(voter, voted)
+        return session
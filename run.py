@@ -12,9 +12,9 @@ from game.game_state import GameState
 from game.cards_data import make_cah_like_decks
 
 
-def _replicate_deck(deck: Deck, factor: int = 3) -> Deck:
+def _replicate_deck(deck: Deck, factor: int = 3, first_id: int = 1) -> Deck:
     cards = []
-    idx = 1
+    idx = first_id
     for _ in range(factor):
         for c in deck.cards:
             cards.append(Card(idx, c.text, type=c.type, blanks=getattr(c, "blanks", 0)))
@@ -35,7 +35,8 @@ def play_game(mode: str, demo_limit_for_infinite: int = 5, hand_size: int = 3) -
 
     white, black = make_cah_like_decks()
     white = _replicate_deck(white, factor=5)
-    black = _replicate_deck(black, factor=5)
+    # os ids das pretas continuam depois dos das brancas: o deck combinado mantém os ids
+    black = _replicate_deck(black, factor=5, first_id=len(white) + 1)
 
     players = [Player("p1", "Alice"), Player("p2", "Bob"), Player("p3", "Carol")]
     combined = Deck(list(white.cards) + list(black.cards))
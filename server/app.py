@@ -5,338 +5,1244 @@ connect to the WebSocket at `/ws` without needing a `?server=` workaround.
 """
 
 import asyncio
-import json
 import logging
 import os
-from typing import Dict, Set
+import time
+from collections import deque
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, List, Optional, Set, Tuple, Union
 
 from aiohttp import web
 
-# basic logging for debugging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s %(message)s')
-
-from game.card import Card
+from game.card import CardType
+from game.binpack import load_pack, load_pack_cached
+from game.catalog import CardCatalog, default_catalog
 from game.deck import Deck
 from game.player import Player
 from game.game_state import GameState
-from game.cards_data import make_cah_like_decks
+from server import compression, metrics
+from server.hibernate import SUFFIX, RoomStore
+from server.journal import Journal
+from server import lobby
+from server.lobby import VIEWS, Lobby
+from server.codec import JSON, MSGPACK, SUBPROTOCOLS, Codec, Encoded, Reply, for_subprotocol
+from server.compression import Shared
+from server.outbox import Frame, Outbox
+from server.timers import Timer, TimerWheel
+from server.protocol import INVALID_JSON, INVALID_MESSAGE, UNKNOWN_ACTION, ActionTable, Field, Schema, error_frame
+from server.logging_config import configure_logging, log_payload
+
 
+# named logger so levels can be set per module (LOG_LEVELS=server.app=DEBUG)
+log = logging.getLogger('server.app')
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 STATIC_DIR = os.path.normpath(os.path.join(BASE_DIR, 'web'))
+# how many state patches a room keeps for delta clients that fall behind
+DELTA_HISTORY = 32
+# commands a room's mailbox holds before senders wait (backpressure)
+ROOM_QUEUE_SIZE = int(os.environ.get('ROOM_QUEUE_SIZE', '256'))
+# rooms without connections are hibernated to disk after ROOM_IDLE_SECONDS
+# without commands and deleted ROOM_TTL_SECONDS after that; the sweep runs
+# every ROOM_SWEEP_SECONDS and hibernates at most HIBERNATE_BATCH rooms
+ROOM_IDLE_SECONDS = float(os.environ.get('ROOM_IDLE_SECONDS', '600'))
+ROOM_TTL_SECONDS = float(os.environ.get('ROOM_TTL_SECONDS', '86400'))
+ROOM_SWEEP_SECONDS = float(os.environ.get('ROOM_SWEEP_SECONDS', '30'))
+HIBERNATE_BATCH = int(os.environ.get('HIBERNATE_BATCH', '256'))
+# seats per room: `join` refuses new players beyond it (the lobby's "free seats")
+ROOM_MAX_PLAYERS = int(os.environ.get('ROOM_MAX_PLAYERS', '10'))
+# `create` only takes a client-chosen seed when this is set (debugging): a
+# known seed reveals every hand and upcoming black card of the room
+ALLOW_CLIENT_SEED = os.environ.get('ALLOW_CLIENT_SEED', '0') not in ('', '0', 'false')
+# round deadlines (0 turns one off): players that have not submitted after
+# ROUND_SUBMIT_SECONDS play a random card, voting closes after
+# ROUND_VOTE_SECONDS with the votes cast so far, and a player who misses
+# ROUND_AFK_LIMIT deadlines in a row is removed from the game. The deadlines
+# of every room live on one timer wheel ticking every ROUND_TIMER_TICK seconds.
+ROUND_SUBMIT_SECONDS = float(os.environ.get('ROUND_SUBMIT_SECONDS', '90'))
+ROUND_VOTE_SECONDS = float(os.environ.get('ROUND_VOTE_SECONDS', '60'))
+ROUND_AFK_LIMIT = int(os.environ.get('ROUND_AFK_LIMIT', '4'))
+ROUND_TIMER_TICK = float(os.environ.get('ROUND_TIMER_TICK', '1'))
+
+
+def _load_catalog() -> CardCatalog:
+    """Pick the card catalog for this process.
+
+    `CARDS_PACK` points to a precompiled `.cahpack`; `CARDS_WHITE`/`CARDS_BLACK`
+    point to text packs that are compiled once into the pack cache. Without
+    either, the built-in sample cards are used.
+    """
+    pack = os.environ.get('CARDS_PACK')
+    if pack:
+        return load_pack(pack)
+    white, black = os.environ.get('CARDS_WHITE'), os.environ.get('CARDS_BLACK')
+    if white and black:
+        return load_pack_cached(white, black, os.environ.get('CARDS_CACHE_DIR'))
+    return default_catalog()
+
+
+# process-wide, read-only card catalog shared by every room; rooms only hold card ids
+CATALOG = _load_catalog()
+
+# a state patch: changed top-level fields (new values, null included) and the
+# keys of removed fields
+Patch = Tuple[dict, List[str]]
 
 
 class Room:
-    def __init__(self, room_id: str) -> None:
+    def __init__(self, room_id: str, seed: Optional[int] = None, game: Optional[GameState] = None, created: Optional[float] = None) -> None:
         self.room_id = room_id
-        white, black = make_cah_like_decks()
-        # keep white and black decks separate
-        self.white_deck = Deck(list(white.cards))
-        self.black_deck = Deck(list(black.cards))
-        self.game = GameState([], self.white_deck, self.black_deck, hand_size=3)
+        # creation time (epoch seconds): the lobby lists rooms in this order
+        self.created = created if created is not None else time.time()
+        if game is None:
+            # keep white and black decks separate (both are id arrays over the shared catalog)
+            white_deck = Deck.from_catalog(CATALOG, CardType.WHITE)
+            black_deck = Deck.from_catalog(CATALOG, CardType.BLACK)
+            # each room has its own seeded RNG (recorded in `dump()`) so games are reproducible
+            game = GameState([], white_deck, black_deck, hand_size=3, seed=seed)
+        self.game = game
+        self.white_deck = game.white_deck
+        self.black_deck = game.black_deck
         # conns are aiohttp.web.WebSocketResponse objects
         self.conns: Set[web.WebSocketResponse] = set()
         # players that signalled ready for the next game
         self.ready: Set[str] = set()
         # map websocket connection -> player_id (set during join)
         self.conn_player: Dict[web.WebSocketResponse, str] = {}
+        # delta protocol: sequence number of the latest public state, recent
+        # patches (seq, patch) and, per delta connection, the seq it has applied
+        # and the last hand it was sent
+        self.seq = 0
+        self._last_public: Optional[dict] = None
+        self._history: Deque[Tuple[int, Patch]] = deque(maxlen=DELTA_HISTORY)
+        self.conn_seq: Dict[web.WebSocketResponse, int] = {}
+        self.conn_hand: Dict[web.WebSocketResponse, list] = {}
+        # actor: commands for this room run one at a time on its own task
+        # (created on the first command, so a room can be built without a loop)
+        self.mailbox: Optional['asyncio.Queue[Command]'] = None
+        self._actor: Optional['asyncio.Task[None]'] = None
+        # monotonic time of the last command or disconnect (idle detection)
+        self.last_active = time.monotonic()
+        # round deadline: the phase it was set for (see `_phase`), its timer on
+        # TIMERS and when it expires (epoch seconds, shown to clients)
+        self.phase: Optional[Tuple[int, Any]] = None
+        self.deadline: Optional[Timer] = None
+        self.deadline_at: Optional[float] = None
+        # player id -> deadlines missed in a row (not persisted)
+        self.missed: Dict[str, int] = {}
+        # last `dump()` and the (game version, ready set) it was taken at
+        self._dump: Optional[dict] = None
+        self._dump_key: Optional[Tuple[int, FrozenSet[str]]] = None
+
+    async def call(self, handler: 'Handler', ws: web.WebSocketResponse, msg: dict) -> None:
+        """Run `handler(room, ws, msg)` on the room's actor task and wait for it.
+
+        Commands are applied in arrival order, never concurrently with another
+        command of the same room. When the mailbox is full the caller waits
+        (and stops reading from its socket) until the room catches up.
+        """
+        self.last_active = time.monotonic()
+        if self._actor is None:
+            self.mailbox = asyncio.Queue(ROOM_QUEUE_SIZE)
+            self._actor = asyncio.ensure_future(self._run())
+        done = asyncio.get_running_loop().create_future()
+        await self.mailbox.put((handler, ws, msg, done))
+        await done
+
+    async def _run(self) -> None:
+        mailbox = self.mailbox
+        while True:
+            handler, ws, msg, done = await mailbox.get()
+            if done.cancelled():
+                # the sender went away while the command was queued
+                continue
+            try:
+                await handler(self, ws, msg)
+            except Exception as e:
+                if not done.done():
+                    done.set_exception(e)
+                else:
+                    log.exception('room %s: command failed', self.room_id)
+            else:
+                if not done.done():
+                    done.set_result(None)
+            _index(self)
+            _arm_deadline(self)
+
+    def queued(self) -> int:
+        return self.mailbox.qsize() if self.mailbox is not None else 0
+
+    def stop(self) -> None:
+        """Cancel the actor task and the round deadline; queued commands are dropped."""
+        if self._actor is not None:
+            self._actor.cancel()
+            self._actor = None
+            self.mailbox = None
+        if self.deadline is not None:
+            self.deadline.cancel()
+        self.phase = self.deadline = self.deadline_at = None
+
+    def dump(self) -> dict:
+        """Persistent room state (for journal snapshots); connections are not included.
+
+        Cached until the game (`GameState.version`) or the ready set changes,
+        so a journal snapshot only serializes the rooms that changed since the
+        previous one. The result is shared and handed to the journal's writer
+        thread: never mutate it.
+        """
+        key = (self.game.version, frozenset(self.ready))
+        if key != self._dump_key:
+            self._dump = {"room": self.room_id, "created": self.created, "ready": sorted(self.ready), "game": self.game.dump()}
+            self._dump_key = key
+        return self._dump
+
+    @classmethod
+    def restore(cls, data: dict) -> 'Room':
+        room = cls(data["room"], game=GameState.restore(data["game"], CATALOG), created=data.get("created"))
+        room.ready.update(data["ready"])
+        return room
 
     def snapshot(self) -> dict:
-        s = self.game.snapshot()
+        # the game snapshot is cached and read-only; copy before adding room fields
+        s = dict(self.game.snapshot())
         s.update({"room": self.room_id, "ready": list(self.ready)})
         return s
 
+    def public_state(self, base: Optional[dict] = None) -> dict:
+        """Room state shared by every connection (everything except `your_hand`)."""
+        st = dict(base) if base is not None else {}
+        st.update(self.game.snapshot())
+        st['ready'] = list(self.ready)
+        st['room'] = self.room_id
+        st['deadline'] = self.deadline_at
+        st['black_deck_count'] = len(self.black_deck) if self.black_deck is not None else 0
+        try:
+            st['white_top'] = [card.text for card in self.white_deck.peek(CardType.WHITE, 3)]
+        except Exception:
+            st['white_top'] = []
+        try:
+            black_preview = self.black_deck.peek(CardType.BLACK, 1)
+            st['black_top'] = black_preview[0].text if black_preview else None
+        except Exception:
+            st['black_top'] = None
+        return st
+
+    def record_state(self, public: dict) -> Tuple[int, Patch]:
+        """Advance `seq` if `public` differs from the last recorded state.
+
+        Returns `(seq, (changed, removed))`: `changed` maps changed top-level
+        fields to their new values (a field that became None is a change) and
+        `removed` lists the fields `public` no longer has.
+        """
+        prev = self._last_public
+        if prev is None:
+            changed, removed = dict(public), []
+        else:
+            changed = {k: v for k, v in public.items() if k not in prev or (prev[k] is not v and prev[k] != v)}
+            removed = [k for k in prev if k not in public]
+        if prev is not None and not changed and not removed:
+            return self.seq, (changed, removed)
+        self.seq += 1
+        self._history.append((self.seq, (changed, removed)))
+        self._last_public = public
+        return self.seq, (changed, removed)
+
+    def patch_since(self, base: Optional[int]) -> Optional[Patch]:
+        """Merged patch from `base` to the current seq, or None if `base` is too old (gap)."""
+        if base is None or base > self.seq:
+            return None
+        if base == self.seq:
+            return {}, []
+        if not self._history or base < self._history[0][0] - 1:
+            return None
+        merged: dict = {}
+        removed: Set[str] = set()
+        for seq, (changed, gone) in self._history:
+            if seq > base:
+                for k in gone:
+                    merged.pop(k, None)
+                removed.update(gone)
+                merged.update(changed)
+                removed.difference_update(changed)
+        return merged, sorted(removed)
+
+    def forget_conn(self, ws: web.WebSocketResponse) -> None:
+        self.last_active = time.monotonic()
+        self.conns.discard(ws)
+        self.conn_player.pop(ws, None)
+        self.conn_seq.pop(ws, None)
+        self.conn_hand.pop(ws, None)
+
+
+# (handler, connection, message, completion future) queued on a room's mailbox
+Handler = Callable[[Room, web.WebSocketResponse, dict], Awaitable[None]]
+Command = Tuple[Handler, web.WebSocketResponse, dict, 'asyncio.Future[None]']
 
 ROOMS: Dict[str, Room] = {}
+# registered actions (see server/protocol.py); also the metrics labels
+ACTIONS = ActionTable()
+metrics.gauge('cah_rooms', 'Rooms in memory.', lambda: len(ROOMS))
+metrics.gauge('cah_connections', 'WebSocket connections attached to a room.', lambda: sum(len(r.conns) for r in ROOMS.values()))
+metrics.gauge('cah_players', 'Players seated in a room.', lambda: sum(len(r.game.players) for r in ROOMS.values()))
+metrics.gauge('cah_room_queued_commands', 'Commands waiting in room mailboxes.', lambda: sum(r.queued() for r in ROOMS.values()))
+
+# hibernated rooms: room id -> (file in STORE, players, hibernated at (epoch
+# seconds), started, created), enough to list them without loading the file
+HIBERNATED: Dict[str, Tuple[str, int, float, bool, float]] = {}
+metrics.gauge('cah_hibernated_rooms', 'Rooms hibernated to disk.', lambda: len(HIBERNATED))
+# where hibernated rooms are written; created on first use (see `_store`)
+STORE: Optional[RoomStore] = None
+# hibernation files no longer referenced, deleted once the next journal snapshot is written
+_STALE_FILES: List[str] = []
+# reverse index: rooms each connection joined, so a disconnect touches only those
+CONN_ROOMS: Dict[web.WebSocketResponse, Set[Room]] = {}
+
+# command journal (see server/journal.py); None when JOURNAL_DIR is not set
+JOURNAL: Optional[Journal] = None
+# per-connection protocol options negotiated with the `hello` action
+CONN_OPTIONS: Dict[web.WebSocketResponse, Dict[str, Any]] = {}
+# per-connection wire encoding negotiated as a WebSocket subprotocol (JSON when absent)
+CONN_CODECS: Dict[web.WebSocketResponse, Codec] = {}
+# per-connection outbound queues (see server/outbox.py)
+OUTBOXES: Dict[web.WebSocketResponse, Outbox] = {}
+metrics.gauge('cah_outbox_frames', 'Frames queued for sending on all connections.', lambda: sum(len(b) for b in OUTBOXES.values()))
+# room summaries for `list`, updated after every room command (see server/lobby.py)
+LOBBY = Lobby(ROOM_MAX_PLAYERS, lambda ws, event: reply(ws, event), lobby.PUSH_SECONDS)
+metrics.gauge('cah_lobby_subscribers', 'Connections subscribed to lobby updates.', lambda: len(LOBBY.subscribers))
+# round deadlines of every room (see `_arm_deadline`), advanced by `_tick_forever`
+TIMERS = TimerWheel(ROUND_TIMER_TICK)
+metrics.gauge('cah_round_timers', 'Round deadlines scheduled.', lambda: len(TIMERS))
+
+
+def _index(room: Room) -> None:
+    LOBBY.update(room.room_id, len(room.game.players), room.game.started, room.created)
+
+
+def _phase(room: Room) -> Optional[Tuple[int, Any]]:
+    """What the room's game is waiting for, or None when no deadline applies.
+
+    `(round, voting session)`, the session being None while cards are
+    submitted. None while the game is not running or nobody is connected.
+    """
+    game = room.game
+    if not game.started or not game.players or not room.conns or game.is_finished():
+        return None
+    return (game.current_round, game.voting)
+
+
+def _arm_deadline(room: Room) -> None:
+    """Reschedule the room's deadline when the phase it waits for has changed."""
+    phase = _phase(room)
+    if phase == room.phase:
+        return
+    if room.deadline is not None:
+        room.deadline.cancel()
+    room.phase, room.deadline, room.deadline_at = phase, None, None
+    if phase is None:
+        return
+    seconds = ROUND_SUBMIT_SECONDS if phase[1] is None else ROUND_VOTE_SECONDS
+    if seconds > 0:
+        room.deadline = TIMERS.schedule(seconds, _deadline_passed, room, phase)
+        room.deadline_at = time.time() + seconds
+
+
+def _deadline_passed(room: Room, phase: Tuple[int, Any]) -> None:
+    # called on the wheel's tick: the timeout itself runs on the room's actor
+    if room.phase is phase and ROOMS.get(room.room_id) is room:
+        asyncio.ensure_future(_timeout(room, phase))
+
+
+async def _timeout(room: Room, phase: Tuple[int, Any]) -> None:
+    try:
+        await room.call(_expire, None, {"phase": phase})
+    except Exception:
+        log.exception('room %s: round timeout failed', room.room_id)
+
+
+def _hand_for(room: Room, pid: Optional[str]) -> Optional[list]:
+    if not pid:
+        return None
+    try:
+        return room.game.hand_texts(pid)
+    except ValueError:
+        return []
+
+
+class _StateFrames:
+    """Encodes one state broadcast for every connection of a room.
+
+    The envelope (event fields), the public state and each merged patch are
+    encoded once per wire encoding (see server/codec.py); per connection only
+    the hand (and the seq numbers) are encoded and spliced into them.
+
+    Legacy clients always get the full state. Delta clients (`hello` with
+    `delta: true`) get `patch` relative to the seq they last applied, or a
+    full `state` plus `seq` when there is a gap.
+
+    For compressing connections the public state (or patch) inside each frame
+    is handed to the outbox as a `Shared` segment, so it is deflated once per
+    broadcast rather than once per connection.
+    """
+
+    def __init__(self, room: Room, message: dict, public: dict, seq: int) -> None:
+        self.room = room
+        self.public = public
+        self.seq = seq
+        self.message = {k: v for k, v in message.items() if k != 'state'}
+        self._patches: Dict[int, Optional[Patch]] = {}
+        # codec name -> {'envelope' | 'public' | base seq: encoded}
+        self._encoded: Dict[str, Dict[Any, Encoded]] = {}
+        # codec name -> {'public' | base seq: segment}
+        self._segments: Dict[str, Dict[Any, Optional[Shared]]] = {}
+        # time spent building frames (only measured with metrics enabled)
+        self.encode_seconds = 0.0
+
+    def _cache(self, codec: Codec) -> Dict[Any, Encoded]:
+        cache = self._encoded.get(codec.name)
+        if cache is None:
+            cache = self._encoded[codec.name] = {'envelope': codec.dumps(self.message)}
+        return cache
+
+    def _state(self, codec: Codec, hand: Optional[Encoded]) -> Encoded:
+        cache = self._cache(codec)
+        public = cache.get('public')
+        if public is None:
+            public = cache['public'] = codec.dumps(self.public)
+        if hand is None:
+            return public
+        return codec.with_field(public, 'your_hand', hand)
+
+    def _patch(self, codec: Codec, base: int) -> Optional[Tuple[Encoded, Optional[Encoded]]]:
+        """Encoded `(patch, removed)` from `base` (`removed` None when no field was removed)."""
+        if base not in self._patches:
+            self._patches[base] = self.room.patch_since(base)
+        patch = self._patches[base]
+        if patch is None:
+            return None
+        changed, removed = patch
+        cache = self._cache(codec)
+        encoded = cache.get(base)
+        if encoded is None:
+            encoded = cache[base] = codec.dumps(changed)
+        if not removed:
+            return encoded, None
+        key = ('removed', base)
+        if key not in cache:
+            cache[key] = codec.dumps(removed)
+        return encoded, cache[key]
+
+    def _segment(self, codec: Codec, key: Any) -> Optional[Shared]:
+        segments = self._segments.setdefault(codec.name, {})
+        if key not in segments:
+            segments[key] = compression.shared(codec.body(self._cache(codec)[key]))
+        return segments[key]
+
+    def frame(self, ws: web.WebSocketResponse, superseded: Optional[Frame] = None) -> Tuple[Encoded, Optional[int]]:
+        """Frame for `ws` and the seq its patch starts from (None for a full state).
+
+        `superseded` is the connection's queued state frame this one replaces
+        (see `Outbox.supersede`): the client never saw that state, so the
+        patch starts from that frame's base instead.
+        """
+        room = self.room
+        codec = codec_of(ws)
+        envelope = self._cache(codec)['envelope']
+        hand = _hand_for(room, room.conn_player.get(ws))
+        hand_enc = codec.dumps(hand) if hand is not None else None
+        if not CONN_OPTIONS.get(ws, {}).get('delta'):
+            return codec.with_field(envelope, 'state', self._state(codec, hand_enc)), None
+        if superseded is not None:
+            base = superseded.base
+            # the superseded frame may have carried the latest hand
+            room.conn_hand.pop(ws, None)
+        else:
+            base = room.conn_seq.get(ws)
+        patch = self._patch(codec, base) if base is not None else None
+        if patch is None:
+            base = None
+            data = codec.with_field(envelope, 'state', self._state(codec, hand_enc))
+        else:
+            patch, removed = patch
+            if hand is not None and hand != room.conn_hand.get(ws):
+                patch = codec.with_field(patch, 'your_hand', hand_enc)
+            data = codec.with_field(codec.with_field(envelope, 'base', codec.integer(base)), 'patch', patch)
+            if removed is not None:
+                data = codec.with_field(data, 'removed', removed)
+        if ws in room.conns:
+            room.conn_seq[ws] = self.seq
+            if hand is not None:
+                room.conn_hand[ws] = hand
+        return codec.with_field(data, 'seq', codec.integer(self.seq)), base
+
+    def send(self, ws: web.WebSocketResponse) -> int:
+        """Queue the frame for `ws`, superseding its unsent state; returns the frame size."""
+        box = outbox(ws)
+        codec = codec_of(ws)
+        superseded = box.supersede()
+        if metrics.ENABLED:
+            started = time.perf_counter()
+            data, base = self.frame(ws, superseded)
+            self.encode_seconds += time.perf_counter() - started
+        else:
+            data, base = self.frame(ws, superseded)
+        # a superseded broadcast still delivers its event (without the state)
+        replacement = self._cache(codec)['envelope'] if self.message else None
+        segment = self._segment(codec, 'public' if base is None else base) if box.deflate else None
+        box.put_state(data, replacement, base, segment)
+        return len(data)
 
 
 async def notify_room(room: Room, message: dict) -> None:
+    # a state change may start a new phase: its deadline goes out with the state
+    _arm_deadline(room)
     if not room.conns:
-        logging.debug('notify_room: no connections in room %s', room.room_id)
+        log.debug('notify_room: no connections in room %s', room.room_id)
         return
-    logging.debug('notify_room: broadcasting to room %s -> %s (conns=%d)', room.room_id, message, len(room.conns))
-    base_state = None
+    log_payload(log, 'notify_room', message, room=room.room_id, conns=len(room.conns))
+    public = None
+    seq = room.seq
     if 'state' in message and isinstance(message['state'], dict):
-        base_state = message['state']
-    coros = []
-    # prepare per-connection payloads
+        # the public part of the state is built once per broadcast, not per connection
+        public = room.public_state(message['state'])
+        seq, _ = room.record_state(public)
+    measured = metrics.ENABLED
+    if measured:
+        started = time.perf_counter()
+    # frames are only queued here: each connection's writer sends them, so a
+    # slow client never holds up the room. Without a state every connection
+    # gets the same frame; with one, only the per-player hand is encoded per
+    # connection.
+    frames = _StateFrames(room, message, public, seq) if public is not None else None
+    shared = Reply(message) if frames is None else None
+    segments: Dict[str, Optional[Shared]] = {}
+    sent = 0
+    encode_seconds = 0.0
     for c in list(room.conns):
         try:
-            msg = dict(message)
-            if base_state is not None:
-                st = dict(base_state)
-                st.update(room.game.snapshot())
-                st['ready'] = list(room.ready)
-                st['room'] = room.room_id
-                st['black_deck_count'] = len(room.black_deck) if room.black_deck is not None else 0
-                pid = room.conn_player.get(c)
-                if pid:
-                    try:
-                        pl = next(p for p in room.game.players if p.id == pid)
-                        st['your_hand'] = [getattr(card, 'text', str(card)) for card in pl.hand]
-                    except StopIteration:
-                        st['your_hand'] = []
-                # white_top preview
-                try:
-                    white_preview = []
-                    for card in room.white_deck.cards:
-                        if getattr(card, 'type', None) and getattr(card.type, 'value', None) == 'white':
-                            white_preview.append(getattr(card, 'text', str(card)))
-                            if len(white_preview) >= 3:
-                                break
-                    st['white_top'] = white_preview
-                except Exception:
-                    st['white_top'] = []
-                try:
-                    black_preview = None
-                    for card in room.black_deck.cards:
-                        if getattr(card, 'type', None) and getattr(card.type, 'value', None) == 'black':
-                            black_preview = getattr(card, 'text', str(card))
-                            break
-                    st['black_top'] = black_preview
-                except Exception:
-                    st['black_top'] = None
-                msg['state'] = st
-            data = json.dumps(msg)
-            coros.append(_send_safe(c, data))
+            if frames is not None:
+                size = frames.send(c)
+            else:
+                codec = codec_of(c)
+                if measured:
+                    encoding = time.perf_counter()
+                    data = shared.encode(codec)
+                    encode_seconds += time.perf_counter() - encoding
+                else:
+                    data = shared.encode(codec)
+                box = outbox(c)
+                if box.deflate and codec.name not in segments:
+                    segments[codec.name] = compression.shared(data)
+                box.put(data, segments.get(codec.name))
+                size = len(data)
+            sent += 1
+            if measured:
+                metrics.PAYLOAD_BYTES.observe(size)
         except Exception as e:
-            logging.exception('notify_room: prepare/send failed for conn %s: %s', getattr(c, 'transport', None), e)
-    results = await asyncio.gather(*coros, return_exceptions=True)
-    for conn, res in zip(list(room.conns), results):
-        if isinstance(res, Exception):
-            logging.exception('notify_room: sending to %s failed: %s', getattr(conn, 'transport', None), res)
+            log.exception('notify_room: prepare/send failed for conn %s: %s', getattr(c, 'transport', None), e)
+    if measured:
+        # encoding only (frames and hands); notify also covers queueing them
+        metrics.ENCODE_SECONDS.observe(frames.encode_seconds if frames is not None else encode_seconds)
+        metrics.FANOUT.inc(sent)
+        metrics.NOTIFY_SECONDS.observe(time.perf_counter() - started)
 
 
-async def _send_safe(ws: web.WebSocketResponse, data: str):
-    try:
-        await ws.send_str(data)
-    except Exception:
-        logging.exception('Failed to send data to ws %s', getattr(ws, 'transport', None))
+def outbox(ws: web.WebSocketResponse) -> Outbox:
+    box = OUTBOXES.get(ws)
+    if box is None:
+        box = OUTBOXES[ws] = Outbox(ws)
+    return box
+
+
+def codec_of(ws: web.WebSocketResponse) -> Codec:
+    return CONN_CODECS.get(ws, JSON)
+
+
+def send(ws: web.WebSocketResponse, data: Encoded) -> None:
+    """Queue encoded `data` for `ws`; the connection's writer task sends it."""
+    outbox(ws).put(data)
+
+
+def reply(ws: web.WebSocketResponse, message: Union[dict, Reply]) -> None:
+    """Encode `message` in the connection's wire encoding and queue it."""
+    codec = codec_of(ws)
+    send(ws, message.encode(codec) if isinstance(message, Reply) else codec.dumps(message))
+
+
+async def drain(ws: web.WebSocketResponse) -> None:
+    """Wait until everything queued for `ws` has been sent."""
+    box = OUTBOXES.get(ws)
+    if box is not None:
+        await box.drain()
+
+
+def _journal(record: dict) -> None:
+    """Record an applied command; takes a snapshot every `JOURNAL.snapshot_every` records."""
+    if JOURNAL is None:
+        return
+    JOURNAL.append(record)
+    if JOURNAL.needs_snapshot():
+        _snapshot()
+
+
+def _snapshot() -> None:
+    # files dropped so far are not referenced by this snapshot: delete them once it is on disk
+    stale = list(_STALE_FILES)
+    _STALE_FILES.clear()
+    JOURNAL.snapshot(_dump_rooms(), partial(_store().remove, stale) if stale else None)
+
+
+def _journal_header() -> dict:
+    # card ids in the journal and snapshots only mean something with this catalog
+    return {"catalog": CATALOG.digest()}
+
+
+def _dump_rooms() -> dict:
+    return {
+        "cards": len(CATALOG),
+        "catalog": CATALOG.digest(),
+        "rooms": [room.dump() for room in ROOMS.values()],
+        "hibernated": {rid: list(entry) for rid, entry in HIBERNATED.items()},
+    }
+
 
+def _store() -> RoomStore:
+    global STORE
+    if STORE is None:
+        STORE = RoomStore.temporary()
+    return STORE
 
-async def handle_message(ws: web.WebSocketResponse, raw: str) -> None:
+
+def _discard_files(names: List[str]) -> None:
+    if JOURNAL is None:
+        _store().remove(names)
+    else:
+        # the latest snapshot may still refer to them
+        _STALE_FILES.extend(names)
+
+
+def _idle(room: Room) -> bool:
+    return not room.conns and not room.queued()
+
+
+async def hibernate(room: Room) -> bool:
+    """Write `room` to disk and drop it from memory; False if it was kept.
+
+    Only for rooms without connections or queued commands (see `sweep_rooms`).
+    The file is encoded and written (fsync included) on an executor thread;
+    the room stays in `ROOMS` until it is on disk, so a failed write raises
+    and keeps the room. A room that got a connection or a change meanwhile is
+    kept as well (the file, never referenced, is deleted).
+    """
+    at = time.time()
+    data = room.dump()
+    store = _store()
+    loop = asyncio.get_running_loop()
+    name = await loop.run_in_executor(None, store.save, room.room_id, data)
+    # `dump()` is cached: the same object means the room did not change
+    if ROOMS.get(room.room_id) is not room or not _idle(room) or room.dump() is not data:
+        await loop.run_in_executor(None, store.remove, [name])
+        return False
+    del ROOMS[room.room_id]
+    room.stop()
+    HIBERNATED[room.room_id] = (name, len(room.game.players), at, room.game.started, room.created)
+    _journal({"op": "hibernate", "room": room.room_id, "file": name, "at": at})
+    log.info('Room hibernated: %s', room.room_id)
+    return True
+
+
+def _wake(room_id: str) -> Optional[Room]:
+    """Load a hibernated room back into `ROOMS` (None if its file is unreadable)."""
+    name = HIBERNATED.pop(room_id)[0]
     try:
-        msg = json.loads(raw)
+        room = Room.restore(_store().load(name))
     except Exception:
-        await ws.send_str(json.dumps({"error": "invalid json"}))
-        return
+        log.exception('Failed to rehydrate room %s from %s', room_id, name)
+        return None
+    ROOMS[room_id] = room
+    _discard_files([name])
+    _journal({"op": "wake", "room": room_id})
+    log.info('Room rehydrated: %s', room_id)
+    return room
 
-    logging.debug('handle_message: from=%s msg=%s', getattr(ws, 'transport', None), msg)
 
-    action = msg.get("action")
-    room_id = msg.get("room")
-    if action == "list":
-        summaries = []
-        for rid, r in ROOMS.items():
-            try:
-                cnt = len(r.game.players)
-            except Exception:
-                cnt = 0
-            summaries.append({"room": rid, "players": cnt})
-        payload = {"rooms": summaries}
+def drop_room(room_id: str) -> None:
+    """Delete a hibernated room for good."""
+    name = HIBERNATED.pop(room_id)[0]
+    _discard_files([name])
+    LOBBY.remove(room_id)
+    _journal({"op": "drop", "room": room_id})
+    log.info('Room dropped after %ss hibernated: %s', ROOM_TTL_SECONDS, room_id)
+
+
+async def sweep_rooms() -> Tuple[int, int]:
+    """Hibernate idle rooms and drop hibernated rooms past their TTL.
+
+    Returns `(hibernated, dropped)`.
+    """
+    cutoff = time.monotonic() - ROOM_IDLE_SECONDS
+    idle = [r for r in ROOMS.values() if _idle(r) and r.last_active <= cutoff]
+    hibernated = 0
+    for room in idle[:HIBERNATE_BATCH]:
         try:
-            await ws.send_str(json.dumps(payload))
+            hibernated += await hibernate(room)
         except Exception:
-            logging.exception('Failed to send list response')
-        return
+            log.exception('Failed to hibernate room %s', room.room_id)
+    expiry = time.time() - ROOM_TTL_SECONDS
+    expired = [rid for rid, entry in HIBERNATED.items() if entry[2] <= expiry]
+    for rid in expired:
+        drop_room(rid)
+    return hibernated, len(expired)
+
 
-    if not room_id:
-        await ws.send_str(json.dumps({"error": "room required"}))
+def _apply_record(record: dict) -> None:
+    """Re-apply one journaled command (the same state changes `handle_message` makes)."""
+    op = record["op"]
+    room_id = record["room"]
+    if op == "create":
+        ROOMS[room_id] = Room(room_id, seed=record["seed"], created=record.get("created"))
+        return
+    if op == "wake":
+        name = HIBERNATED.pop(room_id)[0]
+        ROOMS[room_id] = Room.restore(_store().load(name))
+        _STALE_FILES.append(name)
+        return
+    if op == "drop":
+        _STALE_FILES.append(HIBERNATED.pop(room_id)[0])
         return
+    room = ROOMS[room_id]
+    if op == "hibernate":
+        del ROOMS[room_id]
+        name = record["file"]
+        if not _store().exists(name):
+            # the file of this hibernation was already superseded: write the replayed state again
+            name = _store().save(room_id, room.dump())
+        HIBERNATED[room_id] = (name, len(room.game.players), record["at"], room.game.started, room.created)
+        return
+    if op == "join":
+        room.game.add_player(Player(record["player_id"], record["name"]))
+    elif op == "ready":
+        if record["ready"]:
+            room.ready.add(record["player_id"])
+        else:
+            room.ready.discard(record["player_id"])
+    elif op == "start":
+        room.game.start()
+        room.ready.clear()
+    elif op == "submit":
+        room.game.submit_card(record["player_id"], record["card_index"])
+    elif op == "vote":
+        room.game.cast_vote(record["voter_id"], record["voted_player_id"])
+    elif op == "expire":
+        if record["phase"] == "submit":
+            room.game.expire_submissions()
+        else:
+            room.game.expire_voting()
+    elif op == "leave":
+        room.game.remove_player(record["player_id"])
+        room.ready.discard(record["player_id"])
+    else:
+        raise ValueError(f"unknown journal op {op!r}")
 
-    room = ROOMS.get(room_id)
 
-    if action == "create":
-        if room_id in ROOMS:
-            await ws.send_str(json.dumps({"error": "room exists", "room": room_id}))
-            return
-        room = Room(room_id)
-        ROOMS[room_id] = room
-        logging.info('Room created: %s', room_id)
-        await ws.send_str(json.dumps({"status": "created", "room": room_id, "state": room.snapshot()}))
+def restore_rooms(journal: Journal) -> int:
+    """Rebuild `ROOMS` from the latest snapshot plus the journal tail; returns replayed records."""
+    state, records = journal.load()
+    expected = _journal_header()
+    for gen, header in journal.headers.items():
+        if header is not None and header != expected:
+            raise RuntimeError(f"journal segment {gen} was written with {header}, expected {expected}")
+    if state is not None:
+        # snapshots written before the catalog digest only recorded the card count
+        if "catalog" in state and state["catalog"] != expected["catalog"]:
+            raise RuntimeError(f"journal snapshot was taken with catalog {state['catalog']}, current catalog is {expected['catalog']}")
+        if state.get("cards") != len(CATALOG):
+            raise RuntimeError(f"journal snapshot was taken with {state.get('cards')} cards, catalog has {len(CATALOG)}")
+        for data in state["rooms"]:
+            ROOMS[data["room"]] = Room.restore(data)
+        for rid, entry in state.get("hibernated", {}).items():
+            # older snapshots only kept (file, players, at)
+            HIBERNATED[rid] = tuple(entry) if len(entry) == 5 else (*entry, False, entry[2])
+    replayed = 0
+    for record in records:
+        try:
+            _apply_record(record)
+        except Exception:
+            log.exception('journal: failed to replay %s', record)
+        replayed += 1
+    for room in ROOMS.values():
+        _index(room)
+    for rid, (_, players, _, started, created) in HIBERNATED.items():
+        LOBBY.update(rid, players, started, created)
+    log.info('journal: restored %d rooms, %d hibernated (%d records replayed)', len(ROOMS), len(HIBERNATED), replayed)
+    return replayed
+
+
+async def handle_message(ws: web.WebSocketResponse, raw: Encoded) -> None:
+    try:
+        # text frames are JSON; binary frames use the negotiated binary encoding
+        msg = JSON.loads(raw) if isinstance(raw, str) else _binary_codec(ws).loads(raw)
+    except Exception:
+        reply(ws, INVALID_JSON)
+        return
+    if not metrics.ENABLED:
+        await _dispatch(ws, msg)
         return
+    started = time.perf_counter()
+    try:
+        await _dispatch(ws, msg)
+    finally:
+        action = msg.get("action") if isinstance(msg, dict) else None
+        # unknown actions share one label so clients cannot create unbounded series
+        label = action if action in ACTIONS else "other"
+        metrics.HANDLE_SECONDS.labels(label).observe(time.perf_counter() - started)
+
 
+def _binary_codec(ws: web.WebSocketResponse) -> Codec:
+    codec = codec_of(ws)
+    if not codec.binary:
+        if MSGPACK is None:
+            raise ValueError('binary frames need the msgpack subprotocol')
+        codec = MSGPACK
+    return codec
+
+
+async def _dispatch(ws: web.WebSocketResponse, msg: Any) -> None:
+    if not isinstance(msg, dict):
+        reply(ws, INVALID_MESSAGE)
+        return
+    log_payload(log, 'handle_message', msg)
+    action = ACTIONS.get(msg.get("action"))
+    if action is None:
+        reply(ws, UNKNOWN_ACTION)
+        return
+    error = action.schema.check(msg)
+    if error is not None:
+        reply(ws, error)
+        return
+    if not action.room:
+        await action.handler(ws, msg)
+        return
+    room_id = msg["room"]
+    room = ROOMS.get(room_id)
+    if room is None and room_id in HIBERNATED:
+        room = _wake(room_id)
     if room is None:
-        await ws.send_str(json.dumps({"error": "room not found", "room": room_id}))
+        reply(ws, error_frame("room not found", room=room_id))
         return
+    # room actions read or change the room: run them on the room's actor
+    await room.call(action.handler, ws, msg)
 
-    if action == "join":
-        pid = msg.get("player_id")
-        name = msg.get("name", pid)
-        if not pid:
-            await ws.send_str(json.dumps({"error": "player_id required"}))
-            return
-        try:
-            _ = room.game._get_player(pid)
-        except ValueError:
-            p = Player(pid, name)
-            room.game.players.append(p)
-            room.game.turns.player_ids.append(pid)
-        room.conns.add(ws)
-        room.conn_player[ws] = pid
-        logging.info('Player %s joining room %s (connections=%d)', pid, room_id, len(room.conns))
-        await notify_room(room, {"event": "player_joined", "room": room_id, "state": room.snapshot()})
-        return
 
-    if action == "ready":
-        pid = msg.get("player_id")
-        rd = msg.get("ready", True)
-        if not pid:
-            await ws.send_str(json.dumps({"error": "player_id required"}))
-            return
-        if rd:
-            room.ready.add(pid)
-            logging.info('Player %s marked READY in room %s', pid, room_id)
-        else:
-            if pid in room.ready:
-                room.ready.remove(pid)
-            logging.info('Player %s unmarked READY in room %s', pid, room_id)
-        await notify_room(room, {"event": "player_ready", "room": room_id, "player": pid, "ready": bool(rd), "state": room.snapshot()})
+ROOM_ID = Field(str, max_len=128)
+PLAYER_ID = Field(str, max_len=64)
 
-        try:
-            player_ids = [p.id for p in room.game.players]
-            if player_ids:
-                missing = [x for x in player_ids if x not in room.ready]
-                if not missing:
-                    if not room.conns:
-                        logging.debug('Auto-start skipped: no active connections in room %s', room_id)
-                    else:
-                        connected_pids = set(room.conn_player.get(c) for c in room.conns if room.conn_player.get(c))
-                        player_ids_set = set(player_ids)
-                        if connected_pids != player_ids_set:
-                            logging.debug('Auto-start skipped: not all players are connected for room %s (connected=%s players=%s)', room_id, connected_pids, player_ids_set)
-                        else:
-                            if getattr(room.game, 'started', False):
-                                logging.debug('Auto-start skipped: game already started for room %s', room_id)
-                            else:
-                                logging.info('All players ready in room %s, auto-starting', room_id)
-                                try:
-                                    room.game.start()
-                                    room.ready.clear()
-                                    await notify_room(room, {"event": "started", "room": room_id, "state": room.snapshot()})
-                                except Exception as e:
-                                    logging.exception('Failed to auto-start room %s: %s', room_id, e)
-        except Exception:
-            logging.exception('Error while checking auto-start condition for room %s', room_id)
+
+@ACTIONS.register("hello", Schema(delta=Field(bool, required=False)))
+async def _hello(ws: web.WebSocketResponse, msg: dict) -> None:
+    # protocol negotiation: {"action": "hello", "delta": true} opts into state patches
+    CONN_OPTIONS[ws] = {"delta": bool(msg.get("delta"))}
+    reply(ws, {"status": "hello", "delta": CONN_OPTIONS[ws]["delta"]})
+
+
+LOBBY_FILTER = Field(str, required=False, max_len=16)
+UNKNOWN_FILTER = error_frame("unknown filter", filters=list(VIEWS))
+INVALID_CURSOR = error_frame("invalid cursor")
+ROOM_FULL = error_frame("room full")
+SEED_NOT_ALLOWED = error_frame("seed not allowed")
+
+
+@ACTIONS.register("list", Schema(filter=LOBBY_FILTER, cursor=Field(str, required=False, max_len=256),
+                                 limit=Field(int, required=False, min=1, max=lobby.PAGE_MAX), subscribe=Field(bool, required=False)))
+async def _list(ws: web.WebSocketResponse, msg: dict) -> None:
+    view = msg.get("filter") or "all"
+    if view not in VIEWS:
+        reply(ws, UNKNOWN_FILTER)
+        return
+    try:
+        rooms, cursor = LOBBY.page(view, msg.get("cursor"), msg.get("limit") or lobby.PAGE_SIZE)
+    except ValueError:
+        reply(ws, INVALID_CURSOR)
         return
+    _subscribe(ws, view, msg.get("subscribe"))
+    reply(ws, {"rooms": rooms, "next": cursor, "filter": view})
 
-    if action == "start":
-        try:
-            player_ids = [p.id for p in room.game.players]
-            missing = [pid for pid in player_ids if pid not in room.ready]
-            if player_ids and missing:
-                await ws.send_str(json.dumps({"error": "not_all_ready", "missing": missing}))
-                return
-            room.game.start()
-            room.ready.clear()
-            await notify_room(room, {"event": "started", "room": room_id, "state": room.snapshot()})
-        except Exception as e:
-            await ws.send_str(json.dumps({"error": str(e)}))
+
+@ACTIONS.register("lobby", Schema(filter=LOBBY_FILTER, subscribe=Field(bool, required=False)))
+async def _lobby(ws: web.WebSocketResponse, msg: dict) -> None:
+    # (un)subscribe without fetching a page; silent unless the filter is unknown
+    view = msg.get("filter") or "all"
+    if view not in VIEWS:
+        reply(ws, UNKNOWN_FILTER)
         return
+    _subscribe(ws, view, msg.get("subscribe", True))
 
-    if action == "submit":
-        pid = msg.get("player_id")
-        idx = msg.get("card_index", 0)
-        try:
-            room.game.submit_card(pid, int(idx))
-            await notify_room(room, {"event": "submitted", "room": room_id, "state": room.snapshot()})
-        except Exception as e:
-            await ws.send_str(json.dumps({"error": str(e)}))
+
+def _subscribe(ws: web.WebSocketResponse, view: str, subscribe: Optional[bool]) -> None:
+    if subscribe:
+        LOBBY.subscribe(ws, view)
+    elif subscribe is not None:
+        LOBBY.unsubscribe(ws)
+
+
+@ACTIONS.register("create", Schema(room=ROOM_ID, seed=Field(int, required=False)))
+async def _create(ws: web.WebSocketResponse, msg: dict) -> None:
+    room_id = msg["room"]
+    if room_id in ROOMS or room_id in HIBERNATED:
+        reply(ws, error_frame("room exists", room=room_id))
+        return
+    if "seed" in msg and not ALLOW_CLIENT_SEED:
+        reply(ws, SEED_NOT_ALLOWED)
         return
+    room = Room(room_id, seed=msg.get("seed"))
+    ROOMS[room_id] = room
+    _index(room)
+    _journal({"op": "create", "room": room_id, "seed": room.game.seed, "created": room.created})
+    log.info('Room created: %s', room_id)
+    reply(ws, {"status": "created", "room": room_id, "state": room.snapshot()})
 
-    if action == "vote":
-        voter = msg.get("voter_id")
-        voted = msg.get("voted_player_id")
-        try:
-            winner = room.game.cast_vote(voter, voted)
-            payload = {"event": "vote_cast", "room": room_id, "state": room.snapshot()}
-            if winner:
-                payload["winner"] = winner
-            await notify_room(room, payload)
-        except Exception as e:
-            await ws.send_str(json.dumps({"error": str(e)}))
+
+@ACTIONS.register("join", Schema(room=ROOM_ID, player_id=PLAYER_ID, name=Field(str, required=False, max_len=64)), room=True)
+async def _join(room: Room, ws: web.WebSocketResponse, msg: dict) -> None:
+    room_id = room.room_id
+    pid = msg["player_id"]
+    name = msg.get("name", pid)
+    if not room.game.has_player(pid):
+        if len(room.game.players) >= ROOM_MAX_PLAYERS:
+            reply(ws, ROOM_FULL)
+            return
+        room.game.add_player(Player(pid, name))
+        _journal({"op": "join", "room": room_id, "player_id": pid, "name": name})
+    room.conns.add(ws)
+    room.conn_player[ws] = pid
+    CONN_ROOMS.setdefault(ws, set()).add(room)
+    log.info('Player %s joining room %s (connections=%d)', pid, room_id, len(room.conns))
+    await notify_room(room, {"event": "player_joined", "room": room_id, "state": room.snapshot()})
+
+
+@ACTIONS.register("ready", Schema(room=ROOM_ID, player_id=PLAYER_ID, ready=Field(bool, required=False)), room=True)
+async def _ready(room: Room, ws: web.WebSocketResponse, msg: dict) -> None:
+    room_id = room.room_id
+    pid = msg["player_id"]
+    rd = msg.get("ready", True)
+    if rd:
+        room.ready.add(pid)
+        log.info('Player %s marked READY in room %s', pid, room_id)
+    else:
+        room.ready.discard(pid)
+        log.info('Player %s unmarked READY in room %s', pid, room_id)
+    _journal({"op": "ready", "room": room_id, "player_id": pid, "ready": rd})
+    await notify_room(room, {"event": "player_ready", "room": room_id, "player": pid, "ready": rd, "state": room.snapshot()})
+    try:
+        await _auto_start(room)
+    except Exception:
+        log.exception('Error while checking auto-start condition for room %s', room_id)
+
+
+async def _auto_start(room: Room) -> None:
+    """Start the game once every seated player is ready and connected."""
+    room_id = room.room_id
+    player_ids = {p.id for p in room.game.players}
+    if not player_ids or not player_ids <= room.ready:
         return
+    if not room.conns:
+        log.debug('Auto-start skipped: no active connections in room %s', room_id)
+        return
+    connected_pids = {room.conn_player[c] for c in room.conns if room.conn_player.get(c)}
+    if connected_pids != player_ids:
+        log.debug('Auto-start skipped: not all players are connected for room %s (connected=%s players=%s)', room_id, connected_pids, player_ids)
+        return
+    if room.game.started:
+        log.debug('Auto-start skipped: game already started for room %s', room_id)
+        return
+    log.info('All players ready in room %s, auto-starting', room_id)
+    try:
+        room.game.start()
+        room.ready.clear()
+        _journal({"op": "start", "room": room_id})
+        await notify_room(room, {"event": "started", "room": room_id, "state": room.snapshot()})
+    except Exception as e:
+        log.exception('Failed to auto-start room %s: %s', room_id, e)
 
-    if action == "state":
-        try:
-            st = room.snapshot()
-            try:
-                white_preview = []
-                for card in room.white_deck.cards:
-                    if getattr(card, 'type', None) and getattr(card.type, 'value', None) == 'white':
-                        white_preview.append(getattr(card, 'text', str(card)))
-                        if len(white_preview) >= 3:
-                            break
-                st['white_top'] = white_preview
-            except Exception:
-                st['white_top'] = []
-            try:
-                black_preview = None
-                for card in room.black_deck.cards:
-                    if getattr(card, 'type', None) and getattr(card.type, 'value', None) == 'black':
-                        black_preview = getattr(card, 'text', str(card))
-                        break
-                st['black_top'] = black_preview
-            except Exception:
-                st['black_top'] = None
-            pid = room.conn_player.get(ws)
-            if pid:
-                try:
-                    pl = next(p for p in room.game.players if p.id == pid)
-                    st['your_hand'] = [getattr(card, 'text', str(card)) for card in pl.hand]
-                except Exception:
-                    st['your_hand'] = []
-            await ws.send_str(json.dumps({"state": st}))
-        except Exception:
-            await ws.send_str(json.dumps({"error": "failed to build state"}))
+
+@ACTIONS.register("start", Schema(room=ROOM_ID), room=True)
+async def _start(room: Room, ws: web.WebSocketResponse, msg: dict) -> None:
+    try:
+        missing = [p.id for p in room.game.players if p.id not in room.ready]
+        if missing:
+            reply(ws, error_frame("not_all_ready", missing=missing))
+            return
+        room.game.start()
+        room.ready.clear()
+        _journal({"op": "start", "room": room.room_id})
+        await notify_room(room, {"event": "started", "room": room.room_id, "state": room.snapshot()})
+    except Exception as e:
+        reply(ws, error_frame(str(e)))
+
+
+@ACTIONS.register("submit", Schema(room=ROOM_ID, player_id=PLAYER_ID, card_index=Field(int, required=False, min=0)), room=True)
+async def _submit(room: Room, ws: web.WebSocketResponse, msg: dict) -> None:
+    pid = msg["player_id"]
+    idx = msg.get("card_index", 0)
+    try:
+        room.game.submit_card(pid, idx)
+        room.missed.pop(pid, None)
+        _journal({"op": "submit", "room": room.room_id, "player_id": pid, "card_index": idx})
+        await notify_room(room, {"event": "submitted", "room": room.room_id, "player": pid, "state": room.snapshot()})
+    except Exception as e:
+        reply(ws, error_frame(str(e)))
+
+
+@ACTIONS.register("vote", Schema(room=ROOM_ID, voter_id=PLAYER_ID, voted_player_id=PLAYER_ID), room=True)
+async def _vote(room: Room, ws: web.WebSocketResponse, msg: dict) -> None:
+    voter = msg["voter_id"]
+    voted = msg["voted_player_id"]
+    try:
+        winner = room.game.cast_vote(voter, voted)
+        room.missed.pop(voter, None)
+        _journal({"op": "vote", "room": room.room_id, "voter_id": voter, "voted_player_id": voted})
+        payload = {"event": "vote_cast", "room": room.room_id, "voter": voter, "state": room.snapshot()}
+        if winner:
+            payload["winner"] = winner
+        await notify_room(room, payload)
+    except Exception as e:
+        reply(ws, error_frame(str(e)))
+
+
+async def _expire(room: Room, ws: None, msg: dict) -> None:
+    """A round deadline passed: close the phase without the players who did not act.
+
+    See `GameState.expire_submissions` / `expire_voting`. Players who miss
+    `ROUND_AFK_LIMIT` deadlines in a row are removed from the game, so an AFK
+    player cannot stall a room.
+    """
+    phase = msg["phase"]
+    if phase is not room.phase:
+        # the round moved on while the timeout was queued
         return
+    # forget the expired phase: `_arm_deadline` arms a fresh deadline after this
+    # command even if the game is still waiting for the same thing
+    room.phase = room.deadline = room.deadline_at = None
+    if _phase(room) != phase:
+        # everyone left: the game waits without a deadline until someone is back
+        return
+    game = room.game
+    room_id = room.room_id
+    winner = None
+    if phase[1] is None:
+        kind = "submit"
+        missing = game.expire_submissions()
+    else:
+        kind = "vote"
+        voting = phase[1]
+        missing = [p.id for p in game.players if p.id in voting.voters and p.id not in voting.votes]
+        winner = game.expire_voting()
+    _journal({"op": "expire", "room": room_id, "phase": kind})
+    removed = []
+    for pid in missing:
+        room.missed[pid] = room.missed.get(pid, 0) + 1
+        if ROUND_AFK_LIMIT > 0 and room.missed[pid] >= ROUND_AFK_LIMIT:
+            removed.append(pid)
+    for pid in removed:
+        del room.missed[pid]
+        game.remove_player(pid)
+        room.ready.discard(pid)
+        _journal({"op": "leave", "room": room_id, "player_id": pid})
+    if metrics.ENABLED:
+        metrics.ROUND_TIMEOUTS.labels(kind).inc()
+        metrics.AFK_REMOVED.inc(len(removed))
+    log.info('Room %s: %s deadline passed (missing=%s removed=%s)', room_id, kind, missing, removed)
+    payload = {"event": "timeout", "room": room_id, "phase": kind, "missing": missing, "removed": removed, "state": room.snapshot()}
+    if winner:
+        payload["winner"] = winner
+    await notify_room(room, payload)
+    # removed players' connections stop following the room once told why
+    for c in [c for c, pid in room.conn_player.items() if pid in removed]:
+        room.forget_conn(c)
+        CONN_ROOMS.get(c, set()).discard(room)
+
+
+FAILED_STATE = error_frame("failed to build state")
+INVALID_SEQ = error_frame("invalid seq")
+
+
+@ACTIONS.register("state", Schema(room=ROOM_ID), room=True)
+async def _state(room: Room, ws: web.WebSocketResponse, msg: dict) -> None:
+    try:
+        public = room.public_state()
+        seq, _ = room.record_state(public)
+        # an explicit state request always answers with the full state (delta resync)
+        room.conn_seq.pop(ws, None)
+        _StateFrames(room, {}, public, seq).send(ws)
+    except Exception:
+        log.exception('Failed to build state for room %s', room.room_id)
+        reply(ws, FAILED_STATE)
+
 
-    await ws.send_str(json.dumps({"error": "unknown action"}))
+@ACTIONS.register("ack", Schema(room=ROOM_ID, seq=Field(int, min=0)), room=True)
+async def _ack(room: Room, ws: web.WebSocketResponse, msg: dict) -> None:
+    # delta clients acknowledge the seq they applied; patches are computed from it
+    seq = msg["seq"]
+    if seq > room.seq:
+        reply(ws, INVALID_SEQ)
+        return
+    if ws in room.conns:
+        room.conn_seq[ws] = seq
 
 
 async def websocket_handler(request: web.Request) -> web.StreamResponse:
-    ws = web.WebSocketResponse()
+    ws = web.WebSocketResponse(protocols=SUBPROTOCOLS, compress=compression.COMPRESS)
     await ws.prepare(request)
-    logging.info('New WS connection: %s', request.remote)
+    if ws.ws_protocol:
+        CONN_CODECS[ws] = for_subprotocol(ws.ws_protocol)
+    deflate = compression.prepare(ws)
+    if deflate:
+        OUTBOXES[ws] = Outbox(ws, deflate=deflate)
+    log.info('New WS connection: %s (%s%s)', request.remote, codec_of(ws).name, ', deflate' if deflate else '')
     try:
         async for msg in ws:
-            if msg.type == web.WSMsgType.TEXT:
+            if msg.type in (web.WSMsgType.TEXT, web.WSMsgType.BINARY):
                 await handle_message(ws, msg.data)
             elif msg.type == web.WSMsgType.ERROR:
-                logging.error('ws connection closed with exception %s', ws.exception())
+                log.error('ws connection closed with exception %s', ws.exception())
                 break
     except Exception:
-        logging.exception('Connection handler error for %s', request.remote)
+        log.exception('Connection handler error for %s', request.remote)
     finally:
-        # cleanup connection from any rooms
-        for room in ROOMS.values():
-            if ws in room.conns:
-                room.conns.remove(ws)
-                if ws in room.conn_player:
-                    try:
-                        del room.conn_player[ws]
-                    except Exception:
-                        pass
-                logging.info('Connection %s removed from room %s', request.remote, room.room_id)
+        forget_connection(ws)
     return ws
 
 
+def forget_connection(ws: web.WebSocketResponse) -> None:
+    """Drop a closed connection from its rooms and per-connection tables."""
+    CONN_OPTIONS.pop(ws, None)
+    CONN_CODECS.pop(ws, None)
+    LOBBY.unsubscribe(ws)
+    box = OUTBOXES.pop(ws, None)
+    if box is not None:
+        box.close()
+    for room in CONN_ROOMS.pop(ws, ()):
+        room.forget_conn(ws)
+        log.info('Connection removed from room %s', room.room_id)
+
+
+async def _open_journal(app: web.Application) -> None:
+    global JOURNAL, STORE
+    directory = os.environ.get('JOURNAL_DIR')
+    if not directory:
+        return
+    journal = Journal(
+        directory,
+        fsync=os.environ.get('JOURNAL_FSYNC', 'batch'),
+        snapshot_every=int(os.environ.get('JOURNAL_SNAPSHOT_EVERY', '10000')),
+        header=_journal_header(),
+    )
+    # hibernated rooms live next to the journal so snapshots can refer to them
+    STORE = RoomStore(os.path.join(directory, 'rooms'), fsync=journal.fsync != 'off')
+    replayed = restore_rooms(journal)
+    journal.start()
+    JOURNAL = journal
+    # files no room refers to (superseded, or written just before a crash)
+    known = {entry[0] for entry in HIBERNATED.values()} | set(_STALE_FILES)
+    _STALE_FILES.extend(name for name in os.listdir(STORE.directory) if name.endswith(SUFFIX) and name not in known)
+    if replayed or _STALE_FILES:
+        # compact right away so the next boot does not replay the same tail
+        _snapshot()
+
+
+# background tasks of the app, kept under typed keys until cleanup cancels them
+ROOM_SWEEPER = web.AppKey('room_sweeper', asyncio.Task)
+ROUND_TIMERS = web.AppKey('round_timers', asyncio.Task)
+LOOP_LAG_TASK = web.AppKey('loop_lag_task', asyncio.Task)
+
+
+async def _sweep_forever() -> None:
+    while True:
+        await asyncio.sleep(ROOM_SWEEP_SECONDS)
+        try:
+            await sweep_rooms()
+        except Exception:
+            log.exception('Room sweep failed')
+
+
+async def _start_sweeper(app: web.Application) -> None:
+    app[ROOM_SWEEPER] = asyncio.ensure_future(_sweep_forever())
+
+
+async def _stop_sweeper(app: web.Application) -> None:
+    app[ROOM_SWEEPER].cancel()
+
+
+async def _tick_forever() -> None:
+    # the single driver of every room's deadline
+    while True:
+        await asyncio.sleep(TIMERS.tick)
+        TIMERS.advance()
+
+
+async def _start_timers(app: web.Application) -> None:
+    app[ROUND_TIMERS] = asyncio.ensure_future(_tick_forever())
+
+
+async def _stop_timers(app: web.Application) -> None:
+    app[ROUND_TIMERS].cancel()
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.REGISTRY.render(), content_type='text/plain', charset='utf-8', headers={'X-Prometheus-Format': '0.0.4'})
+
+
+async def _start_loop_monitor(app: web.Application) -> None:
+    app[LOOP_LAG_TASK] = asyncio.ensure_future(metrics.monitor_loop_lag())
+
+
+async def _stop_loop_monitor(app: web.Application) -> None:
+    task = app.get(LOOP_LAG_TASK)
+    if task is not None:
+        task.cancel()
+
+
+async def _stop_rooms(app: web.Application) -> None:
+    for room in ROOMS.values():
+        room.stop()
+
+
+async def _close_journal(app: web.Application) -> None:
+    global JOURNAL
+    if JOURNAL is not None:
+        # drain the writer thread without blocking the loop
+        await asyncio.get_running_loop().run_in_executor(None, JOURNAL.close)
+        JOURNAL = None
+
+
 def create_app() -> web.Application:
     app = web.Application()
+    app.on_startup.append(_open_journal)
+    app.on_startup.append(_start_sweeper)
+    app.on_startup.append(_start_timers)
+    app.on_cleanup.append(_stop_sweeper)
+    app.on_cleanup.append(_stop_timers)
+    app.on_cleanup.append(_stop_rooms)
+    app.on_cleanup.append(_close_journal)
     # serve static files from the repo's `web/` directory
     if os.path.isdir(STATIC_DIR):
         app.router.add_static('/', STATIC_DIR, show_index=True)
     else:
-        logging.warning('Static dir not found: %s', STATIC_DIR)
+        log.warning('Static dir not found: %s', STATIC_DIR)
     # ws endpoint
     app.router.add_get('/ws', websocket_handler)
+    if os.environ.get('METRICS', '0') not in ('', '0', 'false'):
+        # Prometheus metrics; without METRICS the instrumentation stays disabled
+        metrics.enable()
+        app.router.add_get('/metrics', metrics_handler)
+        app.on_startup.append(_start_loop_monitor)
+        app.on_cleanup.append(_stop_loop_monitor)
     return app
 
 
 def main() -> None:
-    import os
+    configure_logging()
     app = create_app()
-    host = '0.0.0.0'
+    host = os.environ.get('HOST', '0.0.0.0')
     # Use PORT from environment (Render provides $PORT). Fallback to 6789 for local dev.
     port = int(os.environ.get('PORT', '8000'))
     print(f"Starting server on http://{host}:{port} (WS at /ws)")
@@ -0,0 +1,135 @@
+"""Wire encodings of the protocol, negotiated as WebSocket subprotocols.
+
+- `cah.v1.json`: JSON text frames (also used when the client asks for no
+  subprotocol, so old clients keep working);
+- `cah.v1.msgpack`: the same messages as MessagePack binary frames; only
+  offered when the `msgpack` package is installed.
+
+Both codecs can append a field to an already encoded map (`with_field`), so
+broadcasts encode the shared public state once and splice per-connection
+fields (the hand, seq numbers) into it.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional, Tuple, Union
+
+Encoded = Union[str, bytes]
+
+
+def _json_encoder():
+    """Pick the JSON encoder for outgoing frames.
+
+    orjson is used when installed (set `JSON_ENCODER=json` to force the
+    standard library); both produce compact JSON as `str`.
+    """
+    if os.environ.get('JSON_ENCODER', 'orjson') == 'orjson':
+        try:
+            import orjson
+        except ImportError:
+            pass
+        else:
+            return lambda obj: orjson.dumps(obj).decode('utf-8')
+    return json.JSONEncoder(separators=(',', ':')).encode
+
+
+class JsonCodec:
+    name = 'json'
+    subprotocol = 'cah.v1.json'
+    binary = False
+
+    def __init__(self) -> None:
+        self.dumps = _json_encoder()
+        self.loads = json.loads
+
+    def integer(self, value: int) -> str:
+        return str(value)
+
+    def with_field(self, obj: str, key: str, value: str) -> str:
+        """Append `"key": value` to an encoded JSON object without re-encoding it."""
+        sep = '' if obj == '{}' else ','
+        return f'{obj[:-1]}{sep}"{key}":{value}}}'
+
+    def body(self, obj: str) -> str:
+        """The part of an encoded object that `with_field` copies verbatim."""
+        return obj[:-1]
+
+
+class MsgpackCodec:
+    name = 'msgpack'
+    subprotocol = 'cah.v1.msgpack'
+    binary = True
+
+    def __init__(self, msgpack) -> None:
+        self._packb = msgpack.Packer(use_bin_type=True).pack
+        self._unpackb = msgpack.unpackb
+        self.dumps = self._packb
+
+    def loads(self, data: bytes) -> Any:
+        return self._unpackb(data, raw=False)
+
+    def integer(self, value: int) -> bytes:
+        return self._packb(value)
+
+    def _split(self, obj: bytes) -> Tuple[int, bytes]:
+        head = obj[0]
+        if 0x80 <= head <= 0x8f:
+            return head & 0x0f, obj[1:]
+        if head == 0xde:
+            return int.from_bytes(obj[1:3], 'big'), obj[3:]
+        if head == 0xdf:
+            return int.from_bytes(obj[1:5], 'big'), obj[5:]
+        raise ValueError('not an encoded map')
+
+    def with_field(self, obj: bytes, key: str, value: bytes) -> bytes:
+        """Append `key: value` to an encoded map: bump the count in its header."""
+        count, body = self._split(obj)
+        count += 1
+        if count < 16:
+            header = bytes((0x80 | count,))
+        elif count < 0x10000:
+            header = b'\xde' + count.to_bytes(2, 'big')
+        else:
+            header = b'\xdf' + count.to_bytes(4, 'big')
+        return header + body + self._packb(key) + value
+
+    def body(self, obj: bytes) -> bytes:
+        """The part of an encoded map that `with_field` copies verbatim."""
+        return self._split(obj)[1]
+
+
+def _msgpack_codec() -> Optional[MsgpackCodec]:
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return MsgpackCodec(msgpack)
+
+
+JSON = JsonCodec()
+MSGPACK = _msgpack_codec()
+Codec = Union[JsonCodec, MsgpackCodec]
+
+# offered subprotocols; the client's order decides which one is used
+CODECS: Dict[str, Codec] = {c.subprotocol: c for c in (MSGPACK, JSON) if c is not None}
+SUBPROTOCOLS = tuple(CODECS)
+
+
+def for_subprotocol(name: Optional[str]) -> Codec:
+    return CODECS.get(name, JSON) if name else JSON
+
+
+class Reply:
+    """A constant message, encoded at most once per codec."""
+
+    __slots__ = ('message', '_encoded')
+
+    def __init__(self, message: Dict[str, Any]) -> None:
+        self.message = message
+        self._encoded: Dict[str, Encoded] = {}
+
+    def encode(self, codec: Codec) -> Encoded:
+        data = self._encoded.get(codec.name)
+        if data is None:
+            data = self._encoded[codec.name] = codec.dumps(self.message)
+        return data
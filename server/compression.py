@@ -0,0 +1,140 @@
+"""Compression policy for outgoing WebSocket frames (permessage-deflate).
+
+Left alone, aiohttp deflates every frame of a connection that negotiated
+permessage-deflate. Connections set up with `prepare()` have that turned off
+and their frames go through `send()` instead:
+
+- frames shorter than `MIN_BYTES` are sent uncompressed: deflating a vote
+  ack costs more CPU than the bytes it saves;
+- larger frames are deflated without context takeover (every segment ends
+  with a full flush, so it never refers to earlier data). A segment that many
+  connections share, such as the public state of a broadcast (`Shared`), is
+  therefore deflated once and its output reused in every connection's frame;
+  only the per-connection parts (envelope, hand, seq numbers) are deflated
+  per frame.
+
+Frames compressed this way are valid for clients with or without context
+takeover and for any window the client allows.
+"""
+
+import os
+import time
+import zlib
+from typing import Dict, Optional
+
+from aiohttp import WSMsgType, web
+
+from server import metrics
+from server.codec import Encoded
+
+# offer permessage-deflate at all (`WS_COMPRESS=0` turns it off)
+COMPRESS = os.environ.get('WS_COMPRESS', '1').lower() not in ('0', 'off', 'false', 'no')
+# largest window used, even when the client allows more (9-15)
+WBITS = min(max(int(os.environ.get('WS_COMPRESS_WBITS', '15')), 9), 15)
+LEVEL = int(os.environ.get('WS_COMPRESS_LEVEL', '1'))
+MIN_BYTES = int(os.environ.get('WS_COMPRESS_MIN_BYTES', '512'))
+
+_RSV1 = 0x40
+# every full flush ends with this; RFC 7692 has senders strip it from messages
+_TRAILER = b'\x00\x00\xff\xff'
+
+# one compressor per window size, reset by the full flush after each segment
+_compressors: Dict[int, 'zlib._Compress'] = {}
+
+
+def deflate(data: bytes, wbits: int) -> bytes:
+    """Raw deflate of `data` that does not depend on anything deflated before."""
+    compressor = _compressors.get(wbits)
+    if compressor is None:
+        compressor = _compressors[wbits] = zlib.compressobj(LEVEL, zlib.DEFLATED, -wbits)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+
+class Shared:
+    """A segment of many connections' frames, deflated at most once per window size."""
+
+    __slots__ = ('data', '_deflated')
+
+    def __init__(self, data: Encoded) -> None:
+        self.data = data.encode('utf-8') if isinstance(data, str) else data
+        self._deflated: Dict[int, bytes] = {}
+
+    def deflate(self, wbits: int) -> bytes:
+        deflated = self._deflated.get(wbits)
+        if deflated is None:
+            deflated = self._deflated[wbits] = deflate(self.data, wbits)
+        elif metrics.ENABLED:
+            metrics.DEFLATE_REUSED.inc(len(self.data))
+        return deflated
+
+
+def shared(data: Encoded) -> Optional[Shared]:
+    """`Shared` wrapper for `data`, or None when it is too small to be compressed."""
+    return Shared(data) if COMPRESS and len(data) >= MIN_BYTES else None
+
+
+def prepare(ws: web.WebSocketResponse) -> int:
+    """Take over compression of a prepared connection.
+
+    Returns the window bits to deflate with, or 0 when the client did not
+    negotiate permessage-deflate (frames are then sent as they are).
+    """
+    wbits = ws.compress
+    writer = getattr(ws, '_writer', None)
+    if not wbits or not hasattr(writer, '_write_websocket_frame'):
+        return 0
+    # aiohttp would deflate every frame with its own per-connection compressor
+    writer.compress = 0
+    return min(int(wbits), WBITS)
+
+
+async def send(ws: web.WebSocketResponse, data: Encoded, wbits: int, segment: Optional[Shared] = None) -> None:
+    """Send `data` on a connection set up with `prepare()`.
+
+    `segment`, when given, is a part of `data` shared with other connections:
+    its deflated form is reused instead of compressing it again.
+    """
+    binary = isinstance(data, bytes)
+    # for text the character count is close enough to the encoded size
+    if len(data) < MIN_BYTES:
+        if metrics.ENABLED:
+            metrics.DEFLATE_SKIPPED.inc()
+        if binary:
+            await ws.send_bytes(data)
+        else:
+            await ws.send_str(data)
+        return
+    measured = metrics.ENABLED
+    if measured:
+        started = time.perf_counter()
+    payload = data if binary else data.encode('utf-8')
+    at = payload.find(segment.data) if segment is not None else -1
+    if at < 0:
+        body = deflate(payload, wbits)
+    else:
+        end = at + len(segment.data)
+        body = segment.deflate(wbits)
+        if at:
+            body = deflate(payload[:at], wbits) + body
+        if end < len(payload):
+            body += deflate(payload[end:], wbits)
+    body = body[:-len(_TRAILER)]
+    if measured:
+        metrics.DEFLATE_SECONDS.inc(time.perf_counter() - started)
+        metrics.DEFLATE_FRAMES.inc()
+        metrics.DEFLATE_IN_BYTES.inc(len(payload))
+        metrics.DEFLATE_OUT_BYTES.inc(len(body))
+    await _send_deflated(ws, body, WSMsgType.BINARY if binary else WSMsgType.TEXT)
+
+
+async def _send_deflated(ws: web.WebSocketResponse, body: bytes, opcode: int) -> None:
+    # aiohttp has no public API for an already deflated message: write the
+    # frame with RSV1 set and apply the flow control its own send_frame does
+    writer = ws._writer
+    if writer is None:
+        raise RuntimeError('Call .prepare() first')
+    writer._write_websocket_frame(body, opcode, _RSV1)
+    if writer._output_size > writer._limit:
+        writer._output_size = 0
+        if writer.protocol._paused:
+            await writer.protocol._drain_helper()
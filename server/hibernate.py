@@ -0,0 +1,62 @@
+"""On-disk storage for hibernated rooms.
+
+An idle room is written as its `Room.dump()` (JSON, zlib-compressed) to a
+file of its own and dropped from memory; the next command for it loads the
+file back. Every hibernation writes a new file name, so a journal snapshot
+that refers to an older file stays valid until the next snapshot replaces it
+(the server removes superseded files only after that).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, Iterable
+
+SUFFIX = '.room'
+
+
+class RoomStore:
+    def __init__(self, directory: str, fsync: bool = False) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync = fsync
+
+    @classmethod
+    def temporary(cls) -> 'RoomStore':
+        """Store in a fresh temporary directory (rooms do not outlive the process)."""
+        return cls(tempfile.mkdtemp(prefix='cah-rooms-'))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def save(self, room_id: str, data: Dict[str, Any]) -> str:
+        """Write `data` to a new file and return its name (relative to the store)."""
+        digest = hashlib.blake2b(room_id.encode('utf-8'), digest_size=8).hexdigest()
+        name = f'{digest}-{time.time_ns():x}{SUFFIX}'
+        blob = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        path = self._path(name)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(blob)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return name
+
+    def load(self, name: str) -> Dict[str, Any]:
+        with open(self._path(name), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def remove(self, names: Iterable[str]) -> None:
+        for name in names:
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,258 @@
+"""Append-only command journal with periodic snapshots.
+
+The server appends one JSON record per applied command (`create`, `join`,
+`ready`, `start`, `submit`, `vote`). Records are handed to a writer thread,
+which writes everything that queued up while the previous write was in
+flight in a single `write()` (group commit), so the event loop never waits on
+disk I/O.
+
+Layout of the journal directory:
+
+- `journal-<gen>.log`: JSON lines, one record per line, after a
+  `{"header": ...}` line when the journal has a `header` (e.g. what the
+  records refer to, checked by the server before replaying them);
+- `snapshot-<gen>.json`: state of every room before the first record of
+  `journal-<gen>.log`.
+
+Booting loads the newest readable snapshot and replays the segments from its
+generation on. A torn last line (crash mid-write) is ignored. After a snapshot
+is written, older segments and snapshots are deleted.
+
+`fsync` modes: `batch` (fsync after every group commit; acknowledged commands
+can still be lost if the process dies before the batch is written),
+`interval` (at most once per `fsync_interval` seconds) and `off` (leave it to
+the OS).
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+FSYNC_MODES = ('batch', 'interval', 'off')
+_SEGMENT_RE = re.compile(r'^journal-(\d+)\.log$')
+_SNAPSHOT_RE = re.compile(r'^snapshot-(\d+)\.json$')
+
+log = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    __slots__ = ('state', 'written')
+
+    def __init__(self, state: Dict[str, Any], written: Optional[Callable[[], None]]) -> None:
+        self.state = state
+        self.written = written
+
+
+class Journal:
+    def __init__(self, directory: str, fsync: str = 'batch', fsync_interval: float = 1.0, snapshot_every: int = 10000,
+                 header: Optional[Dict[str, Any]] = None) -> None:
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f'fsync must be one of {FSYNC_MODES}, got {fsync!r}')
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        # take a snapshot after this many records (see `needs_snapshot`)
+        self.snapshot_every = snapshot_every
+        self.records_since_snapshot = 0
+        # written at the start of every new segment; `load` fills `headers`
+        # with the header of each segment to replay (None if it has none)
+        self.header = header
+        self.headers: Dict[int, Optional[Dict[str, Any]]] = {}
+        self._gen = 0
+        self._file = None
+        self._last_fsync = 0.0
+        self._pending: List[Any] = []
+        self._cond = threading.Condition()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    # -- boot ---------------------------------------------------------------
+
+    def _generations(self, pattern: 're.Pattern[str]') -> List[int]:
+        gens = []
+        for name in os.listdir(self.directory):
+            m = pattern.match(name)
+            if m:
+                gens.append(int(m.group(1)))
+        return sorted(gens)
+
+    def _path(self, kind: str, gen: int) -> str:
+        ext = 'json' if kind == 'snapshot' else 'log'
+        return os.path.join(self.directory, f'{kind}-{gen:08d}.{ext}')
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+        """Return `(snapshot_state, records)` to rebuild the state from.
+
+        `records` is a lazy iterator over the journal tail, oldest first.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        state = None
+        base = 0
+        for gen in reversed(self._generations(_SNAPSHOT_RE)):
+            try:
+                with open(self._path('snapshot', gen), encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                log.warning('journal: skipping unreadable snapshot %d', gen)
+                continue
+            base = gen
+            break
+        segments = [g for g in self._generations(_SEGMENT_RE) if g >= base]
+        self._gen = max([base] + segments) + 1
+        self.headers = {gen: self._read_header(gen) for gen in segments}
+        return state, self._replay(segments)
+
+    def _read_header(self, gen: int) -> Optional[Dict[str, Any]]:
+        with open(self._path('journal', gen), 'rb') as f:
+            line = f.readline()
+        if not line.startswith(b'{"header":') or not line.endswith(b'\n'):
+            return None
+        return json.loads(line)['header']
+
+    def _replay(self, segments: List[int]) -> Iterator[Dict[str, Any]]:
+        for gen in segments:
+            with open(self._path('journal', gen), 'rb') as f:
+                for lineno, line in enumerate(f, 1):
+                    if not line.endswith(b'\n'):
+                        log.warning('journal: ignoring torn record at the end of segment %d', gen)
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        log.error('journal: corrupt record in segment %d line %d', gen, lineno)
+                        raise
+                    if lineno == 1 and self.headers.get(gen) is not None:
+                        continue
+                    self.records_since_snapshot += 1
+                    yield record
+
+    # -- writing ------------------------------------------------------------
+
+    def start(self) -> None:
+        """Open a new segment and start the writer thread (call after `load`)."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name='journal-writer', daemon=True)
+        self._thread.start()
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Queue `record` for the next group commit (never blocks on I/O).
+
+        The record must not be mutated afterwards; it is encoded by the writer thread.
+        """
+        self.records_since_snapshot += 1
+        with self._cond:
+            self._pending.append(record)
+            self._idle.clear()
+            self._cond.notify()
+
+    def needs_snapshot(self) -> bool:
+        return self.records_since_snapshot >= self.snapshot_every
+
+    def snapshot(self, state: Dict[str, Any], written: Optional[Callable[[], None]] = None) -> None:
+        """Queue a snapshot of `state`, taken after every record appended so far.
+
+        `state` must be a private copy: it is encoded by the writer thread.
+        `written` is called on the writer thread once the snapshot is on disk
+        (e.g. to delete files only older snapshots refer to).
+        """
+        self.records_since_snapshot = 0
+        with self._cond:
+            self._pending.append(_Snapshot(state, written))
+            self._idle.clear()
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is written; for shutdown and tests."""
+        return self._idle.wait(timeout)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._idle.set()
+                    self._cond.wait()
+                batch, self._pending = self._pending, []
+                closing = self._closing
+            try:
+                self._write_batch(batch)
+            except Exception:
+                log.exception('journal: write failed (%d items lost)', len(batch))
+            if closing and not self._pending:
+                self._sync(force=True)
+                self._idle.set()
+                return
+
+    def _write_batch(self, batch: List[Any]) -> None:
+        lines: List[bytes] = []
+        for item in batch:
+            if isinstance(item, _Snapshot):
+                self._write_lines(lines)
+                lines = []
+                self._rotate(item.state)
+                if item.written is not None:
+                    item.written()
+            else:
+                lines.append(json.dumps(item, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._write_lines(lines)
+
+    def _write_lines(self, lines: List[bytes]) -> None:
+        if not lines:
+            return
+        self._file.write(b''.join(lines))
+        self._file.flush()
+        self._sync()
+
+    def _sync(self, force: bool = False) -> None:
+        if self._file is None or (self.fsync == 'off' and not force):
+            return
+        now = time.monotonic()
+        if self.fsync == 'interval' and not force and now - self._last_fsync < self.fsync_interval:
+            return
+        os.fsync(self._file.fileno())
+        self._last_fsync = now
+
+    def _open_segment(self) -> None:
+        self._file = open(self._path('journal', self._gen), 'ab')
+        if self.header is not None:
+            self._file.write(json.dumps({"header": self.header}, separators=(',', ':')).encode('utf-8') + b'\n')
+            self._file.flush()
+
+    def _rotate(self, state: Dict[str, Any]) -> None:
+        # close the current segment, start the next one and write the snapshot that precedes it
+        self._sync(force=True)
+        self._file.close()
+        self._gen += 1
+        gen = self._gen
+        self._open_segment()
+        path = self._path('snapshot', gen)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        for old in self._generations(_SEGMENT_RE):
+            if old < gen:
+                os.remove(self._path('journal', old))
+        for old in self._generations(_SNAPSHOT_RE):
+            if old < gen:
+                os.remove(self._path('snapshot', old))
+        log.info('journal: snapshot %d written', gen)
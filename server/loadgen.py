@@ -0,0 +1,359 @@
+"""Async load generator for the WebSocket server.
+
+Spins up N rooms x M simulated players that play real games through `/ws`
+(create, join, ready, submit, vote) and measures, per action, the latency
+from sending it to receiving the broadcast that reflects it. Latencies go
+into HDR-style histograms (log-linear buckets, <1% relative error), and
+the report includes throughput and error/timeout rates.
+
+By default the server runs in this process (`server.app.create_app()` on an
+ephemeral port), so client and server share one CPU; pass `--url` to load a
+server running elsewhere.
+
+Examples:
+
+    python -m server.loadgen --rooms 50 --players 4 --duration 10
+    python -m server.loadgen --ramp 10:10:200 --duration 5 --slo-ms 50
+    python -m server.loadgen --url ws://localhost:8000/ws --rooms 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import ClientSession, TCPConnector, WSMsgType
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+class Histogram:
+    """Log-linear latency histogram (values in microseconds).
+
+    Values below 128 are exact; above that each power of two is split into
+    64 buckets, so every recorded value is within 1/64 of its bucket.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    @staticmethod
+    def _bucket(value: int) -> int:
+        shift = max(value.bit_length() - 7, 0)
+        return (value >> shift) << shift
+
+    def record(self, value: int) -> None:
+        value = max(int(value), 0)
+        b = self._bucket(value)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: 'Histogram') -> None:
+        for b, n in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + n
+        if other.count:
+            self.min = other.min if not self.count else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, p: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(int(round(p / 100.0 * self.count)), 1)
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                return min(b, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class ActionError(Exception):
+    pass
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.latency: Dict[str, Histogram] = {}
+        self.sent: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.timeouts: Dict[str, int] = {}
+        self.received = 0
+        self.received_bytes = 0
+        self.rounds = 0
+        self.failed_rooms = 0
+
+    def histogram(self, action: str) -> Histogram:
+        h = self.latency.get(action)
+        if h is None:
+            h = self.latency[action] = Histogram()
+        return h
+
+    def overall(self) -> Histogram:
+        total = Histogram()
+        for h in self.latency.values():
+            total.merge(h)
+        return total
+
+
+class SimPlayer:
+    """One simulated client: a WebSocket plus the broadcasts it is waiting for."""
+
+    def __init__(self, ws, room: str, pid: str, stats: Stats, timeout: float) -> None:
+        self.ws = ws
+        self.room = room
+        self.pid = pid
+        self.stats = stats
+        self.timeout = timeout
+        # (predicate, future, is_request): requests also resolve on an error reply
+        self._waiters: List[Tuple[Predicate, asyncio.Future, bool]] = []
+        self._reader = asyncio.ensure_future(self._read())
+
+    async def _read(self) -> None:
+        async for msg in self.ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            self.stats.received += 1
+            self.stats.received_bytes += len(msg.data)
+            data = json.loads(msg.data)
+            if 'error' in data:
+                # errors are sent only to the connection that made the request (oldest first)
+                for i, (_, fut, is_request) in enumerate(self._waiters):
+                    if is_request:
+                        del self._waiters[i]
+                        if not fut.done():
+                            fut.set_exception(ActionError(data['error']))
+                        break
+                continue
+            remaining = []
+            for pred, fut, is_request in self._waiters:
+                if fut.done():
+                    continue
+                if pred(data):
+                    fut.set_result(data)
+                else:
+                    remaining.append((pred, fut, is_request))
+            self._waiters = remaining
+
+    def expect(self, predicate: Predicate, is_request: bool = False) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((predicate, fut, is_request))
+        return fut
+
+    async def wait(self, fut: asyncio.Future, action: str) -> Dict[str, Any]:
+        try:
+            return await asyncio.wait_for(fut, self.timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts[action] = self.stats.timeouts.get(action, 0) + 1
+            raise
+        except ActionError:
+            self.stats.errors[action] = self.stats.errors.get(action, 0) + 1
+            raise
+
+    async def request(self, action: str, payload: Dict[str, Any], predicate: Predicate) -> Dict[str, Any]:
+        """Send `payload` and wait for the message matching `predicate`, recording the latency."""
+        fut = self.expect(predicate, is_request=True)
+        start = time.perf_counter()
+        self.stats.sent[action] = self.stats.sent.get(action, 0) + 1
+        await self.ws.send_str(json.dumps(payload))
+        data = await self.wait(fut, action)
+        self.stats.histogram(action).record((time.perf_counter() - start) * 1e6)
+        return data
+
+    async def close(self) -> None:
+        await self.ws.close()
+        self._reader.cancel()
+
+
+async def play_room(session: ClientSession, url: str, players: int, deadline: float, stats: Stats, think: float, timeout: float) -> None:
+    """Create a room, seat `players` players and play rounds until `deadline`."""
+    room = f'load-{uuid.uuid4().hex[:12]}'
+    clients: List[SimPlayer] = []
+    rng = random.Random()
+    try:
+        for i in range(players):
+            ws = await session.ws_connect(url)
+            clients.append(SimPlayer(ws, room, f'p{i}', stats, timeout))
+        await clients[0].request('create', {'action': 'create', 'room': room}, lambda m: m.get('status') == 'created' and m.get('room') == room)
+        for c in clients:
+            await c.request('join', {'action': 'join', 'room': room, 'player_id': c.pid, 'name': c.pid},
+                            lambda m, pid=c.pid: m.get('event') == 'player_joined' and any(p['id'] == pid for p in m['state']['players']))
+        started = [c.expect(lambda m: m.get('event') == 'started') for c in clients]
+        await asyncio.gather(*(c.request('ready', {'action': 'ready', 'room': room, 'player_id': c.pid},
+                                         lambda m, pid=c.pid: m.get('event') == 'player_ready' and m.get('player') == pid) for c in clients))
+        for c, fut in zip(clients, started):
+            await c.wait(fut, 'start')
+
+        async def act(c: SimPlayer, action: str, payload: Dict[str, Any], predicate: Predicate) -> None:
+            if think:
+                await asyncio.sleep(rng.uniform(0, think))
+            await c.request(action, payload, predicate)
+
+        while time.monotonic() < deadline:
+            await asyncio.gather(*(act(c, 'submit', {'action': 'submit', 'room': room, 'player_id': c.pid, 'card_index': 0},
+                                       lambda m, pid=c.pid: m.get('event') == 'submitted' and m.get('player') == pid) for c in clients))
+            # one leader gets every vote except its own, so rounds never end in a tie
+            leader = rng.choice(clients).pid
+            targets = {c.pid: leader if c.pid != leader else next(x.pid for x in clients if x.pid != leader) for c in clients}
+            await asyncio.gather(*(act(c, 'vote', {'action': 'vote', 'room': room, 'voter_id': c.pid, 'voted_player_id': targets[c.pid]},
+                                       lambda m, pid=c.pid: m.get('event') == 'vote_cast' and m.get('voter') == pid) for c in clients))
+            stats.rounds += 1
+    except (asyncio.TimeoutError, ActionError, OSError) as e:
+        logging.debug('loadgen: room %s failed: %r', room, e)
+        stats.failed_rooms += 1
+    finally:
+        await asyncio.gather(*(c.close() for c in clients), return_exceptions=True)
+
+
+async def run_stage(url: str, rooms: int, players: int, duration: float, think: float, timeout: float) -> Tuple[Stats, float]:
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = time.monotonic() + duration
+    # every player holds its connection for the whole run: no pool limit
+    async with ClientSession(connector=TCPConnector(limit=0)) as session:
+        await asyncio.gather(*(play_room(session, url, players, deadline, stats, think, timeout) for _ in range(rooms)))
+    return stats, time.perf_counter() - started
+
+
+def summarize(stats: Stats, elapsed: float) -> Dict[str, Any]:
+    actions = {}
+    for action in sorted(stats.sent):
+        h = stats.histogram(action)
+        actions[action] = {
+            'sent': stats.sent[action],
+            'errors': stats.errors.get(action, 0),
+            'timeouts': stats.timeouts.get(action, 0),
+            'p50_ms': h.percentile(50) / 1000,
+            'p90_ms': h.percentile(90) / 1000,
+            'p99_ms': h.percentile(99) / 1000,
+            'p999_ms': h.percentile(99.9) / 1000,
+            'max_ms': h.max / 1000,
+        }
+    total = stats.overall()
+    sent = sum(stats.sent.values())
+    failures = sum(stats.errors.values()) + sum(stats.timeouts.values())
+    return {
+        'elapsed_s': elapsed,
+        'actions': actions,
+        'actions_per_s': total.count / elapsed if elapsed else 0.0,
+        'messages_per_s': stats.received / elapsed if elapsed else 0.0,
+        'mb_per_s': stats.received_bytes / elapsed / 1e6 if elapsed else 0.0,
+        'rounds': stats.rounds,
+        'failed_rooms': stats.failed_rooms,
+        'error_rate': failures / sent if sent else 0.0,
+        'p50_ms': total.percentile(50) / 1000,
+        'p99_ms': total.percentile(99) / 1000,
+    }
+
+
+def print_summary(label: str, summary: Dict[str, Any]) -> None:
+    print(f'\n== {label}: {summary["actions_per_s"]:,.0f} actions/s, {summary["messages_per_s"]:,.0f} msgs/s '
+          f'({summary["mb_per_s"]:.1f} MB/s), {summary["rounds"]} rounds, error rate {summary["error_rate"]:.2%}, '
+          f'{summary["failed_rooms"]} failed rooms')
+    print(f'{"action":8s} {"sent":>8s} {"err":>5s} {"tmo":>5s} {"p50":>9s} {"p90":>9s} {"p99":>9s} {"p99.9":>9s} {"max":>9s}  (ms)')
+    for action, a in summary['actions'].items():
+        print(f'{action:8s} {a["sent"]:8d} {a["errors"]:5d} {a["timeouts"]:5d} {a["p50_ms"]:9.2f} {a["p90_ms"]:9.2f} '
+              f'{a["p99_ms"]:9.2f} {a["p999_ms"]:9.2f} {a["max_ms"]:9.2f}')
+
+
+async def _local_server():
+    from aiohttp import web
+
+    from server.app import create_app
+
+    runner = web.AppRunner(create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'ws://127.0.0.1:{port}/ws'
+
+
+def _parse_ramp(value: str) -> Tuple[int, int, int]:
+    try:
+        start, step, stop = (int(x) for x in value.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('ramp must be START:STEP:MAX (rooms)')
+    if start <= 0 or step <= 0 or stop < start:
+        raise argparse.ArgumentTypeError('ramp needs 0 < START <= MAX and STEP > 0')
+    return start, step, stop
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    runner = None
+    url = args.url
+    if url is None:
+        runner, url = await _local_server()
+    try:
+        if not args.ramp:
+            stats, elapsed = await run_stage(url, args.rooms, args.players, args.duration, args.think, args.timeout)
+            summary = summarize(stats, elapsed)
+            print_summary(f'{args.rooms} rooms x {args.players} players', summary)
+            return {'stages': [dict(summary, rooms=args.rooms)]}
+        start, step, stop = args.ramp
+        stages = []
+        saturation = None
+        for rooms in range(start, stop + 1, step):
+            stats, elapsed = await run_stage(url, rooms, args.players, args.duration, args.think, args.timeout)
+            summary = dict(summarize(stats, elapsed), rooms=rooms)
+            stages.append(summary)
+            print_summary(f'ramp: {rooms} rooms x {args.players} players', summary)
+            if summary['p99_ms'] > args.slo_ms or summary['error_rate'] > args.max_error_rate:
+                print(f'\nSLO broken at {rooms} rooms (p99 {summary["p99_ms"]:.1f} ms, error rate {summary["error_rate"]:.2%})')
+                break
+            saturation = summary
+        if saturation is not None:
+            print(f'Saturation point: {saturation["rooms"]} rooms, {saturation["actions_per_s"]:,.0f} actions/s '
+                  f'within p99 <= {args.slo_ms} ms')
+        else:
+            print('The first ramp stage already broke the SLO')
+        return {'stages': stages, 'saturation_rooms': saturation['rooms'] if saturation else None}
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m server.loadgen', description='Load generator for the game WebSocket server.')
+    parser.add_argument('--url', help='WebSocket URL (default: start server.app in this process)')
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--players', type=int, default=4, help='players per room (>= 3)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per run (or per ramp stage)')
+    parser.add_argument('--think', type=float, default=0.0, help='max random think time before each action (s)')
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds to wait for a broadcast')
+    parser.add_argument('--ramp', type=_parse_ramp, help='START:STEP:MAX rooms; stops at the first stage over the SLO')
+    parser.add_argument('--slo-ms', type=float, default=100.0, help='p99 latency target for ramp mode')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='error rate that ends a ramp')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+    if args.players < 3:
+        parser.error('--players must be at least 3 (votes must be able to break ties)')
+    result = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
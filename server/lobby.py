@@ -0,0 +1,175 @@
+"""Lobby index: the room summaries behind `list`, kept up to date incrementally.
+
+Every room has one `Entry` (players, started, creation time), updated when a
+command changes it rather than rebuilt per request. Entries are kept sorted
+by creation time in three views:
+
+- `all`: every room (hibernated rooms included);
+- `open`: rooms whose game has not started;
+- `joinable`: open rooms with a free seat.
+
+A page is a bisect plus a slice, however many rooms there are. Pages are
+addressed by an opaque cursor (the sort key of the last room returned), which
+stays valid while rooms come and go.
+
+Connections can subscribe to a view. Changes are collected and pushed at most
+every `push_interval` seconds as one `lobby` event per view: `rooms` holds the
+entries that entered the view or changed in it, `removed` the ids that left
+it. A room that changes ten times in one interval is sent once.
+"""
+
+import asyncio
+import bisect
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from server.codec import Reply
+
+VIEWS = ('all', 'open', 'joinable')
+# rooms per `list` page by default and at most
+PAGE_SIZE = int(os.environ.get('LOBBY_PAGE_SIZE', '50'))
+PAGE_MAX = int(os.environ.get('LOBBY_PAGE_MAX', '500'))
+# how long changes are collected before subscribers get them
+PUSH_SECONDS = float(os.environ.get('LOBBY_PUSH_SECONDS', '0.25'))
+
+Key = Tuple[float, str]
+
+
+class Entry(NamedTuple):
+    room: str
+    players: int
+    started: bool
+    created: float
+
+    @property
+    def key(self) -> Key:
+        return (self.created, self.room)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"room": self.room, "players": self.players, "started": self.started, "created": self.created}
+
+
+def cursor_of(summary: Dict[str, Any]) -> str:
+    """Cursor pointing just after the room `summary` describes."""
+    return f'{summary["created"]!r}/{summary["room"]}'
+
+
+def parse_cursor(cursor: str) -> Key:
+    """Inverse of `cursor_of`; raises ValueError for a malformed cursor."""
+    created, sep, room = cursor.partition('/')
+    if not sep:
+        raise ValueError('invalid cursor')
+    return (float(created), room)
+
+
+class Lobby:
+    def __init__(self, max_players: int, send: Callable[[Any, Reply], None], push_interval: float = 0.25) -> None:
+        self.max_players = max_players
+        self.push_interval = push_interval
+        # send(ws, reply) queues a pushed event on a connection
+        self._send = send
+        self.entries: Dict[str, Entry] = {}
+        self._views: Dict[str, List[Key]] = {view: [] for view in VIEWS}
+        # ws -> view it is subscribed to
+        self.subscribers: Dict[Any, str] = {}
+        # room id -> its entry before the first change not pushed yet
+        self._pending: Dict[str, Optional[Entry]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _in(self, view: str, entry: Optional[Entry]) -> bool:
+        if entry is None:
+            return False
+        if view == 'all':
+            return True
+        if entry.started:
+            return False
+        return view == 'open' or entry.players < self.max_players
+
+    def update(self, room_id: str, players: int, started: bool, created: float) -> None:
+        """Record a room's current summary (a no-op when nothing changed)."""
+        old = self.entries.get(room_id)
+        new = Entry(room_id, players, started, created)
+        if new == old:
+            return
+        self._move(old, new)
+        self.entries[room_id] = new
+        self._changed(room_id, old)
+
+    def remove(self, room_id: str) -> None:
+        old = self.entries.pop(room_id, None)
+        if old is None:
+            return
+        self._move(old, None)
+        self._changed(room_id, old)
+
+    def clear(self) -> None:
+        """Forget every room and subscriber."""
+        self.entries.clear()
+        for keys in self._views.values():
+            keys.clear()
+        self.subscribers.clear()
+        self._pending.clear()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def _move(self, old: Optional[Entry], new: Optional[Entry]) -> None:
+        for view, keys in self._views.items():
+            was, now = self._in(view, old), self._in(view, new)
+            if was and (not now or old.key != new.key):
+                del keys[bisect.bisect_left(keys, old.key)]
+            if now and (not was or old.key != new.key):
+                bisect.insort(keys, new.key)
+
+    def page(self, view: str, cursor: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Up to `limit` summaries of `view` after `cursor`, and the cursor of the next page (None at the end)."""
+        keys = self._views[view]
+        start = bisect.bisect_right(keys, parse_cursor(cursor)) if cursor else 0
+        rooms = [self.entries[room].summary() for _, room in keys[start:start + limit]]
+        more = start + limit < len(keys)
+        return rooms, cursor_of(rooms[-1]) if rooms and more else None
+
+    def subscribe(self, ws: Any, view: str) -> None:
+        self.subscribers[ws] = view
+
+    def unsubscribe(self, ws: Any) -> None:
+        self.subscribers.pop(ws, None)
+
+    def _changed(self, room_id: str, old: Optional[Entry]) -> None:
+        if not self.subscribers:
+            return
+        # keep the state the subscribers last saw, not the intermediate ones
+        self._pending.setdefault(room_id, old)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.push_interval, self.flush)
+
+    def flush(self) -> None:
+        """Push the pending changes to the subscribers now."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        if not pending or not self.subscribers:
+            return
+        events: Dict[str, Optional[Reply]] = {}
+        for ws, view in list(self.subscribers.items()):
+            if view not in events:
+                events[view] = self._event(view, pending)
+            if events[view] is not None:
+                self._send(ws, events[view])
+
+    def _event(self, view: str, pending: Dict[str, Optional[Entry]]) -> Optional[Reply]:
+        rooms, removed = [], []
+        for room_id, old in pending.items():
+            new = self.entries.get(room_id)
+            if self._in(view, new):
+                if new != old or not self._in(view, old):
+                    rooms.append(new.summary())
+            elif self._in(view, old):
+                removed.append(room_id)
+        if not rooms and not removed:
+            return None
+        return Reply({"event": "lobby", "filter": view, "rooms": rooms, "removed": removed})
@@ -0,0 +1,155 @@
+"""Queue-based logging for the server.
+
+Log calls on the event loop only build a `LogRecord` and put it on a queue;
+a `QueueListener` thread does the `%` formatting and the write. Records are
+emitted as one JSON object per line (or plain text with `LOG_FORMAT=text`);
+fields passed with `extra={...}` become JSON keys.
+
+Configuration (environment):
+
+- `LOG_LEVEL`: root level (default `INFO`);
+- `LOG_LEVELS`: per-logger levels, e.g. `server.app=DEBUG,server.journal=WARNING`;
+- `LOG_FORMAT`: `json` (default) or `text`;
+- `LOG_PAYLOAD_SAMPLE`: fraction of DEBUG message payloads logged (default 0.01);
+- `LOG_PAYLOAD_CHARS`: payloads are truncated to this many characters (default 512).
+
+Message payloads are logged with `log_payload`, which does nothing unless the
+logger is enabled for DEBUG and the sampler picks this call.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Any, Dict, Mapping, Optional
+
+# attributes every LogRecord has; anything else came from `extra=`
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_payload_every = 100
+_payload_chars = 512
+_payload_counter = 0
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock `prepare()` formats the message on the calling thread; here the
+    record is queued as is (only the exception text is rendered eagerly,
+    since the traceback may not survive the caller's frame).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain-text lines; fields from `extra=` are appended as `key=value`."""
+
+    def __init__(self) -> None:
+        super().__init__('%(asctime)s %(levelname)s %(name)s %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = [f'{k}={v}' for k, v in vars(record).items() if k not in _STANDARD_ATTRS and not k.startswith('_')]
+        return f"{line} {' '.join(extra)}" if extra else line
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, level = item.partition('=')
+        if not level:
+            raise ValueError(f'LOG_LEVELS entry {item!r} must look like logger=LEVEL')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(env: Mapping[str, str] = os.environ, stream=None) -> logging.handlers.QueueListener:
+    """Install the queue handler on the root logger and start the listener thread.
+
+    Replaces any handlers already on the root logger. Safe to call again
+    (the previous listener is stopped first).
+    """
+    global _listener, _payload_every, _payload_chars, _payload_counter
+    stop_logging()
+    sample = float(env.get('LOG_PAYLOAD_SAMPLE', '0.01'))
+    _payload_every = max(int(round(1 / sample)), 1) if sample > 0 else 0
+    _payload_chars = int(env.get('LOG_PAYLOAD_CHARS', '512'))
+    _payload_counter = 0
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if env.get('LOG_FORMAT', 'json') == 'text':
+        output.setFormatter(TextFormatter())
+    else:
+        output.setFormatter(JsonFormatter())
+
+    records: 'queue.SimpleQueue[logging.LogRecord]' = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(records))
+    root.setLevel(env.get('LOG_LEVEL', 'INFO').upper())
+    for name, level in _parse_levels(env.get('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush and stop the listener thread (registered with `atexit`)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def log_payload(logger: logging.Logger, text: str, payload: Any, **fields: Any) -> None:
+    """Log a sampled, truncated DEBUG record with `payload` (a message dict).
+
+    The payload is encoded on the calling thread (it may change after this
+    call), so only sampled calls pay for it; all others cost a level check
+    and a counter increment.
+    """
+    global _payload_counter
+    if not _payload_every or not logger.isEnabledFor(logging.DEBUG):
+        return
+    _payload_counter += 1
+    if _payload_counter % _payload_every:
+        return
+    encoded = json.dumps(payload, default=str, ensure_ascii=False)
+    if len(encoded) > _payload_chars:
+        encoded = f'{encoded[:_payload_chars]}... ({len(encoded)} chars)'
+    logger.debug(text, extra=dict(fields, payload=encoded))
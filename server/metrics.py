@@ -0,0 +1,220 @@
+"""Minimal Prometheus metrics (text exposition format 0.0.4), no dependencies.
+
+Instrumentation is off unless `enable()` is called (the server does it when
+`METRICS=1`). Call sites check the module-level `ENABLED` flag before timing
+anything, so a disabled metric costs one attribute lookup per event.
+
+Counters and histograms are plain Python numbers updated on the event loop
+(no locks). Gauges that describe server state (rooms, connections) are read
+from callbacks at scrape time, so they cost nothing between scrapes.
+"""
+
+import asyncio
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+ENABLED = False
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def enable() -> None:
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _num(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}')
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.value += amount
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f'{self.name}{_labels(self.labelnames, values)} {_num(child.value)}']
+
+
+class Gauge(Counter):
+    """Gauge set directly (`set`) or computed at scrape time (`callback`)."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, callback: Optional[Callable[[], float]] = None) -> None:
+        super().__init__(name, help)
+        self.callback = callback
+
+    def set(self, value: float) -> None:
+        self._default.value = value
+
+    def render(self) -> List[str]:
+        if self.callback is not None:
+            self._default.value = self.callback()
+        return super().render()
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), child.counts):
+            cumulative += n
+            le = 'le="%s"' % _num(bound)
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, values)} {_num(child.sum)}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, values)} {child.count}')
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HANDLE_SECONDS = REGISTRY.register(Histogram('cah_handle_message_seconds', 'Time to handle one WebSocket message, by action.', ('action',)))
+NOTIFY_SECONDS = REGISTRY.register(Histogram('cah_notify_room_seconds', 'Time to encode and queue one broadcast for every connection of a room.'))
+ENCODE_SECONDS = REGISTRY.register(Histogram('cah_encode_seconds', 'Time spent encoding the frames of one broadcast (without queueing them).'))
+PAYLOAD_BYTES = REGISTRY.register(Histogram('cah_broadcast_payload_bytes', 'Size of each broadcast frame.', buckets=BYTES_BUCKETS))
+FANOUT = REGISTRY.register(Counter('cah_broadcast_frames_total', 'Broadcast frames sent to connections.'))
+SEND_FAILURES = REGISTRY.register(Counter('cah_send_failures_total', 'Frames that failed to send.'))
+COALESCED = REGISTRY.register(Counter('cah_coalesced_states_total', 'Queued state frames superseded by a newer state before being sent.'))
+SLOW_DISCONNECTS = REGISTRY.register(Counter('cah_slow_disconnects_total', 'Connections closed because their outbound queue fell too far behind.'))
+DEFLATE_FRAMES = REGISTRY.register(Counter('cah_ws_deflate_frames_total', 'Frames sent compressed (permessage-deflate).'))
+DEFLATE_IN_BYTES = REGISTRY.register(Counter('cah_ws_deflate_input_bytes_total', 'Size of compressed frames before compression.'))
+DEFLATE_OUT_BYTES = REGISTRY.register(Counter('cah_ws_deflate_output_bytes_total', 'Size of compressed frames after compression.'))
+DEFLATE_SECONDS = REGISTRY.register(Counter('cah_ws_deflate_seconds_total', 'Time spent compressing frames.'))
+DEFLATE_REUSED = REGISTRY.register(Counter('cah_ws_deflate_reused_bytes_total', 'Frame bytes whose compressed form was reused from another connection.'))
+DEFLATE_SKIPPED = REGISTRY.register(Counter('cah_ws_uncompressed_frames_total', 'Frames sent uncompressed on a compressing connection because they were below the size threshold.'))
+ROUND_TIMEOUTS = REGISTRY.register(Counter('cah_round_timeouts_total', 'Round deadlines that expired before every player acted, by phase.', ('phase',)))
+AFK_REMOVED = REGISTRY.register(Counter('cah_afk_players_removed_total', 'Players removed from a game after missing too many deadlines in a row.'))
+LOOP_LAG_SECONDS = REGISTRY.register(Histogram('cah_event_loop_lag_seconds', 'How late the event loop woke a periodic timer.'))
+LOOP_LAG = REGISTRY.register(Gauge('cah_event_loop_lag_last_seconds', 'Most recent event loop lag sample.'))
+
+
+def gauge(name: str, help: str, callback: Callable[[], float]) -> Gauge:
+    """Register a gauge computed at scrape time (e.g. number of rooms)."""
+    return REGISTRY.register(Gauge(name, help, callback))
+
+
+async def monitor_loop_lag(interval: float = 0.5) -> None:
+    """Sample event loop lag forever: how much later than requested a sleep returns."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0.0)
+        LOOP_LAG_SECONDS.observe(lag)
+        LOOP_LAG.set(lag)
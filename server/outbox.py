@@ -0,0 +1,163 @@
+"""Per-connection outbound queues.
+
+Every frame for a connection goes through its `Outbox`: `put` only appends
+to a bounded deque, and a writer task (started on demand, gone when the queue
+is empty) sends the frames in order, as text (`str`) or binary (`bytes`)
+frames. A broadcast therefore never waits on the slowest connection of a room.
+
+State frames are coalesced: when a new state frame is queued while an older
+one is still waiting, the older one is replaced by its event envelope (the
+same message without the state), so a lagging client still sees every event
+but only the newest state. Plain frames (errors, replies) are always kept.
+
+Connections that negotiated permessage-deflate (`deflate` is the window
+bits) send through `server.compression`, which decides per frame whether to
+compress; a frame's `segment` is the part it shares with other connections.
+
+A connection whose queue reaches `maxsize` frames, or whose oldest queued
+frame is older than `max_lag` seconds, is considered hopeless and closed.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Optional, Union
+
+from aiohttp import WSCloseCode
+
+from server import compression, metrics
+from server.compression import Shared
+
+log = logging.getLogger(__name__)
+
+OUTBOX_SIZE = int(os.environ.get('OUTBOX_SIZE', '256'))
+OUTBOX_MAX_LAG = float(os.environ.get('OUTBOX_MAX_LAG', '10'))
+
+
+class Frame:
+    __slots__ = ('data', 'state', 'replacement', 'base', 'segment', 'queued_at')
+
+    def __init__(self, data: Union[str, bytes], state: bool, replacement: Optional[Union[str, bytes]], base: Optional[int],
+                 segment: Optional[Shared] = None) -> None:
+        self.data = data
+        # state frames can be superseded; `replacement` is what is sent instead
+        # (None: nothing) and `base` the seq their patch starts from
+        self.state = state
+        self.replacement = replacement
+        self.base = base
+        self.segment = segment
+        self.queued_at = time.monotonic()
+
+
+class Outbox:
+    def __init__(self, ws, maxsize: int = OUTBOX_SIZE, max_lag: float = OUTBOX_MAX_LAG, deflate: int = 0) -> None:
+        self.ws = ws
+        self.maxsize = maxsize
+        self.max_lag = max_lag
+        self.deflate = deflate
+        self.frames: Deque[Frame] = deque()
+        self.closed = False
+        # the queued state frame a newer state would supersede (at most one)
+        self._state: Optional[Frame] = None
+        self._writer: Optional['asyncio.Task[None]'] = None
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def put(self, data: Union[str, bytes], segment: Optional[Shared] = None) -> None:
+        """Queue a frame that is always delivered."""
+        self._append(Frame(data, False, None, None, segment))
+
+    def put_state(self, data: Union[str, bytes], replacement: Optional[Union[str, bytes]], base: Optional[int] = None,
+                  segment: Optional[Shared] = None) -> None:
+        """Queue a state frame; call `supersede()` first to coalesce with a queued one."""
+        frame = Frame(data, True, replacement, base, segment)
+        self._append(frame)
+        if not self.closed:
+            self._state = frame
+
+    def supersede(self) -> Optional[Frame]:
+        """Strip the state from the queued, unsent state frame and return it.
+
+        The caller builds the new state frame relative to the returned frame's
+        `base` (the client never received the superseded state). Returns None
+        when no state frame is waiting.
+        """
+        frame = self._state
+        if frame is None:
+            return None
+        self._state = None
+        if frame.replacement is None:
+            self.frames.remove(frame)
+        else:
+            frame.data = frame.replacement
+            frame.state = False
+            frame.segment = None
+        if metrics.ENABLED:
+            metrics.COALESCED.inc()
+        return frame
+
+    def _append(self, frame: Frame) -> None:
+        if self.closed:
+            return
+        frames = self.frames
+        if frames and (len(frames) >= self.maxsize or frame.queued_at - frames[0].queued_at > self.max_lag):
+            self._give_up(len(frames), frame.queued_at - frames[0].queued_at)
+            return
+        frames.append(frame)
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._write())
+
+    async def _write(self) -> None:
+        frames = self.frames
+        try:
+            while frames:
+                frame = frames.popleft()
+                if frame is self._state:
+                    self._state = None
+                if self.deflate:
+                    await compression.send(self.ws, frame.data, self.deflate, frame.segment)
+                elif isinstance(frame.data, bytes):
+                    await self.ws.send_bytes(frame.data)
+                else:
+                    await self.ws.send_str(frame.data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if metrics.ENABLED:
+                metrics.SEND_FAILURES.inc()
+            log.exception('Failed to send data to ws %s', getattr(self.ws, 'transport', None))
+            self.closed = True
+            frames.clear()
+            self._state = None
+        finally:
+            self._writer = None
+
+    async def drain(self) -> None:
+        """Wait until every queued frame has been sent."""
+        while self._writer is not None:
+            await asyncio.shield(self._writer)
+
+    def _give_up(self, queued: int, lag: float) -> None:
+        log.warning('Closing slow connection %s (%d frames queued, %.1fs behind)', getattr(self.ws, 'transport', None), queued, lag)
+        if metrics.ENABLED:
+            metrics.SLOW_DISCONNECTS.inc()
+        self.close()
+        asyncio.ensure_future(self._close_ws())
+
+    async def _close_ws(self) -> None:
+        try:
+            await self.ws.close(code=WSCloseCode.TRY_AGAIN_LATER, message=b'too slow')
+        except Exception:
+            log.exception('Failed to close slow connection')
+
+    def close(self) -> None:
+        """Drop queued frames and stop the writer."""
+        self.closed = True
+        self.frames.clear()
+        self._state = None
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
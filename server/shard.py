@@ -0,0 +1,363 @@
+"""Sharded deployment: several server processes on one host behind a router.
+
+`python -m server.shard --workers 4` starts four `server.app` workers on
+local ports and a front router on `--port`. Every room lives in exactly one
+worker, chosen by consistent hashing of the room id, so a game's state never
+has to be shared between processes.
+
+The router keeps one upstream WebSocket per (client, worker) pair, opened the
+first time the client sends a message for a room of that worker. Client
+messages are parsed only to read `action`/`room` and are forwarded as is;
+frames from the workers are relayed back without being decoded. `list` is
+answered by the router: it asks every worker for the same page over a control
+connection and merges the replies (every worker orders its lobby by the same
+key, so one cursor works on all of them). Lobby subscriptions (`lobby`, or
+`list` with `subscribe`) are sent to every worker over the client's
+upstreams, and each worker pushes the changes of its own rooms. `hello` options are replayed on every upstream the
+client opens later, so delta clients keep working across shards. Upstreams
+use the subprotocol (JSON or MessagePack) the client negotiated; compression
+(see server/compression.py) only happens between the router and its
+clients, never on the local upstreams.
+
+Workers that exit are restarted. With `JOURNAL_DIR` each worker journals into
+its own `shard-<n>` subdirectory; keep the worker count fixed across restarts,
+since changing it moves rooms to other shards.
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+from aiohttp import ClientSession, ClientWebSocketResponse, WSMsgType, web
+
+from server import compression, lobby
+from server.codec import JSON, SUBPROTOCOLS, for_subprotocol
+from server.logging_config import configure_logging
+
+log = logging.getLogger('server.shard')
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+STATIC_DIR = os.path.normpath(os.path.join(BASE_DIR, 'web'))
+
+
+def _hash(key: str) -> int:
+    # stable across processes and runs (unlike the built-in `hash`)
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hash ring mapping room ids to shard indexes.
+
+    Each shard owns `vnodes` points on the ring, which evens out the load;
+    adding a shard only moves the rooms that land on its new points.
+    """
+
+    def __init__(self, shards: int, vnodes: int = 64) -> None:
+        if shards <= 0:
+            raise ValueError('need at least one shard')
+        points = sorted((_hash(f'shard-{shard}#{v}'), shard) for shard in range(shards) for v in range(vnodes))
+        self._points = [p for p, _ in points]
+        self._owners = [shard for _, shard in points]
+        self.shards = shards
+
+    def shard_for(self, room_id: str) -> int:
+        i = bisect.bisect(self._points, _hash(room_id))
+        return self._owners[i % len(self._owners)]
+
+
+class Worker:
+    """One `python -m server.app` process listening on 127.0.0.1:`port`."""
+
+    def __init__(self, index: int, port: int, env: Mapping[str, str]) -> None:
+        self.index = index
+        self.port = port
+        self.url = f'ws://127.0.0.1:{port}/ws'
+        self.env = dict(env, HOST='127.0.0.1', PORT=str(port), SHARD_INDEX=str(index))
+        journal = env.get('JOURNAL_DIR')
+        if journal:
+            self.env['JOURNAL_DIR'] = os.path.join(journal, f'shard-{index}')
+        self.proc: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        self.proc = subprocess.Popen([sys.executable, '-m', 'server.app'], env=self.env, cwd=BASE_DIR)
+        log.info('worker %d started (pid %d, port %d)', self.index, self.proc.pid, self.port)
+
+    def exited(self) -> bool:
+        return self.proc is not None and self.proc.poll() is not None
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    async def wait_ready(self, session: ClientSession, timeout: float = 15.0) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if self.exited():
+                raise RuntimeError(f'worker {self.index} exited with status {self.proc.returncode}')
+            try:
+                ws = await session.ws_connect(self.url)
+            except OSError:
+                if loop.time() > deadline:
+                    raise RuntimeError(f'worker {self.index} did not start listening on port {self.port}')
+                await asyncio.sleep(0.1)
+            else:
+                await ws.close()
+                return
+
+
+class Router:
+    def __init__(self, workers: Sequence[Worker]) -> None:
+        self.workers = list(workers)
+        self.ring = HashRing(len(self.workers))
+        self.session: Optional[ClientSession] = None
+        # one control connection per worker, used for `list` (one request at a time)
+        self._control: List[Optional[ClientWebSocketResponse]] = [None] * len(self.workers)
+        self._control_locks = [asyncio.Lock() for _ in self.workers]
+
+    async def list_rooms(self, query: Dict[str, object], timeout: float = 5.0) -> dict:
+        """One `list` page over all workers: `query` holds the client's filter/cursor/limit."""
+        request = json.dumps(dict(query, action="list"))
+        results = await asyncio.gather(*(self._list_shard(i, request, timeout) for i in range(len(self.workers))), return_exceptions=True)
+        rooms: list = []
+        more = False
+        for worker, result in zip(self.workers, results):
+            if isinstance(result, BaseException):
+                log.warning('list: worker %d did not answer: %s', worker.index, result)
+                continue
+            if 'rooms' not in result:
+                # the query itself was rejected: every worker answers the same
+                return result
+            rooms.extend(result['rooms'])
+            more = more or result.get('next') is not None
+        limit = query.get('limit') or lobby.PAGE_SIZE
+        rooms.sort(key=lambda r: (r['created'], r['room']))
+        if len(rooms) > limit:
+            del rooms[limit:]
+            more = True
+        return {"rooms": rooms, "next": lobby.cursor_of(rooms[-1]) if more and rooms else None, "filter": query.get('filter') or 'all'}
+
+    async def _list_shard(self, index: int, request: str, timeout: float) -> dict:
+        async with self._control_locks[index]:
+            ws = self._control[index]
+            if ws is None or ws.closed:
+                ws = self._control[index] = await self.session.ws_connect(self.workers[index].url)
+            try:
+                await ws.send_str(request)
+                msg = await ws.receive(timeout)
+                return json.loads(msg.data)
+            except BaseException:
+                # the reply may still arrive later: never reuse this connection
+                self._control[index] = None
+                await ws.close()
+                raise
+
+    async def close(self) -> None:
+        for ws in self._control:
+            if ws is not None:
+                await ws.close()
+
+
+ROUTER = web.AppKey('router', Router)
+SUPERVISOR = web.AppKey('supervisor', asyncio.Task)
+
+
+async def _forward(ws, data: Union[str, bytes]) -> None:
+    if isinstance(data, bytes):
+        await ws.send_bytes(data)
+    else:
+        await ws.send_str(data)
+
+
+class _ClientConnection:
+    """Relays one client WebSocket to the workers that own its rooms."""
+
+    def __init__(self, router: Router, ws: web.WebSocketResponse) -> None:
+        self.router = router
+        self.ws = ws
+        # upstreams speak the subprotocol the client negotiated with the router
+        self.protocols = (ws.ws_protocol,) if ws.ws_protocol else ()
+        self.codec = for_subprotocol(ws.ws_protocol)
+        self.deflate = compression.prepare(ws)
+        self.upstreams: Dict[int, ClientWebSocketResponse] = {}
+        self.relays: List['asyncio.Task[None]'] = []
+        # replies to replayed `hello` messages the client must not see, per shard
+        self.skip: Dict[int, int] = {}
+        self.hello: Optional[str] = None
+        self.closing = False
+
+    async def upstream(self, shard: int) -> ClientWebSocketResponse:
+        up = self.upstreams.get(shard)
+        if up is None:
+            up = self.upstreams[shard] = await self.router.session.ws_connect(self.router.workers[shard].url, protocols=self.protocols)
+            self.skip[shard] = 0
+            if self.hello is not None:
+                self.skip[shard] += 1
+                await _forward(up, self.hello)
+            self.relays.append(asyncio.ensure_future(self._relay(shard, up)))
+        return up
+
+    async def _relay(self, shard: int, up: ClientWebSocketResponse) -> None:
+        try:
+            async for msg in up:
+                if msg.type not in (WSMsgType.TEXT, WSMsgType.BINARY):
+                    continue
+                if self.skip[shard]:
+                    self.skip[shard] -= 1
+                    continue
+                await self.send(msg.data)
+        except Exception:
+            log.exception('relay from worker %d failed', shard)
+        if not self.closing:
+            # the worker went away mid-session: the client has to reconnect
+            log.warning('worker %d closed an upstream connection; closing client', shard)
+            await self.ws.close()
+
+    async def send(self, data: Union[str, bytes]) -> None:
+        if self.deflate:
+            await compression.send(self.ws, data, self.deflate)
+        else:
+            await _forward(self.ws, data)
+
+    async def handle(self, raw: Union[str, bytes]) -> None:
+        try:
+            msg = JSON.loads(raw) if isinstance(raw, str) else self.codec.loads(raw)
+        except Exception:
+            msg = None
+        if not isinstance(msg, dict):
+            # let a worker produce the usual error reply
+            await _forward(await self.upstream(0), raw)
+            return
+        action = msg.get("action")
+        if action == "list":
+            query = {k: msg[k] for k in ("filter", "cursor", "limit") if msg.get(k) is not None}
+            page = await self.router.list_rooms(query)
+            if "subscribe" in msg and "rooms" in page:
+                await self.lobby({"action": "lobby", "filter": page["filter"], "subscribe": msg["subscribe"]})
+            await self.send(self.codec.dumps(page))
+            return
+        if action == "lobby":
+            await self.lobby(msg)
+            return
+        if action == "hello":
+            # shard 0 answers; the other upstreams get the options silently
+            await self.upstream(0)
+            for shard, up in self.upstreams.items():
+                if shard:
+                    self.skip[shard] += 1
+                await _forward(up, raw)
+            self.hello = raw
+            return
+        room = msg.get("room")
+        shard = self.router.ring.shard_for(room) if isinstance(room, str) and room else 0
+        await _forward(await self.upstream(shard), raw)
+
+    async def lobby(self, msg: dict) -> None:
+        # every worker pushes the changes of its own rooms; `lobby` has no reply on success
+        data = self.codec.dumps(msg)
+        # an unknown filter is rejected by every worker: let only one of them answer
+        shards = range(len(self.router.workers)) if msg.get("filter") in (None, *lobby.VIEWS) else (0,)
+        for shard in shards:
+            await _forward(await self.upstream(shard), data)
+
+    async def close(self) -> None:
+        self.closing = True
+        for up in self.upstreams.values():
+            await up.close()
+        for task in self.relays:
+            task.cancel()
+
+
+async def websocket_handler(request: web.Request) -> web.StreamResponse:
+    router: Router = request.app[ROUTER]
+    ws = web.WebSocketResponse(protocols=SUBPROTOCOLS, compress=compression.COMPRESS)
+    await ws.prepare(request)
+    conn = _ClientConnection(router, ws)
+    try:
+        async for msg in ws:
+            if msg.type in (WSMsgType.TEXT, WSMsgType.BINARY):
+                await conn.handle(msg.data)
+            elif msg.type == WSMsgType.ERROR:
+                log.error('ws connection closed with exception %s', ws.exception())
+                break
+    except Exception:
+        log.exception('Router connection error for %s', request.remote)
+    finally:
+        await conn.close()
+    return ws
+
+
+async def _supervise(app: web.Application, interval: float = 1.0) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        for worker in app[ROUTER].workers:
+            if worker.exited():
+                log.error('worker %d exited with status %s; restarting', worker.index, worker.proc.returncode)
+                worker.start()
+
+
+async def _start_workers(app: web.Application) -> None:
+    router: Router = app[ROUTER]
+    router.session = ClientSession()
+    for worker in router.workers:
+        worker.start()
+    await asyncio.gather(*(worker.wait_ready(router.session) for worker in router.workers))
+    app[SUPERVISOR] = asyncio.ensure_future(_supervise(app))
+    log.info('%d workers ready', len(router.workers))
+
+
+async def _stop_workers(app: web.Application) -> None:
+    router: Router = app[ROUTER]
+    supervisor = app.get(SUPERVISOR)
+    if supervisor is not None:
+        supervisor.cancel()
+    await router.close()
+    if router.session is not None:
+        await router.session.close()
+    for worker in router.workers:
+        worker.stop()
+
+
+def create_router_app(workers: Sequence[Worker]) -> web.Application:
+    app = web.Application()
+    app[ROUTER] = Router(workers)
+    app.on_startup.append(_start_workers)
+    app.on_cleanup.append(_stop_workers)
+    app.router.add_get('/ws', websocket_handler)
+    if os.path.isdir(STATIC_DIR):
+        app.router.add_static('/', STATIC_DIR, show_index=True)
+    return app
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m server.shard', description='Run the game server as several worker processes behind a router.')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WORKERS', '0')) or os.cpu_count() or 1)
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '8000')))
+    parser.add_argument('--worker-port', type=int, help='port of the first worker (default: --port + 1)')
+    args = parser.parse_args(argv)
+    if args.workers <= 0:
+        parser.error('--workers must be positive')
+    configure_logging()
+    first = args.worker_port or args.port + 1
+    workers = [Worker(i, first + i, os.environ) for i in range(args.workers)]
+    print(f"Starting router on http://{args.host}:{args.port} (WS at /ws) with {args.workers} workers")
+    web.run_app(create_router_app(workers), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,26 +1,66 @@
+"""Minimal manual client: creates a room, joins it and prints the replies.
+
+Usage: `python server/test_client.py [ws://localhost:8000/ws] [--msgpack]`
+(the server's default port and WebSocket path). `--msgpack` negotiates the
+binary `cah.v1.msgpack` subprotocol (needs the `msgpack` package). For load
+testing use `python -m server.loadgen`.
+"""
+
 import asyncio
 import json
+import sys
+
 import websockets
 
+DEFAULT_URI = "ws://localhost:8000/ws"
+
+
+class _JsonWire:
+    subprotocols = None
+
+    def encode(self, msg):
+        return json.dumps(msg)
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class _MsgpackWire:
+    subprotocols = ["cah.v1.msgpack"]
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def encode(self, msg):
+        return self._msgpack.packb(msg, use_bin_type=True)
+
+    def decode(self, data):
+        return self._msgpack.unpackb(data, raw=False)
+
 
-async def run_client():
-    uri = "ws://localhost:6789"
-    async with websockets.connect(uri) as ws:
-        await ws.send(json.dumps({"action": "create", "room": "room1"}))
+async def run_client(uri: str = DEFAULT_URI, binary: bool = False):
+    wire = _MsgpackWire() if binary else _JsonWire()
+    async with websockets.connect(uri, subprotocols=wire.subprotocols) as ws:
+        if binary and ws.subprotocol != "cah.v1.msgpack":
+            print("server did not accept msgpack; is it installed on the server?")
+            return
+        await ws.send(wire.encode({"action": "create", "room": "room1"}))
         print("sent create")
         try:
-            print(await asyncio.wait_for(ws.recv(), timeout=1.0))
+            print(wire.decode(await asyncio.wait_for(ws.recv(), timeout=1.0)))
         except asyncio.TimeoutError:
             pass
-        await ws.send(json.dumps({"action": "join", "room": "room1", "player_id": "p1", "name": "Alice"}))
+        await ws.send(wire.encode({"action": "join", "room": "room1", "player_id": "p1", "name": "Alice"}))
         print("sent join")
         # try to read a couple of broadcasts
         for _ in range(2):
             try:
-                print(await asyncio.wait_for(ws.recv(), timeout=1.0))
+                print(wire.decode(await asyncio.wait_for(ws.recv(), timeout=1.0)))
             except asyncio.TimeoutError:
                 break
 
 
 if __name__ == "__main__":
-    asyncio.run(run_client())
+    args = [a for a in sys.argv[1:] if a != "--msgpack"]
+    asyncio.run(run_client(args[0] if args else DEFAULT_URI, binary="--msgpack" in sys.argv[1:]))
@@ -0,0 +1,120 @@
+"""Hierarchical timer wheel: one clock for the deadlines of every room.
+
+A per-room `call_later` (or sleeping task) costs a heap entry or a task for
+each of tens of thousands of rooms, and rescheduling means cancelling one and
+pushing another. A wheel keeps timers in slots instead:
+
+- time advances in ticks of `tick` seconds, driven by one periodic task
+  calling `advance()`;
+- level 0 has `slots` slots of one tick each, level 1 `slots` slots of
+  `slots` ticks each, and so on; a timer goes to the finest level whose range
+  covers its deadline;
+- when level 0 wraps around, the next slot of level 1 is emptied and its
+  timers re-filed one level down (at most once per level for each timer).
+
+Scheduling and cancelling are O(1) (a dict insert or delete in one slot), and
+a tick only looks at the timers that are due or being moved down a level.
+Deadlines are rounded up to whole ticks, so timers fire up to one tick late,
+never early.
+"""
+
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger('server.timers')
+
+
+class Timer:
+    """A scheduled callback; `cancel()` it to drop it from the wheel."""
+
+    __slots__ = ('deadline', 'callback', 'args', '_slot')
+
+    def __init__(self, deadline: int, callback: Callable[..., None], args: tuple) -> None:
+        # tick at which the timer fires
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        # the wheel slot holding the timer (None once fired or cancelled)
+        self._slot: Optional[Dict['Timer', None]] = None
+
+    @property
+    def active(self) -> bool:
+        return self._slot is not None
+
+    def cancel(self) -> None:
+        if self._slot is not None:
+            del self._slot[self]
+            self._slot = None
+
+
+class TimerWheel:
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, start: Optional[float] = None) -> None:
+        self.tick = tick
+        self.slots = slots
+        # clock reading (seconds, `time.monotonic()` by default) of tick 0
+        self.origin = time.monotonic() if start is None else start
+        # ticks processed so far
+        self.now = 0
+        self._wheels: List[List[Dict[Timer, None]]] = [[{} for _ in range(slots)] for _ in range(levels)]
+        # ticks one full turn of each level covers
+        self._spans = [slots ** (level + 1) for level in range(levels)]
+
+    def __len__(self) -> int:
+        return sum(len(slot) for wheel in self._wheels for slot in wheel)
+
+    def schedule(self, delay: float, callback: Callable[..., None], *args: Any) -> Timer:
+        """Call `callback(*args)` once `delay` seconds (rounded up to ticks) have passed."""
+        timer = Timer(self.now + max(1, math.ceil(delay / self.tick)), callback, args)
+        self._file(timer)
+        return timer
+
+    def _file(self, timer: Timer) -> None:
+        delta = timer.deadline - self.now
+        for level, span in enumerate(self._spans):
+            if delta < span:
+                break
+        else:
+            # beyond the coarsest level: park it on that level's last slot; it
+            # is filed again (with its real deadline) when that slot comes up
+            level = len(self._spans) - 1
+            delta = self._spans[level] - 1
+        unit = self._spans[level] // self.slots
+        slot = self._wheels[level][(self.now + delta) // unit % self.slots]
+        slot[timer] = None
+        timer._slot = slot
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Process every tick up to the clock reading `now`; returns the timers fired."""
+        if now is None:
+            now = time.monotonic()
+        target = int((now - self.origin) / self.tick)
+        fired = 0
+        while self.now < target:
+            fired += self._step()
+        return fired
+
+    def _step(self) -> int:
+        self.now += 1
+        # a level wrapped around: move the next slot of the level above down
+        for level in range(1, len(self._wheels)):
+            unit = self._spans[level - 1]
+            if self.now % unit:
+                break
+            self._cascade(self._wheels[level], self.now // unit % self.slots)
+        wheel = self._wheels[0]
+        index = self.now % self.slots
+        due, wheel[index] = wheel[index], {}
+        for timer in due:
+            timer._slot = None
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                log.exception('timer callback %r failed', timer.callback)
+        return len(due)
+
+    def _cascade(self, wheel: List[Dict[Timer, None]], index: int) -> None:
+        moving, wheel[index] = wheel[index], {}
+        for timer in moving:
+            self._file(timer)
@@ -0,0 +1,69 @@
+"""Simulação headless em massa para avaliar o balanceamento dos packs.
+
+Exemplos:
+
+    python simulate.py --games 100000 --rounds 10 -o results.csv
+    python simulate.py --games 20000 --policy longest --white white.txt --black black.txt -o results.csv
+
+Gera `results.csv` (por carta) e `results.csv.pairs.csv` (por par preta/branca).
+"""
+
+import argparse
+import sys
+import time
+from typing import Optional, Sequence
+
+from game.simulation import POLICIES, run_simulation
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simula partidas sem interface e agrega estatísticas por carta.")
+    parser.add_argument("--games", type=int, default=1000, help="número de partidas")
+    parser.add_argument("--rounds", type=int, default=10, help="rodadas por partida")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--hand-size", type=int, default=7)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random", help="política de voto")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: número de CPUs)")
+    parser.add_argument("--shard-size", type=int, default=200, help="partidas por lote")
+    parser.add_argument("--pack", help="pack compilado (.cahpack)")
+    parser.add_argument("--white", help="pack de texto de cartas brancas")
+    parser.add_argument("--black", help="pack de texto de cartas pretas")
+    parser.add_argument("-o", "--output", default="results.csv")
+    args = parser.parse_args(argv)
+
+    if args.pack:
+        catalog = ("pack", args.pack)
+    elif args.white or args.black:
+        if not (args.white and args.black):
+            parser.error("--white and --black must be given together")
+        catalog = ("text", args.white, args.black)
+    else:
+        catalog = None
+
+    started = time.perf_counter()
+
+    def progress(stats):
+        elapsed = time.perf_counter() - started
+        print(f"\r{stats.games}/{args.games} games, {stats.rounds} rounds ({stats.rounds / elapsed:,.0f} rounds/s)", end="", file=sys.stderr)
+
+    stats = run_simulation(
+        args.games,
+        rounds=args.rounds,
+        players=args.players,
+        hand_size=args.hand_size,
+        seed=args.seed,
+        policy=args.policy,
+        catalog=catalog,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        out_path=args.output,
+        progress=progress,
+    )
+    print(file=sys.stderr)
+    print(f"{stats.games} games, {stats.rounds} rounds ({stats.abandoned} abandoned) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
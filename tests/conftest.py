@@ -0,0 +1,52 @@
+import sys
+import os
+import json
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class FakeWebSocket:
+    """Stands in for `web.WebSocketResponse`: keeps every frame it is sent, decoded."""
+
+    def __init__(self):
+        self.frames = []
+
+    async def send_str(self, data):
+        self.frames.append(json.loads(data))
+
+    async def send_bytes(self, data):
+        from server.codec import MSGPACK
+
+        self.frames.append(MSGPACK.loads(data))
+
+
+def _reset_server(srv):
+    # the server keeps its state in module globals: every test starts from scratch
+    from server.timers import TimerWheel
+
+    for room in srv.ROOMS.values():
+        room.stop()
+    for box in srv.OUTBOXES.values():
+        box.close()
+    for table in (srv.ROOMS, srv.HIBERNATED, srv.CONN_ROOMS, srv.CONN_OPTIONS, srv.CONN_CODECS, srv.OUTBOXES, srv._STALE_FILES):
+        table.clear()
+    srv.LOBBY.clear()
+    if srv.JOURNAL is not None:
+        srv.JOURNAL.close()
+        srv.JOURNAL = None
+    srv.TIMERS = TimerWheel(srv.ROUND_TIMER_TICK)
+
+
+@pytest.fixture(autouse=True)
+def server_state():
+    try:
+        from server import app as srv
+    except ImportError:  # aiohttp ausente: só os testes do jogo
+        yield
+        return
+    _reset_server(srv)
+    yield
+    _reset_server(srv)
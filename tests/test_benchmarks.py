@@ -0,0 +1,45 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import bench_deck, bench_game  # noqa: F401  (registram os benchmarks)
+from benchmarks.core import BENCHMARKS
+
+try:
+    from benchmarks import bench_server
+except ImportError:  # aiohttp ausente: só os benchmarks do jogo
+    bench_server = None
+
+
+@pytest.fixture
+def server_bench(monkeypatch):
+    from server import app as srv
+
+    # the server benchmarks swap in their own catalog and seed policy
+    monkeypatch.setattr(srv, "CATALOG", srv.CATALOG)
+    monkeypatch.setattr(srv, "ALLOW_CLIENT_SEED", srv.ALLOW_CLIENT_SEED)
+    yield
+    loop = bench_server._loop
+    if loop is not None:
+        for room in srv.ROOMS.values():
+            room.stop()
+        for box in srv.OUTBOXES.values():
+            box.close()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        bench_server._loop = None
+
+
+@pytest.mark.parametrize("bench", BENCHMARKS, ids=lambda bench: bench.name)
+def test_every_benchmark_sets_up_and_runs(bench, request):
+    # smallest parameter only: catches setups broken by protocol changes, not timings
+    if bench.name.startswith("server."):
+        request.getfixturevalue("server_bench")
+    run, ops = bench.setup(min(bench.params))
+    assert ops > 0
+    run()
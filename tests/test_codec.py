@@ -0,0 +1,48 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.codec import JSON, MSGPACK
+from conftest import FakeWebSocket
+
+
+CODECS = [JSON] + ([MSGPACK] if MSGPACK is not None else [])
+
+
+@pytest.mark.parametrize("codec", CODECS, ids=lambda c: c.name)
+@pytest.mark.parametrize("size", [0, 3, 15, 16, 70000])
+def test_with_field_splices_into_encoded_maps(codec, size):
+    obj = {f"k{i}": i for i in range(size)}
+    spliced = codec.with_field(codec.dumps(obj), "hand", codec.dumps(["a", "b"]))
+    assert codec.loads(spliced) == dict(obj, hand=["a", "b"])
+
+
+@pytest.mark.skipif(MSGPACK is None, reason="msgpack not installed")
+def test_msgpack_connections_get_the_same_messages():
+    pytest.importorskip("aiohttp")
+    from server import app as srv
+
+    async def play():
+        text, binary = FakeWebSocket(), FakeWebSocket()
+        srv.CONN_CODECS[binary] = MSGPACK
+        await srv.handle_message(text, json.dumps({"action": "create", "room": "codec"}))
+        for ws, pid in ((text, "p1"), (binary, "p2")):
+            await srv.handle_message(ws, json.dumps({"action": "hello", "delta": True}))
+            await srv.handle_message(ws, json.dumps({"action": "join", "room": "codec", "player_id": pid}))
+        await srv.handle_message(binary, MSGPACK.dumps({"action": "ready", "room": "codec", "player_id": "p2"}))
+        await srv.handle_message(binary, MSGPACK.dumps({"action": "nope"}))
+        for ws in (text, binary):
+            await srv.drain(ws)
+        return text.frames, binary.frames
+
+    text, binary = asyncio.run(play())
+    assert binary[-1] == {"error": "unknown action"}
+    ready_text = [f for f in text if f.get("event") == "player_ready"][0]
+    ready_binary = [f for f in binary if f.get("event") == "player_ready"][0]
+    assert ready_binary["patch"] == ready_text["patch"] and ready_binary["seq"] == ready_text["seq"]
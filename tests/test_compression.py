@@ -0,0 +1,79 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+from aiohttp import ClientSession, web
+
+from server import app as srv
+from server import compression, metrics
+
+
+def test_shared_segments_are_spliced_into_valid_deflate_streams():
+    import zlib
+    segment = compression.Shared('{"players":["p1","p2"],"round":3' * 20)
+    frames = ['{"event":"x","state":' + segment.data.decode() + ',"your_hand":["%s"]}}' % h for h in ("a", "b")]
+    for frame in frames:
+        payload = frame.encode()
+        at = payload.find(segment.data)
+        body = compression.deflate(payload[:at], 15) + segment.deflate(15) + compression.deflate(payload[at + len(segment.data):], 15)
+        assert zlib.decompressobj(-15).decompress(body) == payload
+    assert len(segment._deflated) == 1
+
+
+def test_clients_with_and_without_deflate_get_the_same_frames(monkeypatch):
+    monkeypatch.setattr(compression, "MIN_BYTES", 64)
+    counters = (metrics.DEFLATE_FRAMES, metrics.DEFLATE_SKIPPED, metrics.DEFLATE_REUSED)
+    before = [c._default.value for c in counters]
+
+    async def play():
+        runner = web.AppRunner(srv.create_app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        received = {}
+        try:
+            async with ClientSession() as session:
+                clients = {
+                    "p1": await session.ws_connect(f"http://127.0.0.1:{port}/ws", compress=15),
+                    "p2": await session.ws_connect(f"http://127.0.0.1:{port}/ws", compress=15),
+                    "p3": await session.ws_connect(f"http://127.0.0.1:{port}/ws"),
+                }
+                assert clients["p1"].compress and not clients["p3"].compress
+                await clients["p1"].send_str(json.dumps({"action": "create", "room": "zip"}))
+                await clients["p1"].receive_json()
+                for pid, ws in clients.items():
+                    await ws.send_str(json.dumps({"action": "join", "room": "zip", "player_id": pid}))
+                    await ws.send_str(json.dumps({"action": "nope"}))
+                for pid, ws in clients.items():
+                    await ws.send_str(json.dumps({"action": "ready", "room": "zip", "player_id": pid}))
+                for pid, ws in clients.items():
+                    frames = received[pid] = []
+                    while not frames or frames[-1].get("event") != "started":
+                        frames.append(await ws.receive_json(timeout=5))
+                    await ws.close()
+        finally:
+            await runner.cleanup()
+        return received
+
+    metrics.enable()
+    try:
+        received = asyncio.run(play())
+    finally:
+        metrics.disable()
+    after = [c._default.value for c in counters]
+    assert all(a > b for a, b in zip(after, before))
+    started = {pid: frames[-1]["state"] for pid, frames in received.items()}
+    for state in started.values():
+        assert len(state["your_hand"]) > 0
+    public = [{k: v for k, v in s.items() if k != "your_hand"} for s in started.values()]
+    assert public[0] == public[1] == public[2]
+    assert {"error": "unknown action"} in received["p1"]
@@ -0,0 +1,160 @@
+import sys
+import os
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from game.card import Card, CardType
+from game.catalog import default_catalog
+from game.cards_data import make_cah_like_decks
+from game.deck import Deck
+
+
+def _mixed_cards():
+    # brancas e pretas intercaladas para exercitar a ordem global entre pilhas
+    cards = []
+    for i in range(1, 11):
+        ctype = CardType.BLACK if i % 3 == 0 else CardType.WHITE
+        cards.append(Card(i, f"c{i}", type=ctype, blanks=1 if ctype == CardType.BLACK else 0))
+    return cards
+
+
+def test_draw_keeps_global_order_across_types():
+    deck = Deck(_mixed_cards())
+    assert len(deck) == 10
+    assert [c.id for c in deck.draw(4)] == [1, 2, 3, 4]
+    assert [c.id for c in deck.cards] == [5, 6, 7, 8, 9, 10]
+    assert len(deck) == 6
+
+
+def test_typed_draws_and_add_many():
+    deck = Deck(_mixed_cards())
+    assert [c.id for c in deck.draw_white(3)] == [1, 2, 4]
+    assert deck.draw_black().id == 3
+    assert deck.count(CardType.BLACK) == 2
+    black = deck.draw_random_black()
+    assert black.is_black()
+    assert deck.count(CardType.BLACK) == 1
+    # reciclar uma carta devolve o mesmo id (e o mesmo texto) ao fundo do baralho
+    deck.add_many([black])
+    assert deck.cards[-1].id == black.id
+    assert deck.cards[-1].text == black.text
+    assert len(deck) == 6
+    deck.reset()
+    assert len(deck) == 10
+
+
+def test_deal_round_robin():
+    cards = [Card(i, f"w{i}") for i in range(1, 8)]
+    deck = Deck(cards)
+    hands = deck.deal(3, 2)
+    assert [[c.id for c in h] for h in hands] == [[1, 4], [2, 5], [3, 6]]
+    # o baralho acaba no meio do rodízio: só o primeiro jogador recebe
+    hands = deck.deal(3, 2)
+    assert [len(h) for h in hands] == [1, 0, 0]
+    assert deck.is_empty()
+
+
+def test_decks_share_default_catalog():
+    white_a, black_a = make_cah_like_decks()
+    white_b, _ = make_cah_like_decks()
+    catalog = default_catalog()
+    assert white_a.catalog is catalog and white_b.catalog is catalog and black_a.catalog is catalog
+    assert len(white_a) + len(black_a) == len(catalog)
+    # comprar de um deck não afeta o outro (cada sala tem sua própria ordem de ids)
+    drawn = white_a.draw_ids(2)
+    assert len(white_b) == len(white_a) + 2
+    assert [catalog.text(cid) for cid in drawn] == [c.text for c in white_b.draw(2)]
+    assert catalog.type_of(black_a.draw_black_id()) == CardType.BLACK
+
+
+def test_lazy_shuffle_is_reproducible_with_seed():
+    import random
+
+    def drawn(seed):
+        deck = Deck(_mixed_cards(), rng=random.Random(seed))
+        deck.shuffle()
+        return [c.id for c in deck.draw(10)]
+
+    assert drawn(7) == drawn(7)
+    assert sorted(drawn(7)) == list(range(1, 11))
+    assert any(drawn(s) != list(range(1, 11)) for s in range(5))
+
+
+def test_lazy_shuffle_keeps_later_additions_at_the_bottom():
+    import random
+
+    deck = Deck(_mixed_cards(), rng=random.Random(3))
+    deck.shuffle()
+    extra = deck.draw_black()
+    deck.add(extra)
+    # a carta devolvida depois do embaralhamento continua no fundo
+    assert deck.ids[-1] == extra.id
+    assert [c.id for c in deck.draw(10)][-1] == extra.id
+
+
+def test_peek_previews_the_next_draw_without_touching_the_rng():
+    import random
+
+    def play(seed, peeks):
+        white, black = make_cah_like_decks()
+        rng = random.Random(seed)
+        white.rng = black.rng = rng
+        white.shuffle()
+        black.shuffle()
+        hands, blacks = [], []
+        for _ in range(4):
+            if peeks:
+                top = [c.id for c in white.peek(CardType.WHITE, 3)]
+                black.peek(CardType.BLACK, 1)
+            hand = white.deal_ids(3, 1)
+            if peeks:
+                # the preview was exactly what got drawn (nothing else used the RNG)
+                assert [h[0] for h in hand] == top
+            hands.append([list(h) for h in hand])
+            blacks.append(black.draw_random_black_id())
+        return hands, blacks, rng.getstate()
+
+    assert play(21, peeks=True) == play(21, peeks=False)
+
+
+def test_loose_cards_keep_their_ids_and_metadata():
+    cards = [
+        Card(100, "a", metadata={"pack": "base"}),
+        Card(7, "b", type=CardType.BLACK, blanks=2),
+        Card(42, "c", metadata={"pack": "extra", "nsfw": True}),
+    ]
+    deck = Deck(cards)
+    assert [c.id for c in deck.cards] == [100, 7, 42]
+    assert deck.catalog.ids(CardType.WHITE).tolist() == [42, 100]
+    drawn = deck.draw(3)
+    # as cartas compradas são iguais às originais, inclusive o metadata
+    assert drawn == cards
+    drawn[0].metadata["pack"] = "changed"
+    deck.add(cards[0])
+    assert deck.draw()[0].metadata == {"pack": "base"}
+    deck.reset()
+    assert [c.id for c in deck.draw_white(2)] == [100, 42]
+    assert deck.draw_black().blanks == 2
+
+
+def test_adding_a_card_from_another_catalog_is_rejected():
+    deck = Deck([Card(1, "q")])
+    with pytest.raises(ValueError):
+        deck.add(Card(99, "z"))
+    # mesmo id, outra carta: não pode herdar o texto de "q"
+    with pytest.raises(ValueError):
+        deck.add(Card(1, "z"))
+    with pytest.raises(ValueError):
+        deck.add_many([Card(1, "q"), 99])
+    assert len(deck) == 1
+    white, _ = make_cah_like_decks()
+    foreign = len(white.catalog) + 1
+    with pytest.raises(ValueError):
+        white.add_ids([foreign])
+    with pytest.raises(ValueError):
+        white.add(Card(white.draw_ids(1)[0], "not the catalog text"))
+    with pytest.raises(ValueError):
+        Deck([Card(1, "a"), Card(1, "b")])
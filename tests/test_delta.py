@@ -0,0 +1,75 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+from server import app as srv
+from server.timers import TimerWheel
+from conftest import FakeWebSocket
+
+
+def _apply(state, frame):
+    # what web/ws_client.js does with a delta frame
+    if "seq" not in frame:
+        return state
+    if "state" in frame:
+        return dict(frame["state"])
+    if "patch" not in frame:
+        return state
+    state = dict(state, **frame["patch"])
+    for key in frame.get("removed", []):
+        del state[key]
+    return state
+
+
+def test_patches_keep_nulls_and_list_removed_fields():
+    room = srv.Room("r")
+    assert room.record_state({"a": 1, "b": 2, "c": 3})[0] == 1
+    assert room.record_state({"a": None, "b": 2, "c": 3}) == (2, ({"a": None}, []))
+    assert room.record_state({"a": None, "b": 4}) == (3, ({"b": 4}, ["c"]))
+    assert room.record_state({"a": None, "b": 4, "c": 5}) == (4, ({"c": 5}, []))
+    assert room.patch_since(1) == ({"a": None, "b": 4, "c": 5}, [])
+    assert room.patch_since(2) == ({"b": 4, "c": 5}, [])
+    assert room.record_state({"b": 4, "c": 5}) == (5, ({}, ["a"]))
+    assert room.patch_since(1) == ({"b": 4, "c": 5}, ["a"])
+    assert room.patch_since(5) == ({}, [])
+
+
+def test_delta_clients_see_fields_that_become_null(monkeypatch):
+    # no vote deadline: `deadline` goes from a timestamp to null once voting opens
+    monkeypatch.setattr(srv, "TIMERS", TimerWheel(tick=1.0, start=0.0))
+    monkeypatch.setattr(srv, "ROUND_VOTE_SECONDS", 0)
+
+    async def play():
+        socks = {pid: FakeWebSocket() for pid in ("p1", "p2", "p3")}
+        await srv.handle_message(socks["p1"], json.dumps({"action": "create", "room": "nulls"}))
+        for pid, ws in socks.items():
+            await srv.handle_message(ws, json.dumps({"action": "hello", "delta": True}))
+            await srv.handle_message(ws, json.dumps({"action": "join", "room": "nulls", "player_id": pid}))
+        for pid, ws in socks.items():
+            await srv.handle_message(ws, json.dumps({"action": "ready", "room": "nulls", "player_id": pid}))
+        for pid, ws in socks.items():
+            await srv.handle_message(ws, json.dumps({"action": "submit", "room": "nulls", "player_id": pid}))
+        await srv.drain(socks["p1"])
+        frames = list(socks["p1"].frames)
+        await srv.handle_message(socks["p1"], json.dumps({"action": "state", "room": "nulls"}))
+        await srv.drain(socks["p1"])
+        return frames, socks["p1"].frames[-1]
+
+    frames, full = asyncio.run(play())
+    state, deadlines = None, []
+    for frame in frames:
+        state = _apply(state, frame)
+        if state is not None:
+            deadlines.append(state["deadline"])
+    assert any(d is not None for d in deadlines) and deadlines[-1] is None
+    assert frames[-1]["patch"]["deadline"] is None and state["voting_open"]
+    # the delta client ends up with the same state shape a full-state client gets
+    assert state == full["state"]
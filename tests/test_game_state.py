@@ -0,0 +1,141 @@
+import sys
+import os
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from game.cards_data import make_cah_like_decks
+from game.player import Player
+from game.game_state import GameState
+
+
+def _new_game(seed=None, n_players=3):
+    white, black = make_cah_like_decks()
+    players = [Player(f"p{i}", f"P{i}") for i in range(1, n_players + 1)]
+    return GameState(players, white, black, hand_size=3, seed=seed)
+
+
+def _play_round(gs):
+    for p in gs.players:
+        gs.submit_card(p.id, 0)
+    ids = [p.id for p in gs.players]
+    for i, voter in enumerate(ids):
+        gs.cast_vote(voter, ids[(i + 1) % len(ids)] if voter != ids[1] else ids[0])
+
+
+def test_same_seed_reproduces_the_game():
+    a, b = _new_game(seed=1234), _new_game(seed=1234)
+    for gs in (a, b):
+        gs.start()
+        for _ in range(3):
+            _play_round(gs)
+    assert a.snapshot() == b.snapshot()
+    assert a.dump()["seed"] == 1234
+    # the seed would reveal every hand and black card: players never see it
+    assert "seed" not in a.snapshot()
+    assert [a.hand_texts(p.id) for p in a.players] == [b.hand_texts(p.id) for p in b.players]
+
+
+def test_games_without_seed_get_independent_rngs():
+    a, b = _new_game(), _new_game()
+    assert a.seed != b.seed
+    assert a.rng is not b.rng
+    assert a.white_deck.rng is a.rng and a.black_deck.rng is a.rng
+
+
+def test_player_registry_add_and_remove():
+    gs = _new_game(n_players=3)
+    newcomer = gs.add_player(Player("p4", "P4"))
+    assert gs.get_player("p4") is newcomer
+    assert gs.add_player(Player("p4", "outro")) is newcomer
+    assert gs.turns.player_ids == ["p1", "p2", "p3", "p4"]
+    gs.start()
+    # p4 sai antes de submeter: os demais já submeteram, então a votação abre
+    for pid in ("p1", "p2", "p3"):
+        gs.submit_card(pid, 0)
+    assert not gs.voting_open
+    removed = gs.remove_player("p4")
+    assert removed is newcomer and not gs.has_player("p4")
+    assert gs.turns.player_ids == ["p1", "p2", "p3"]
+    assert gs.voting_open and set(gs.voting.submissions) == {"p1", "p2", "p3"}
+    # a mão de quem saiu volta para o descarte
+    assert len(gs.discard) == gs.hand_size
+
+
+def test_snapshot_is_cached_until_state_changes():
+    gs = _new_game(seed=9)
+    gs.start()
+    first = gs.snapshot()
+    assert gs.snapshot() is first
+    try:
+        first["voting_open"] = True
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("snapshot should be read-only")
+    version = gs.version
+    gs.submit_card("p1", 0)
+    assert gs.version > version
+    second = gs.snapshot()
+    assert second is not first
+    assert second["submissions"] == ("p1",)
+    assert first["submissions"] == ()
+    gs.max_rounds = 5
+    assert gs.snapshot()["max_rounds"] == 5
+
+
+def test_dump_restore_continues_the_same_game():
+    import json
+
+    gs = _new_game(seed=77)
+    gs.start()
+    _play_round(gs)
+    gs.submit_card("p1", 0)
+    data = json.loads(json.dumps(gs.dump()))
+    restored = GameState.restore(data, gs.catalog)
+    assert restored.snapshot() == gs.snapshot()
+    for g in (gs, restored):
+        for pid in ("p2", "p3"):
+            g.submit_card(pid, 1)
+        g.cast_vote("p1", "p2")
+        g.cast_vote("p2", "p3")
+        g.cast_vote("p3", "p2")
+        _play_round(g)
+    assert restored.snapshot() == gs.snapshot()
+    assert [restored.hand_texts(p.id) for p in restored.players] == [gs.hand_texts(p.id) for p in gs.players]
+    assert list(restored.white_deck.ids) == list(gs.white_deck.ids)
+
+
+def test_expired_submissions_play_random_cards_reproducibly():
+    a, b = _new_game(seed=99), _new_game(seed=99)
+    for gs in (a, b):
+        gs.start()
+        gs.submit_card("p1", 0)
+        assert gs.expire_submissions() == ["p2", "p3"]
+    assert a.voting_open and set(a.submissions) == {"p1", "p2", "p3"}
+    assert a.submissions == b.submissions
+    assert all(len(p.hand) == 2 for p in a.players)
+    # nothing left to expire once voting is open
+    assert a.expire_submissions() == []
+
+
+def test_expired_voting_counts_cast_votes_and_breaks_ties():
+    gs = _new_game(seed=5)
+    gs.start()
+    gs.expire_submissions()
+    gs.cast_vote("p1", "p2")
+    assert gs.expire_voting() == "p2"
+    assert gs.current_round == 1 and not gs.voting_open and not gs.submissions
+    assert {p.id: p.score for p in gs.players} == {"p1": 0, "p2": 1, "p3": 0}
+
+    gs.expire_submissions()
+    gs.cast_vote("p1", "p2")
+    gs.cast_vote("p2", "p1")
+    assert gs.expire_voting() in ("p1", "p2")
+    assert gs.current_round == 2
+
+    # nobody voted: the round ends without a winner
+    gs.expire_submissions()
+    scores = [p.score for p in gs.players]
+    assert gs.expire_voting() is None
+    assert gs.current_round == 3 and [p.score for p in gs.players] == scores
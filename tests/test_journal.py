@@ -0,0 +1,168 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.journal import Journal
+from conftest import FakeWebSocket
+
+
+def _open(directory, **kwargs):
+    journal = Journal(str(directory), **kwargs)
+    state, records = journal.load()
+    records = list(records)
+    journal.start()
+    return journal, state, records
+
+
+def test_records_and_snapshots_survive_restart(tmp_path):
+    journal, state, records = _open(tmp_path, fsync="off", snapshot_every=3)
+    assert state is None and records == []
+    for i in range(5):
+        journal.append({"op": "n", "i": i})
+        if journal.needs_snapshot():
+            journal.snapshot({"upto": i})
+    journal.close()
+
+    journal, state, records = _open(tmp_path)
+    assert state == {"upto": 2}
+    assert records == [{"op": "n", "i": 3}, {"op": "n", "i": 4}]
+    journal.close()
+
+
+def test_torn_last_record_is_ignored(tmp_path):
+    journal, _, _ = _open(tmp_path)
+    journal.append({"op": "a"})
+    journal.flush()
+    journal.close()
+    segment = [f for f in os.listdir(tmp_path) if f.startswith("journal-")][0]
+    with open(tmp_path / segment, "ab") as f:
+        f.write(b'{"op": "half')
+    journal, _, records = _open(tmp_path)
+    assert records == [{"op": "a"}]
+    journal.close()
+
+
+def test_segments_start_with_the_journal_header(tmp_path):
+    journal, _, _ = _open(tmp_path, header={"catalog": "abc"}, snapshot_every=2)
+    for i in range(3):
+        journal.append({"op": "n", "i": i})
+        if journal.needs_snapshot():
+            journal.snapshot({"upto": i})
+    journal.close()
+    journal, state, records = _open(tmp_path)
+    # the header is not a record; every segment to replay reports its own
+    assert state == {"upto": 1} and records == [{"op": "n", "i": 2}]
+    assert list(journal.headers.values()) == [{"catalog": "abc"}]
+    journal.close()
+
+
+def test_restore_refuses_a_journal_of_another_catalog(tmp_path, monkeypatch):
+    pytest.importorskip("aiohttp")
+    from game.catalog import CardCatalog
+    from server import app as srv
+
+    # same size as the running catalog, other texts
+    other = CardCatalog.from_texts([f"w{i}" for i in range(len(srv.CATALOG) - 1)], [("b ____", 1)])
+    assert len(other) == len(srv.CATALOG) and other.digest() != srv.CATALOG.digest()
+
+    def written_with(catalog, snapshot):
+        directory = tmp_path / catalog.digest()[:8] / str(snapshot)
+        monkeypatch.setattr(srv, "CATALOG", catalog)
+        journal, _, _ = _open(directory, fsync="off", header=srv._journal_header())
+        journal.append({"op": "create", "room": "r", "seed": 1, "created": 0.0})
+        if snapshot:
+            journal.snapshot(srv._dump_rooms())
+        journal.close()
+        monkeypatch.undo()
+        return Journal(str(directory))
+
+    for snapshot in (False, True):
+        with pytest.raises(RuntimeError, match="catalog"):
+            srv.restore_rooms(written_with(other, snapshot))
+        # the snapshot (taken after the create) leaves nothing to replay
+        assert srv.restore_rooms(written_with(srv.CATALOG, snapshot)) == (0 if snapshot else 1)
+        srv.ROOMS.clear()
+
+
+def test_restore_rebuilds_the_game_played_through_the_server(tmp_path, monkeypatch):
+    pytest.importorskip("aiohttp")
+    from server import app as srv
+    from server.hibernate import RoomStore
+
+    monkeypatch.setattr(srv, "STORE", RoomStore(str(tmp_path / "rooms")))
+    journal, _, _ = _open(tmp_path, fsync="off", snapshot_every=20)
+    monkeypatch.setattr(srv, "JOURNAL", journal)
+    pids = ["p0", "p1", "p2"]
+
+    async def play():
+        socks = {pid: FakeWebSocket() for pid in pids}
+        send = srv.handle_message
+        await send(socks["p0"], json.dumps({"action": "create", "room": "j"}))
+        for pid in pids:
+            await send(socks[pid], json.dumps({"action": "join", "room": "j", "player_id": pid}))
+        for pid in pids:
+            await send(socks[pid], json.dumps({"action": "ready", "room": "j", "player_id": pid}))
+        for _ in range(3):
+            for pid in pids:
+                await send(socks[pid], json.dumps({"action": "submit", "room": "j", "player_id": pid, "card_index": 1}))
+            for i, pid in enumerate(pids):
+                voted = pids[(i + 1) % 3] if pid != pids[1] else pids[0]
+                await send(socks[pid], json.dumps({"action": "vote", "room": "j", "voter_id": pid, "voted_player_id": voted}))
+            # every broadcast also showed the state (deck previews included)
+            await send(socks["p0"], json.dumps({"action": "state", "room": "j"}))
+
+    def game_of(room):
+        game = room.game
+        return {
+            "hands": {p.id: list(p.hand) for p in game.players},
+            "scores": {p.id: p.score for p in game.players},
+            "black": game.current_black_id,
+            "round": game.current_round,
+            "dump": game.dump(),
+        }
+
+    asyncio.run(play())
+    live = game_of(srv.ROOMS["j"])
+    srv.JOURNAL = None
+    journal.close()
+    for room in srv.ROOMS.values():
+        room.stop()
+    srv.ROOMS.clear()
+
+    # snapshot after 20 records, the rest replayed from the journal
+    assert srv.restore_rooms(Journal(str(tmp_path))) > 0
+    assert live["round"] == 3
+    assert game_of(srv.ROOMS["j"]) == live
+
+
+def test_snapshots_only_dump_rooms_that_changed(monkeypatch):
+    pytest.importorskip("aiohttp")
+    from server import app as srv
+    from game.game_state import GameState
+
+    dumped = []
+    original = GameState.dump
+    monkeypatch.setattr(GameState, "dump", lambda self: dumped.append(self) or original(self))
+
+    async def play():
+        ws = FakeWebSocket()
+        for room in ("a", "b"):
+            await srv.handle_message(ws, json.dumps({"action": "create", "room": room}))
+        first = srv._dump_rooms()
+        await srv.handle_message(ws, json.dumps({"action": "join", "room": "b", "player_id": "p1"}))
+        await srv.handle_message(ws, json.dumps({"action": "ready", "room": "a", "player_id": "p9"}))
+        return first, srv._dump_rooms(), srv._dump_rooms()
+
+    first, second, third = asyncio.run(play())
+    rooms = [srv.ROOMS["a"].game, srv.ROOMS["b"].game]
+    # both rooms changed once after the first snapshot; nothing after the second
+    assert dumped == rooms + rooms
+    assert second["rooms"][0]["ready"] == ["p9"] and second["rooms"][1]["game"]["players"][0]["id"] == "p1"
+    assert first["rooms"][0]["ready"] == [] and first["rooms"][1]["game"]["players"] == []
+    assert all(x is y for x, y in zip(second["rooms"], third["rooms"]))
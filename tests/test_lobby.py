@@ -0,0 +1,92 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.codec import JSON
+from server.lobby import Lobby
+from conftest import FakeWebSocket
+
+
+def test_views_pages_and_cursors():
+    lobby = Lobby(max_players=2, send=None)
+    for i in range(10):
+        lobby.update(f"r{i}", i % 3, i >= 8, 1000.0 + i)
+    assert len(lobby.page("all", None, 100)[0]) == 10
+    # open: not started; joinable: open with fewer than 2 players
+    assert [r["room"] for r in lobby.page("open", None, 100)[0]] == [f"r{i}" for i in range(8)]
+    assert [r["room"] for r in lobby.page("joinable", None, 100)[0]] == ["r0", "r1", "r3", "r4", "r6", "r7"]
+
+    first, cursor = lobby.page("joinable", None, 4)
+    assert [r["room"] for r in first] == ["r0", "r1", "r3", "r4"]
+    # rooms leaving or joining the view before the cursor do not shift the next page
+    lobby.update("r0", 2, False, 1000.0)
+    lobby.remove("r3")
+    lobby.update("r5", 0, False, 1005.0)
+    rest, end = lobby.page("joinable", cursor, 4)
+    assert [r["room"] for r in rest] == ["r5", "r6", "r7"] and end is None
+
+
+def test_subscribers_get_coalesced_deltas_for_their_view():
+    sent = []
+    lobby = Lobby(max_players=2, send=lambda ws, event: sent.append((ws, event.encode(JSON))), push_interval=60)
+
+    async def play():
+        lobby.update("a", 0, False, 1.0)
+        lobby.update("b", 1, False, 2.0)
+        lobby.subscribe("all-viewer", "all")
+        lobby.subscribe("joiner", "joinable")
+        for players in (1, 2, 1, 2):
+            lobby.update("a", players, False, 1.0)
+        lobby.update("b", 1, True, 2.0)
+        lobby.update("c", 0, False, 3.0)
+        lobby.remove("c")
+        lobby.flush()
+
+    asyncio.run(play())
+    events = {ws: json.loads(data) for ws, data in sent}
+    assert len(sent) == 2
+    assert [r["room"] for r in events["all-viewer"]["rooms"]] == ["a", "b"]
+    assert events["all-viewer"]["rooms"][0]["players"] == 2
+    assert events["all-viewer"]["removed"] == []
+    # "a" is full and "b" started: both left the joinable view; "c" came and went
+    assert events["joiner"]["rooms"] == [] and events["joiner"]["removed"] == ["a", "b"]
+
+
+def test_list_action_filters_pages_and_pushes(monkeypatch):
+    pytest.importorskip("aiohttp")
+    from server import app as srv
+
+    monkeypatch.setattr(srv, "ROOM_MAX_PLAYERS", 2)
+    monkeypatch.setattr(srv.LOBBY, "max_players", 2)
+
+    async def play():
+        ws, viewer = FakeWebSocket(), FakeWebSocket()
+        for i in range(5):
+            await srv.handle_message(ws, json.dumps({"action": "create", "room": f"lobby{i}"}))
+        for pid in ("p1", "p2", "p3"):
+            await srv.handle_message(ws, json.dumps({"action": "join", "room": "lobby1", "player_id": pid}))
+        await srv.handle_message(viewer, json.dumps({"action": "list", "filter": "joinable", "limit": 3, "subscribe": True}))
+        await srv.drain(viewer)
+        page = viewer.frames[-1]
+        await srv.handle_message(viewer, json.dumps({"action": "list", "filter": "joinable", "cursor": page["next"]}))
+        await srv.handle_message(viewer, json.dumps({"action": "list", "filter": "nope"}))
+        await srv.handle_message(ws, json.dumps({"action": "join", "room": "lobby0", "player_id": "p1"}))
+        await srv.handle_message(ws, json.dumps({"action": "join", "room": "lobby0", "player_id": "p2"}))
+        srv.LOBBY.flush()
+        await srv.drain(viewer)
+        await srv.drain(ws)
+        return page, viewer.frames[1:], ws.frames
+
+    page, frames, player_frames = asyncio.run(play())
+    assert {"error": "room full"} in player_frames
+    assert [r["room"] for r in page["rooms"]] == ["lobby0", "lobby2", "lobby3"]
+    assert page["filter"] == "joinable" and page["next"]
+    assert [r["room"] for r in frames[0]["rooms"]] == ["lobby4"] and frames[0]["next"] is None
+    assert frames[1]["error"] == "unknown filter"
+    assert frames[2] == {"event": "lobby", "filter": "joinable", "rooms": [], "removed": ["lobby0"]}
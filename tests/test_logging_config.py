@@ -0,0 +1,37 @@
+import sys
+import os
+import io
+import json
+import logging
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.logging_config import configure_logging, log_payload, stop_logging
+
+
+def test_sampled_truncated_payloads_and_per_logger_levels():
+    root = logging.getLogger()
+    saved = (list(root.handlers), root.level)
+    out = io.StringIO()
+    env = {"LOG_LEVEL": "WARNING", "LOG_LEVELS": "t.app=DEBUG", "LOG_PAYLOAD_SAMPLE": "0.25", "LOG_PAYLOAD_CHARS": "20"}
+    try:
+        configure_logging(env, stream=out)
+        app, quiet = logging.getLogger("t.app"), logging.getLogger("t.other")
+        for i in range(8):
+            log_payload(app, "msg", {"i": i, "text": "x" * 50})
+            log_payload(quiet, "msg", {"i": i})
+        app.info("joined %s", "room1", extra={"room": "room1"})
+    finally:
+        stop_logging()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved[0]:
+            root.addHandler(handler)
+        root.setLevel(saved[1])
+        logging.getLogger("t.app").setLevel(logging.NOTSET)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    payloads = [r for r in records if r["msg"] == "msg"]
+    assert len(payloads) == 2 and all(r["logger"] == "t.app" for r in payloads)
+    assert payloads[0]["payload"].startswith('{"i": 3') and payloads[0]["payload"].endswith("chars)")
+    assert records[-1]["msg"] == "joined room1" and records[-1]["room"] == "room1"
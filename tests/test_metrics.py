@@ -0,0 +1,59 @@
+import sys
+import os
+import asyncio
+import json
+import time
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.metrics import Counter, Gauge, Histogram, Registry
+from conftest import FakeWebSocket
+
+
+def test_prometheus_text_rendering():
+    registry = Registry()
+    hist = registry.register(Histogram("t_seconds", "Latency.", ("action",), buckets=(0.1, 1.0)))
+    counter = registry.register(Counter("t_total", "Events."))
+    registry.register(Gauge("t_rooms", "Rooms.", lambda: 7))
+    hist.labels("vote").observe(0.05)
+    hist.labels("vote").observe(0.5)
+    hist.labels("vote").observe(3.0)
+    counter.inc(2)
+    lines = registry.render().splitlines()
+    assert "# TYPE t_seconds histogram" in lines
+    assert 't_seconds_bucket{action="vote",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{action="vote",le="1.0"} 2' in lines
+    assert 't_seconds_bucket{action="vote",le="+Inf"} 3' in lines
+    assert 't_seconds_count{action="vote"} 3' in lines
+    assert "t_total 2.0" in lines
+    assert "t_rooms 7" in lines
+
+
+def test_encode_time_excludes_queueing(monkeypatch):
+    pytest.importorskip("aiohttp")
+    from server import app as srv
+    from server import metrics
+
+    # a slow outbox shows up in the notify time only
+    monkeypatch.setattr(srv.Outbox, "put_state", lambda self, *args: time.sleep(0.01))
+    socks = [FakeWebSocket(), FakeWebSocket()]
+    encode, notify = metrics.ENCODE_SECONDS._default, metrics.NOTIFY_SECONDS._default
+    before = (encode.sum, notify.sum)
+
+    async def play():
+        await srv.handle_message(socks[0], json.dumps({"action": "create", "room": "m"}))
+        for i, ws in enumerate(socks):
+            await srv.handle_message(ws, json.dumps({"action": "join", "room": "m", "player_id": f"p{i}"}))
+        # measure only the broadcast below
+        metrics.enable()
+        await srv.notify_room(srv.ROOMS["m"], {"event": "x", "state": srv.ROOMS["m"].snapshot()})
+
+    try:
+        asyncio.run(play())
+    finally:
+        metrics.disable()
+    encoded, notified = encode.sum - before[0], notify.sum - before[1]
+    assert 0 < encoded < 0.01 and notified - encoded >= 0.02
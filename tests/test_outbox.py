@@ -0,0 +1,60 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+from server.outbox import Outbox
+
+
+class StalledWebSocket:
+    """Fake connection whose sends block until `release` is set."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.sent = []
+        self.closed_with = None
+
+    async def send_str(self, data):
+        await self.release.wait()
+        self.sent.append(data)
+
+    async def close(self, code, message):
+        self.closed_with = code
+
+
+def test_lagging_client_gets_every_event_but_only_the_newest_state():
+    async def run():
+        ws = StalledWebSocket()
+        box = Outbox(ws)
+        box.put("first")
+        await asyncio.sleep(0)  # "first" is now in flight
+        for i in range(3):
+            pending = box.supersede()
+            assert pending is None or pending.base == 0
+            box.put_state(f"state{i}", f"event{i}", base=0)
+        box.put("error")
+        ws.release.set()
+        await box.drain()
+        return ws.sent
+
+    assert asyncio.run(run()) == ["first", "event0", "event1", "state2", "error"]
+
+
+def test_hopeless_consumer_is_closed():
+    async def run():
+        ws = StalledWebSocket()
+        box = Outbox(ws, maxsize=4)
+        for i in range(6):
+            box.put(str(i))
+        await asyncio.sleep(0)
+        return ws, box
+
+    ws, box = asyncio.run(run())
+    assert box.closed and len(box) == 0
+    assert ws.closed_with is not None
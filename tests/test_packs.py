@@ -0,0 +1,74 @@
+import sys
+import os
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from game.card import CardType
+from game.cards_data import load_from_files
+from game.binpack import compile_pack, load_pack, load_pack_cached
+from game.packs import MappedTexts, iter_pack_lines
+
+
+def _write_packs(tmp_path):
+    white = tmp_path / "white.txt"
+    black = tmp_path / "black.txt"
+    white.write_text("Gabiru\n\n  Almoço no ratão  \nÚltima\n", encoding="utf-8")
+    black.write_text("1\tNada melhor do que ____.\n2\t____ e ____.\nSem prefixo ____\n", encoding="utf-8")
+    return str(white), str(black)
+
+
+def test_iter_pack_lines_streams_cards(tmp_path):
+    white, black = _write_packs(tmp_path)
+    assert list(iter_pack_lines(white)) == [("Gabiru", 0), ("Almoço no ratão", 0), ("Última", 0)]
+    assert list(iter_pack_lines(black, black=True)) == [
+        ("Nada melhor do que ____.", 1),
+        ("____ e ____.", 2),
+        ("Sem prefixo ____", 1),
+    ]
+
+
+def test_mapped_texts_decode_lazily(tmp_path):
+    white, black = _write_packs(tmp_path)
+    texts = MappedTexts(black, black=True)
+    assert len(texts) == 3
+    assert list(texts.blanks) == [1, 2, 1]
+    assert texts[1] == "____ e ____."
+    assert texts[-1] == "Sem prefixo ____"
+    texts.close()
+
+
+def test_lazy_and_eager_loaders_agree(tmp_path):
+    white, black = _write_packs(tmp_path)
+    lazy_white, lazy_black = load_from_files(white, black)
+    eager_white, eager_black = load_from_files(white, black, lazy=False)
+    for lazy, eager in ((lazy_white, eager_white), (lazy_black, eager_black)):
+        assert [(c.id, c.text, c.type, c.blanks) for c in lazy.cards] == [(c.id, c.text, c.type, c.blanks) for c in eager.cards]
+    assert lazy_black.draw_black().type == CardType.BLACK
+
+
+def test_compiled_pack_matches_text_loader(tmp_path):
+    white, black = _write_packs(tmp_path)
+    out = str(tmp_path / "cards.cahpack")
+    assert compile_pack(white, black, out) == 6
+    catalog = load_pack(out)
+    text_white, text_black = load_from_files(white, black)
+    expected = text_white.cards + text_black.cards
+    assert [catalog.card(c.id) for c in expected] == expected
+    assert list(catalog.ids(CardType.BLACK)) == [4, 5, 6]
+
+
+def test_pack_cache_reuses_compiled_file(tmp_path):
+    white, black = _write_packs(tmp_path)
+    cache = str(tmp_path / "cache")
+    first = load_pack_cached(white, black, cache)
+    packs = [f for f in os.listdir(cache) if f.endswith(".cahpack")]
+    assert len(packs) == 1
+    second = load_pack_cached(white, black, cache)
+    assert second.text(1) == first.text(1) == "Gabiru"
+    assert [f for f in os.listdir(cache) if f.endswith(".cahpack")] == packs
+    # conteúdo alterado gera um novo pack
+    with open(white, "a", encoding="utf-8") as f:
+        f.write("Nova carta\n")
+    third = load_pack_cached(white, black, cache)
+    assert len(third) == len(first) + 1
@@ -0,0 +1,40 @@
+import sys
+import os
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.codec import JSON
+from server.protocol import ActionTable, Field, Schema
+
+PLAYER = Field(str, max_len=8)
+
+
+def test_schema_rejects_with_precompiled_frames():
+    join = Schema(room=Field(str), player_id=PLAYER, seat=Field(int, required=False, min=0, max=9))
+    vote = Schema(voter_id=PLAYER)
+    assert join.check({"room": "r", "player_id": "p1"}) is None
+    assert join.check({"room": "r", "player_id": "p1", "seat": None}) is None
+    assert join.check({"room": "r"}).message == {"error": "player_id required"}
+    assert join.check({"room": "r", "player_id": "x" * 9}).message["error"].startswith("player_id must be")
+    assert join.check({"room": "r", "player_id": "p", "seat": True}) is not None
+    assert join.check({"room": "r", "player_id": "p", "seat": 10}) is not None
+    # a shared field keeps its name per schema
+    assert vote.check({}).message == {"error": "voter_id required"}
+    frame = join.check({"room": "r"}).encode(JSON)
+    assert join.check({"room": "r"}).encode(JSON) is frame
+
+
+def test_actions_are_registered_once():
+    table = ActionTable()
+
+    @table.register("ping")
+    async def ping(ws, msg):
+        pass
+
+    assert table.get("ping").handler is ping and "ping" in table
+    assert table.get(["ping"]) is None and "pong" not in table
+    with pytest.raises(ValueError):
+        table.register("ping")(ping)
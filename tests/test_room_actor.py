@@ -0,0 +1,73 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+from server import app as srv
+
+
+class SlowWebSocket:
+    """Fake connection whose sends yield to the loop (like a real socket write)."""
+
+    def __init__(self, delay=0.001):
+        self.delay = delay
+        self.frames = []
+
+    async def send_str(self, data):
+        await asyncio.sleep(self.delay)
+        self.frames.append(json.loads(data))
+
+
+def _send(ws, **msg):
+    return srv.handle_message(ws, json.dumps(msg))
+
+
+@pytest.fixture
+def rooms():
+    return srv.ROOMS
+
+
+def test_concurrent_commands_are_serialized_per_room(rooms):
+    async def play():
+        a, b = SlowWebSocket(), SlowWebSocket()
+        await _send(a, action="create", room="r")
+        await _send(a, action="join", room="r", player_id="p1")
+        await _send(b, action="join", room="r", player_id="p2")
+        # both ready at once: the last one auto-starts the game exactly once
+        await asyncio.gather(
+            _send(a, action="ready", room="r", player_id="p1"),
+            _send(b, action="ready", room="r", player_id="p2"),
+        )
+        await srv.drain(a)
+        return a
+
+    a = asyncio.run(play())
+    events = [f.get("event") for f in a.frames]
+    assert events.count("started") == 1
+    assert events[-1] == "started"
+    assert rooms["r"].game.started
+
+
+def test_busy_room_does_not_stall_other_rooms(rooms):
+    async def play():
+        slow, fast = SlowWebSocket(delay=0.2), SlowWebSocket(delay=0)
+        await _send(slow, action="create", room="slow")
+        await _send(fast, action="create", room="fast")
+        await _send(slow, action="join", room="slow", player_id="p1")
+        busy = asyncio.ensure_future(_send(slow, action="ready", room="slow", player_id="p1", ready=False))
+        await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await _send(fast, action="join", room="fast", player_id="q1")
+        elapsed = loop.time() - started
+        await busy
+        return elapsed
+
+    assert asyncio.run(play()) < 0.1
@@ -0,0 +1,111 @@
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+from server import app as srv
+from server.hibernate import RoomStore
+from conftest import FakeWebSocket
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(srv, "STORE", RoomStore(str(tmp_path)))
+    monkeypatch.setattr(srv, "ROOM_IDLE_SECONDS", 0)
+    return srv
+
+
+def test_idle_room_hibernates_and_rehydrates_on_next_command(server, tmp_path, monkeypatch):
+    async def play():
+        ws = FakeWebSocket()
+        await server.handle_message(ws, json.dumps({"action": "create", "room": "r"}))
+        await server.handle_message(ws, json.dumps({"action": "join", "room": "r", "player_id": "p1"}))
+        hand = server.ROOMS["r"].game.hand_texts("p1")
+        # still connected: not idle
+        assert await server.sweep_rooms() == (0, 0)
+        server.forget_connection(ws)
+        assert await server.sweep_rooms() == (1, 0)
+        assert "r" not in server.ROOMS and "r" in server.HIBERNATED
+        assert len(os.listdir(tmp_path)) == 1
+
+        back = FakeWebSocket()
+        await server.handle_message(back, json.dumps({"action": "join", "room": "r", "player_id": "p1"}))
+        await server.drain(back)
+        assert server.ROOMS["r"].game.hand_texts("p1") == hand
+        assert back.frames[-1]["event"] == "player_joined"
+        # the rehydrated room's file is gone (no journal to keep it for)
+        assert os.listdir(tmp_path) == []
+
+        server.forget_connection(back)
+        await server.sweep_rooms()
+        monkeypatch.setattr(server, "ROOM_TTL_SECONDS", 0)
+        assert await server.sweep_rooms() == (0, 1)
+        assert not server.HIBERNATED and os.listdir(tmp_path) == []
+        assert not server.CONN_ROOMS
+
+    asyncio.run(play())
+
+
+def test_hibernation_writes_off_the_loop_and_keeps_the_room_until_saved(server, tmp_path, monkeypatch):
+    save = server.STORE.save
+    threads = []
+
+    def failing(room_id, data):
+        threads.append(threading.get_ident())
+        raise OSError("disk full")
+
+    async def play():
+        ws = FakeWebSocket()
+        await server.handle_message(ws, json.dumps({"action": "create", "room": "r"}))
+        await server.handle_message(ws, json.dumps({"action": "join", "room": "r", "player_id": "p1"}))
+        server.forget_connection(ws)
+        room = server.ROOMS["r"]
+
+        # a failed write keeps the room in memory
+        monkeypatch.setattr(server.STORE, "save", failing)
+        assert await server.sweep_rooms() == (0, 0)
+        assert server.ROOMS["r"] is room and "r" not in server.HIBERNATED
+        assert threads and threading.get_ident() not in threads
+
+        # a room that changes while its file is written stays awake; the file is deleted
+        def changing(room_id, data):
+            name = save(room_id, data)
+            loop.call_soon_threadsafe(room.game.touch)
+            time.sleep(0.05)
+            return name
+
+        loop = asyncio.get_running_loop()
+        monkeypatch.setattr(server.STORE, "save", changing)
+        assert await server.sweep_rooms() == (0, 0)
+        assert server.ROOMS["r"] is room and os.listdir(tmp_path) == []
+
+        monkeypatch.setattr(server.STORE, "save", save)
+        assert await server.sweep_rooms() == (1, 0)
+        assert "r" not in server.ROOMS and len(os.listdir(tmp_path)) == 1
+
+    asyncio.run(play())
+
+
+def test_seed_stays_on_the_server_unless_debugging(server, monkeypatch):
+    async def play():
+        ws = FakeWebSocket()
+        await server.handle_message(ws, json.dumps({"action": "create", "room": "s1", "seed": 42}))
+        await server.handle_message(ws, json.dumps({"action": "create", "room": "s2"}))
+        monkeypatch.setattr(server, "ALLOW_CLIENT_SEED", True)
+        await server.handle_message(ws, json.dumps({"action": "create", "room": "s3", "seed": 42}))
+        await server.drain(ws)
+        return ws.frames
+
+    refused, created, seeded = asyncio.run(play())
+    assert refused == {"error": "seed not allowed"} and "s1" not in server.ROOMS
+    assert created["status"] == "created" and "seed" not in created["state"]
+    assert "seed" not in seeded["state"] and server.ROOMS["s3"].game.seed == 42
@@ -0,0 +1,119 @@
+import sys
+import os
+import asyncio
+import importlib.util
+from collections import Counter
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+from aiohttp import ClientSession, web
+
+from server.shard import HashRing, Worker, create_router_app
+
+
+def test_ring_spreads_rooms_and_moves_few_when_growing():
+    rooms = [f"room-{i}" for i in range(4000)]
+    ring4, ring5 = HashRing(4), HashRing(5)
+    owners = [ring4.shard_for(r) for r in rooms]
+    assert owners == [HashRing(4).shard_for(r) for r in rooms]
+    counts = Counter(owners)
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > len(rooms) / 4 * 0.6
+    moved = [r for r, old in zip(rooms, owners) if ring5.shard_for(r) != old]
+    # only rooms taken over by the new shard move
+    assert all(ring5.shard_for(r) == 4 for r in moved)
+    assert len(moved) < len(rooms) * 0.35
+
+
+def _load_worker_module(index):
+    # every worker keeps its rooms in module globals: load server/app.py once per
+    # worker so the two "processes" share nothing, like real shards
+    path = os.path.join(os.path.dirname(__file__), '..', 'server', 'app.py')
+    spec = importlib.util.spec_from_file_location(f"shard_worker_{index}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class InProcessWorker(Worker):
+    """A worker served by an AppRunner of this process instead of a subprocess."""
+
+    def start(self):
+        pass
+
+    def exited(self):
+        return False
+
+    def stop(self, timeout=5.0):
+        pass
+
+
+async def _serve(app):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner, runner.addresses[0][1]
+
+
+def test_router_relays_to_owning_worker_and_pages_list_across_shards():
+    async def scenario():
+        modules = [_load_worker_module(i) for i in range(2)]
+        runners, workers = [], []
+        for index, module in enumerate(modules):
+            runner, port = await _serve(module.create_app())
+            runners.append(runner)
+            workers.append(InProcessWorker(index, port, {}))
+        runner, port = await _serve(create_router_app(workers))
+        runners.insert(0, runner)
+        try:
+            ring = HashRing(2)
+            rooms = [f"room-{i}" for i in range(7)]
+            assert {ring.shard_for(r) for r in rooms} == {0, 1}
+            async with ClientSession() as session:
+                ws = await session.ws_connect(f'http://127.0.0.1:{port}/ws')
+                for room in rooms:
+                    await ws.send_json({"action": "create", "room": room})
+                    assert (await ws.receive_json(timeout=5))["status"] == "created"
+                    await asyncio.sleep(0.002)
+                # each room lives only on the worker the ring picks
+                for room in rooms:
+                    owner = ring.shard_for(room)
+                    assert room in modules[owner].ROOMS and room not in modules[1 - owner].ROOMS
+
+                # create/join/state on one room all reach its owner
+                room = rooms[0]
+                owner = modules[ring.shard_for(room)]
+                await ws.send_json({"action": "join", "room": room, "player_id": "p1"})
+                joined = await ws.receive_json(timeout=5)
+                assert joined["event"] == "player_joined" and joined["room"] == room
+                await ws.send_json({"action": "state", "room": room})
+                state = await ws.receive_json(timeout=5)
+                assert [p["id"] for p in state["state"]["players"]] == ["p1"]
+                assert [p.id for p in owner.ROOMS[room].game.players] == ["p1"]
+
+                # a 3-room page merges both shards; following `next` lists every room once
+                listed, cursor, pages = [], None, 0
+                while True:
+                    query = {"action": "list", "limit": 3}
+                    if cursor is not None:
+                        query["cursor"] = cursor
+                    await ws.send_json(query)
+                    page = await ws.receive_json(timeout=5)
+                    assert len(page["rooms"]) <= 3
+                    listed.extend(r["room"] for r in page["rooms"])
+                    pages += 1
+                    cursor = page["next"]
+                    if cursor is None:
+                        break
+                assert listed == rooms and pages >= 3
+                await ws.close()
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+
+    asyncio.run(scenario())
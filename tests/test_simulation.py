@@ -0,0 +1,31 @@
+import sys
+import os
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from game.catalog import default_catalog
+from game.simulation import run_simulation, simulate_games
+
+
+def test_simulation_counts_every_round():
+    stats = simulate_games(default_catalog(), games=20, rounds=5, players=4, seed=3)
+    assert stats.games == 20 and stats.rounds == 100 and stats.abandoned == 0
+    assert sum(stats.played) == 100 * 4
+    assert sum(stats.wins) == 100
+    assert sum(stats.prompts) == 100
+    assert sum(w for _, w in stats.pairs.values()) == 100
+
+
+def test_sharded_pool_matches_serial_run(tmp_path):
+    out = str(tmp_path / "results.csv")
+    serial = run_simulation(30, rounds=4, seed=11, policy="longest", workers=1, shard_size=30)
+    pooled = run_simulation(30, rounds=4, seed=11, policy="longest", workers=2, shard_size=7, out_path=out)
+    assert list(pooled.wins) == list(serial.wins)
+    assert pooled.pairs == serial.pairs
+    with open(out, encoding="utf-8") as f:
+        header = f.readline().strip().split(",")
+        rows = f.readlines()
+    assert header[:5] == ["id", "type", "text", "played", "wins"]
+    assert len(rows) == len(default_catalog())
+    assert os.path.exists(out + ".pairs.csv")
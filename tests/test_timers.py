@@ -0,0 +1,146 @@
+import sys
+import os
+import asyncio
+import json
+import random
+
+import pytest
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.timers import TimerWheel
+from conftest import FakeWebSocket
+
+
+def test_wheel_fires_each_timer_on_its_tick_across_levels():
+    # 4 slots x 3 levels covers 64 ticks; later deadlines are parked and refiled
+    wheel = TimerWheel(tick=0.5, slots=4, levels=3, start=0.0)
+    rng = random.Random(7)
+    fired, expected, timers = [], {}, []
+    clock = 0.0
+    for step in range(300):
+        for n in range(rng.randrange(3)):
+            delay = rng.randrange(200) * 0.5
+            name = (step, n)
+            timers.append((name, wheel.schedule(delay, lambda name: fired.append((wheel.now, name)), name)))
+            expected[name] = wheel.now + max(1, int(delay / 0.5))
+        if timers and rng.random() < 0.2:
+            name, timer = timers.pop(rng.randrange(len(timers)))
+            if timer.active:
+                timer.cancel()
+                del expected[name]
+        clock += rng.choice((0, 0.5, 0.5, 1.0, 2.5))
+        wheel.advance(clock)
+    wheel.advance(clock + 1000)
+    assert dict((name, tick) for tick, name in fired) == expected
+    assert len(wheel) == 0
+
+
+def test_failing_callback_does_not_stop_the_tick():
+    wheel = TimerWheel(tick=1.0, start=0.0)
+    fired = []
+    wheel.schedule(1, lambda: 1 / 0)
+    wheel.schedule(1, fired.append, "ok")
+    assert wheel.advance(1.0) == 2 and fired == ["ok"]
+
+
+def test_deadlines_play_for_afk_players_and_remove_them(monkeypatch):
+    pytest.importorskip("aiohttp")
+    from server import app as srv
+
+    wheel = TimerWheel(tick=1.0, start=0.0)
+    journal = []
+    monkeypatch.setattr(srv, "TIMERS", wheel)
+    monkeypatch.setattr(srv, "ROUND_AFK_LIMIT", 2)
+    monkeypatch.setattr(srv, "_journal", journal.append)
+
+    async def expire(at):
+        wheel.advance(at)
+        # the timeout is queued on the room's actor
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    async def play():
+        socks = {pid: FakeWebSocket() for pid in ("p1", "p2", "p3")}
+        await srv.handle_message(socks["p1"], json.dumps({"action": "create", "room": "afk"}))
+        for pid, ws in socks.items():
+            await srv.handle_message(ws, json.dumps({"action": "join", "room": "afk", "player_id": pid}))
+        for pid, ws in socks.items():
+            await srv.handle_message(ws, json.dumps({"action": "ready", "room": "afk", "player_id": pid}))
+        room = srv.ROOMS["afk"]
+        assert room.deadline is not None and len(wheel) == 1
+        for pid in ("p1", "p2"):
+            await srv.handle_message(socks[pid], json.dumps({"action": "submit", "room": "afk", "player_id": pid}))
+        # not yet due
+        await expire(srv.ROUND_SUBMIT_SECONDS - 1)
+        assert not room.game.voting_open
+        await expire(srv.ROUND_SUBMIT_SECONDS)
+        assert room.game.voting_open and "p3" in room.game.submissions
+        submit_timeout = [f for f in socks["p1"].frames if f.get("event") == "timeout"]
+        await srv.handle_message(socks["p1"], json.dumps({"action": "vote", "room": "afk", "voter_id": "p1", "voted_player_id": "p3"}))
+        await expire(srv.ROUND_SUBMIT_SECONDS + srv.ROUND_VOTE_SECONDS)
+        for ws in socks.values():
+            await srv.drain(ws)
+        return room, socks, submit_timeout
+
+    room, socks, submit_timeout = asyncio.run(play())
+    assert submit_timeout[0]["phase"] == "submit" and submit_timeout[0]["missing"] == ["p3"]
+    assert submit_timeout[0]["state"]["deadline"] is not None
+    vote_timeout = socks["p3"].frames[-1]
+    assert vote_timeout["event"] == "timeout" and vote_timeout["phase"] == "vote"
+    assert vote_timeout["missing"] == ["p2", "p3"] and vote_timeout["removed"] == ["p3"]
+    assert vote_timeout["winner"] == "p3"
+    # p3 missed twice in a row and is gone; the others play on with a fresh deadline
+    assert [p.id for p in room.game.players] == ["p1", "p2"]
+    assert socks["p3"] not in room.conns and room.missed == {"p2": 1}
+    assert room.game.current_round == 1 and room.deadline is not None and len(wheel) == 1
+
+    # the journal replays the timeouts to the same game
+    state = room.game.dump()
+    room.stop()
+    srv.ROOMS.clear()
+    for record in journal:
+        srv._apply_record(record)
+    assert srv.ROOMS["afk"].game.dump() == state
+
+
+def test_submit_deadline_without_submissions_moves_to_the_next_round(monkeypatch):
+    pytest.importorskip("aiohttp")
+    from array import array
+    from server import app as srv
+
+    wheel = TimerWheel(tick=1.0, start=0.0)
+    journal = []
+    monkeypatch.setattr(srv, "TIMERS", wheel)
+    monkeypatch.setattr(srv, "_journal", journal.append)
+
+    async def play():
+        socks = {pid: FakeWebSocket() for pid in ("p1", "p2", "p3")}
+        await srv.handle_message(socks["p1"], json.dumps({"action": "create", "room": "dry"}))
+        for pid, ws in socks.items():
+            await srv.handle_message(ws, json.dumps({"action": "join", "room": "dry", "player_id": pid}))
+        for pid, ws in socks.items():
+            await srv.handle_message(ws, json.dumps({"action": "ready", "room": "dry", "player_id": pid}))
+        room = srv.ROOMS["dry"]
+        # nobody has a card left to play when the deadline passes
+        for player in room.game.players:
+            room.game.discard.extend(player.hand)
+            player.hand = array("I")
+        wheel.advance(srv.ROUND_SUBMIT_SECONDS)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        for ws in socks.values():
+            await srv.drain(ws)
+        return room, socks
+
+    room, socks = asyncio.run(play())
+    timeout = socks["p1"].frames[-1]
+    assert timeout["event"] == "timeout" and timeout["phase"] == "submit"
+    assert "winner" not in timeout and timeout["state"]["deadline"] is not None
+    # the round ended without a vote and the next one has its own deadline
+    game = room.game
+    assert game.current_round == 1 and not game.voting_open
+    assert all(p.score == 0 for p in game.players)
+    assert room.deadline is not None and room.phase == (1, None) and len(wheel) == 1
+    assert journal[-1] == {"op": "expire", "room": "dry", "phase": "submit"}
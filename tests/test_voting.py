@@ -0,0 +1,47 @@
+import sys
+import os
+import random
+
+# garantir que a raiz do projeto está no sys.path quando executado como script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from game.voting import VotingSession
+
+
+def _recount(session):
+    counts = {pid: 0 for pid in session.submissions}
+    for voted in session.votes.values():
+        counts[voted] += 1
+    best = max(counts.values())
+    return counts, [pid for pid, c in counts.items() if c == best]
+
+
+def test_incremental_tally_matches_full_recount_with_revotes():
+    rng = random.Random(5)
+    candidates = ["a", "b", "c", "d"]
+    audience = [f"v{i}" for i in range(300)]
+    session = VotingSession({pid: i for i, pid in enumerate(candidates)}, voters=candidates + audience)
+    for _ in range(2000):
+        voter = rng.choice(candidates + audience)
+        choice = rng.choice([c for c in candidates if c != voter])
+        session.cast_vote(voter, choice)
+        counts, leaders = _recount(session)
+        assert session.tally() == counts
+        assert session.leading_candidates() == leaders
+    assert session.is_complete() == (len(session.votes) == len(session.voters))
+
+
+def test_revote_and_removed_voter_update_leaders():
+    session = VotingSession({"a": 1, "b": 2}, voters=["a", "b", "x"])
+    assert session.leading_candidates() == ["a", "b"]
+    session.cast_vote("x", "a")
+    assert session.leading_candidates() == ["a"]
+    # trocar o voto move a liderança
+    session.cast_vote("x", "b")
+    assert session.leading_candidates() == ["b"]
+    assert session.votes_for("a") == 0
+    session.remove_voter("x")
+    assert session.leading_candidates() == ["a", "b"]
+    session.cast_vote("a", "b")
+    session.cast_vote("b", "a")
+    assert session.is_complete()
@@ -27,6 +27,7 @@ document.addEventListener('DOMContentLoaded', () => {
   const canvasEl = document.getElementById('g_canvas');
   const readyBtn = document.getElementById('g_btn_ready');
   const exitBtn = document.getElementById('g_btn_exit');
+  const deadlineEl = document.getElementById('g_deadline');
 
   // generate or reuse a short player id
   if (!localStorage.getItem('playerId')) {
@@ -36,7 +37,8 @@ document.addEventListener('DOMContentLoaded', () => {
   const playerName = localStorage.getItem('playerName') || 'Player';
 
   // create client and connect
-  const client = new WSClient(SERVER_URL);
+  // delta mode: the server sends state patches; WSClient rebuilds the full state
+  const client = new WSClient(SERVER_URL, { delta: true, binary: true });
   // guarda localmente em qual submissão eu votei (player id da submissão)
   let myVotedFor = null;
   // keep ready state for this client
@@ -46,7 +48,8 @@ document.addEventListener('DOMContentLoaded', () => {
   });
   client.addEventListener('message', (ev) => {
     const msg = ev.detail;
-    if (msg.state) renderState(msg.state);
+    // skip re-rendering when a patch changed nothing
+    if (msg.state && !(msg.changed && msg.changed.length === 0)) renderState(msg.state);
     // handle ready notifications
     if (msg.event === 'player_ready') {
       // we already update via state, but could flash a message
@@ -55,9 +58,14 @@ document.addEventListener('DOMContentLoaded', () => {
     // when a vote is cast, ensure we refresh state (some servers may omit full state)
     if (msg.event === 'vote_cast') {
       if (msg.state) renderState(msg.state);
-      else try { client.send({ action: 'state', room: msg.room }); } catch (e) { console.debug('state request failed', e); }
+      else if (!client.delta) try { client.send({ action: 'state', room: msg.room }); } catch (e) { console.debug('state request failed', e); }
     }
     // if the server reports a winner, explicitly request state to ensure UI updates
+    // a round deadline passed; players that keep missing them are removed
+    if (msg.event === 'timeout' && (msg.removed || []).includes(playerId)) {
+      deadlineAt = null;
+      if (deadlineEl) deadlineEl.textContent = 'Removido por inatividade';
+    }
     if (msg.winner) {
       console.debug('vote winner reported', msg.winner);
       try { client.send({ action: 'state', room: msg.room }); } catch (e) { console.debug('state request failed', e); }
@@ -125,7 +133,16 @@ document.addEventListener('DOMContentLoaded', () => {
     return 'room1';
   }
 
+  // round deadline (epoch seconds from state.deadline, null when none)
+  let deadlineAt = null;
+  setInterval(() => {
+    if (!deadlineEl || deadlineAt === null) return;
+    deadlineEl.textContent = `${Math.max(0, Math.ceil(deadlineAt - Date.now() / 1000))}s`;
+  }, 500);
+
   function renderState(state) {
+    deadlineAt = state.deadline || null;
+    if (deadlineEl && deadlineAt === null) deadlineEl.textContent = '';
     if (roomEl) roomEl.textContent = state.room || getRoomFromQuery();
     // deck counts
     const wcountEl = document.getElementById('g_deck_white_count');
@@ -211,10 +211,10 @@ window.addEventListener('load', () => {
   }
 
   if (btnJoinEl) btnJoinEl.addEventListener('click', () => openJoinModal());
-  if (joinCancelBtn) joinCancelBtn.addEventListener('click', () => joinModal.classList.add('hidden'));
-  joinBackdrop.addEventListener('click', () => joinModal.classList.add('hidden'));
+  if (joinCancelBtn) joinCancelBtn.addEventListener('click', () => closeJoinModal());
+  joinBackdrop.addEventListener('click', () => closeJoinModal());
   const modalCloseJoin = document.getElementById('modal_close_join');
-  if (modalCloseJoin) modalCloseJoin.addEventListener('click', () => joinModal.classList.add('hidden'));
+  if (modalCloseJoin) modalCloseJoin.addEventListener('click', () => closeJoinModal());
 
   // request room list helper (used on open and refresh)
   function requestRoomList() {
@@ -228,8 +228,8 @@ window.addEventListener('load', () => {
       temp.connect();
       new Promise((resolve, reject) => {
         const to = setTimeout(() => { try { temp.close(); } catch(e){}; reject(new Error('timeout')); }, 4000);
-        temp.addEventListener('status', (ev) => { if (ev.detail === 'connected') temp.send({ action: 'list' }); });
-        temp.addEventListener('message', (ev) => { const msg = ev.detail; if (msg && Array.isArray(msg.rooms)) { clearTimeout(to); try { temp.close(); } catch(e){}; resolve(msg); } });
+        temp.addEventListener('status', (ev) => { if (ev.detail === 'connected') temp.send({ action: 'list', filter: 'joinable' }); });
+        temp.addEventListener('message', (ev) => { const msg = ev.detail; if (msg && Array.isArray(msg.rooms) && !msg.event) { clearTimeout(to); try { temp.close(); } catch(e){}; resolve(msg); } });
       }).then(msg => {
         console.debug('Received rooms list', msg.rooms);
         const raw = msg.rooms || [];
@@ -259,28 +259,48 @@ window.addEventListener('load', () => {
       console.debug('requestRoomList: ws readyState=', client.ws && client.ws.readyState, 'queueLen=', client._queue && client._queue.length);
     } catch (e) {}
     console.debug('requestRoomList: sending list request');
-    client.send({ action: 'list' });
-    waitForServerMessage(msg => Array.isArray(msg.rooms), 3000).then(msg => {
+    // subscribe while the modal is open: the server then pushes `lobby` deltas
+    client.send({ action: 'list', filter: 'joinable', subscribe: true });
+    waitForServerMessage(msg => Array.isArray(msg.rooms) && !msg.event, 3000).then(msg => {
       console.debug('Received rooms list', msg.rooms);
-      const raw = msg.rooms || [];
-      const rooms = raw.map(r => { if (typeof r === 'string') return { room: r, players: 0 }; return { room: r.room, players: r.players || 0 }; });
-      if (rooms.length === 0) { joinList.innerHTML = '<div style="color:var(--muted)">No active rooms</div>'; return; }
-      joinList.innerHTML = '';
-      rooms.forEach(r => {
-        const row = document.createElement('div'); row.style.display = 'flex'; row.style.gap = '8px'; row.style.margin = '6px 0';
-        const name = document.createElement('div'); name.style.flex = '1'; name.textContent = `${r.room} (${r.players})`;
-        const btn = document.createElement('button'); btn.textContent = 'Join';
-        btn.addEventListener('click', async () => {
-          const pid = window.playerId; const nameVal = nameInput.value || pid;
-          try { try { localStorage.setItem('playerId', pid); localStorage.setItem('playerName', nameVal); } catch(e){}
-            window.location.href = `game.html?room=${encodeURIComponent(r.room)}`;
-          } catch (err) { console.error('Join clicked error', err); status.textContent = 'Join failed'; }
-        });
-        row.appendChild(name); row.appendChild(btn); joinList.appendChild(row);
-      });
+      lobbyRooms.clear();
+      (msg.rooms || []).forEach(r => lobbyRooms.set(r.room, r));
+      renderLobby();
     }).catch(() => { joinList.innerHTML = '<div style="color:var(--muted)">Failed to fetch rooms</div>'; console.debug('requestRoomList: failed to receive rooms (timeout or error)'); });
   }
 
+  // joinable rooms on the default server, kept current by `lobby` events
+  const lobbyRooms = new Map();
+  client.addEventListener('message', (e) => {
+    const msg = e.detail;
+    if (!msg || msg.event !== 'lobby') return;
+    (msg.removed || []).forEach(id => lobbyRooms.delete(id));
+    (msg.rooms || []).forEach(r => lobbyRooms.set(r.room, r));
+    if (!joinModal.classList.contains('hidden')) renderLobby();
+  });
+  function closeJoinModal() {
+    joinModal.classList.add('hidden');
+    client.send({ action: 'lobby', subscribe: false });
+  }
+
+  function renderLobby() {
+    const rooms = Array.from(lobbyRooms.values()).sort((a, b) => a.created - b.created);
+    if (rooms.length === 0) { joinList.innerHTML = '<div style="color:var(--muted)">No active rooms</div>'; return; }
+    joinList.innerHTML = '';
+    rooms.forEach(r => {
+      const row = document.createElement('div'); row.style.display = 'flex'; row.style.gap = '8px'; row.style.margin = '6px 0';
+      const name = document.createElement('div'); name.style.flex = '1'; name.textContent = `${r.room} (${r.players})`;
+      const btn = document.createElement('button'); btn.textContent = 'Join';
+      btn.addEventListener('click', async () => {
+        const pid = window.playerId; const nameVal = nameInput.value || pid;
+        try { try { localStorage.setItem('playerId', pid); localStorage.setItem('playerName', nameVal); } catch(e){}
+          window.location.href = `game.html?room=${encodeURIComponent(r.room)}`;
+        } catch (err) { console.error('Join clicked error', err); status.textContent = 'Join failed'; }
+      });
+      row.appendChild(name); row.appendChild(btn); joinList.appendChild(row);
+    });
+  }
+
   // wire refresh button
   const joinRefreshBtn = document.getElementById('join_refresh_btn');
   if (joinRefreshBtn) joinRefreshBtn.addEventListener('click', requestRoomList);
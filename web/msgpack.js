@@ -0,0 +1,121 @@
+// Minimal MessagePack encoder/decoder for the `cah.v1.msgpack` subprotocol.
+// Covers what the protocol uses: nil, booleans, numbers, strings, binary,
+// arrays and string-keyed maps.
+(function () {
+  const textEncoder = new TextEncoder();
+  const textDecoder = new TextDecoder();
+
+  class Writer {
+    constructor() { this.buf = new Uint8Array(256); this.view = new DataView(this.buf.buffer); this.pos = 0; }
+    reserve(n) {
+      if (this.pos + n <= this.buf.length) return;
+      let size = this.buf.length * 2;
+      while (size < this.pos + n) size *= 2;
+      const next = new Uint8Array(size);
+      next.set(this.buf);
+      this.buf = next;
+      this.view = new DataView(next.buffer);
+    }
+    u8(v) { this.reserve(1); this.buf[this.pos++] = v; }
+    u16(v) { this.reserve(2); this.view.setUint16(this.pos, v); this.pos += 2; }
+    u32(v) { this.reserve(4); this.view.setUint32(this.pos, v); this.pos += 4; }
+    bytes(b) { this.reserve(b.length); this.buf.set(b, this.pos); this.pos += b.length; }
+  }
+
+  function header(w, len, fix, fixMax, c8, c16, c32) {
+    if (fix !== null && len <= fixMax) w.u8(fix | len);
+    else if (c8 !== null && len < 0x100) { w.u8(c8); w.u8(len); }
+    else if (len < 0x10000) { w.u8(c16); w.u16(len); }
+    else { w.u8(c32); w.u32(len); }
+  }
+
+  function write(w, v) {
+    if (v === null || v === undefined) { w.u8(0xc0); return; }
+    if (v === false) { w.u8(0xc2); return; }
+    if (v === true) { w.u8(0xc3); return; }
+    if (typeof v === 'number') {
+      if (Number.isInteger(v) && v >= -0x80000000 && v <= 0xffffffff) {
+        if (v >= 0 && v < 0x80) w.u8(v);
+        else if (v < 0 && v >= -32) w.u8(v & 0xff);
+        else if (v >= 0) { w.u8(0xce); w.u32(v); }
+        else { w.u8(0xd2); w.reserve(4); w.view.setInt32(w.pos, v); w.pos += 4; }
+      } else {
+        w.u8(0xcb); w.reserve(8); w.view.setFloat64(w.pos, v); w.pos += 8;
+      }
+      return;
+    }
+    if (typeof v === 'string') {
+      const b = textEncoder.encode(v);
+      header(w, b.length, 0xa0, 31, 0xd9, 0xda, 0xdb);
+      w.bytes(b);
+      return;
+    }
+    if (v instanceof Uint8Array) {
+      header(w, v.length, null, 0, 0xc4, 0xc5, 0xc6);
+      w.bytes(v);
+      return;
+    }
+    if (Array.isArray(v)) {
+      header(w, v.length, 0x90, 15, null, 0xdc, 0xdd);
+      for (const item of v) write(w, item);
+      return;
+    }
+    const keys = Object.keys(v).filter((k) => v[k] !== undefined);
+    header(w, keys.length, 0x80, 15, null, 0xde, 0xdf);
+    for (const k of keys) { write(w, k); write(w, v[k]); }
+  }
+
+  function encode(value) {
+    const w = new Writer();
+    write(w, value);
+    return w.buf.slice(0, w.pos);
+  }
+
+  function decode(data) {
+    const buf = data instanceof Uint8Array ? data : new Uint8Array(data);
+    const view = new DataView(buf.buffer, buf.byteOffset, buf.byteLength);
+    let pos = 0;
+    const str = (n) => { const s = textDecoder.decode(buf.subarray(pos, pos + n)); pos += n; return s; };
+    const bin = (n) => { const b = buf.slice(pos, pos + n); pos += n; return b; };
+    const arr = (n) => { const a = new Array(n); for (let i = 0; i < n; i++) a[i] = read(); return a; };
+    const map = (n) => { const m = {}; for (let i = 0; i < n; i++) { const k = read(); m[k] = read(); } return m; };
+    function read() {
+      const t = buf[pos++];
+      if (t < 0x80) return t;
+      if (t < 0x90) return map(t & 0x0f);
+      if (t < 0xa0) return arr(t & 0x0f);
+      if (t < 0xc0) return str(t & 0x1f);
+      if (t >= 0xe0) return t - 0x100;
+      let v;
+      switch (t) {
+        case 0xc0: return null;
+        case 0xc2: return false;
+        case 0xc3: return true;
+        case 0xc4: v = buf[pos]; pos += 1; return bin(v);
+        case 0xc5: v = view.getUint16(pos); pos += 2; return bin(v);
+        case 0xc6: v = view.getUint32(pos); pos += 4; return bin(v);
+        case 0xca: v = view.getFloat32(pos); pos += 4; return v;
+        case 0xcb: v = view.getFloat64(pos); pos += 8; return v;
+        case 0xcc: return buf[pos++];
+        case 0xcd: v = view.getUint16(pos); pos += 2; return v;
+        case 0xce: v = view.getUint32(pos); pos += 4; return v;
+        case 0xcf: v = Number(view.getBigUint64(pos)); pos += 8; return v;
+        case 0xd0: v = view.getInt8(pos); pos += 1; return v;
+        case 0xd1: v = view.getInt16(pos); pos += 2; return v;
+        case 0xd2: v = view.getInt32(pos); pos += 4; return v;
+        case 0xd3: v = Number(view.getBigInt64(pos)); pos += 8; return v;
+        case 0xd9: v = buf[pos]; pos += 1; return str(v);
+        case 0xda: v = view.getUint16(pos); pos += 2; return str(v);
+        case 0xdb: v = view.getUint32(pos); pos += 4; return str(v);
+        case 0xdc: v = view.getUint16(pos); pos += 2; return arr(v);
+        case 0xdd: v = view.getUint32(pos); pos += 4; return arr(v);
+        case 0xde: v = view.getUint16(pos); pos += 2; return map(v);
+        case 0xdf: v = view.getUint32(pos); pos += 4; return map(v);
+        default: throw new Error('msgpack: unsupported type 0x' + t.toString(16));
+      }
+    }
+    return read();
+  }
+
+  window.MsgPack = { encode, decode };
+})();
@@ -1,8 +1,14 @@
 // Minimal WebSocket wrapper for the Phaser client
 class WSClient extends EventTarget {
-  constructor(url) {
+  // opts.delta: ask the server for state patches instead of full states
+  // opts.binary: prefer the MessagePack subprotocol (needs msgpack.js)
+  constructor(url, opts = {}) {
     super();
     this.url = url;
+    this.delta = !!opts.delta;
+    this.binary = !!opts.binary && !!window.MsgPack;
+    this._state = null; // last full state (delta mode)
+    this._seq = null; // seq of _state
     this.ws = null;
     this._queue = [];
     this._shouldReconnect = true;
@@ -18,7 +24,13 @@ class WSClient extends EventTarget {
     if (this.ws) this.ws.close();
     console.debug('WSClient: connecting to', this.url);
     this.dispatchEvent(new CustomEvent('status', { detail: 'connecting' }));
-    this.ws = new WebSocket(this.url);
+    if (this.binary) {
+      // the server picks the first subprotocol it supports, JSON otherwise
+      this.ws = new WebSocket(this.url, ['cah.v1.msgpack', 'cah.v1.json']);
+      this.ws.binaryType = 'arraybuffer';
+    } else {
+      this.ws = new WebSocket(this.url);
+    }
 
     this.ws.addEventListener('open', () => {
       console.debug('WSClient: connected to', this.url);
@@ -26,15 +38,20 @@ class WSClient extends EventTarget {
       this._reconnectDelay = 1000;
       if (this._reconnectTimer) { clearTimeout(this._reconnectTimer); this._reconnectTimer = null; }
       this.dispatchEvent(new CustomEvent('status', { detail: 'connected' }));
+      // negotiate the delta protocol before anything else is sent
+      if (this.delta) this._write({ action: 'hello', delta: true });
       // flush queued messages
       while (this._queue.length > 0) {
         const m = this._queue.shift();
-        try { this.ws.send(JSON.stringify(m)); console.debug('WSClient: flushed queued message', m); } catch (e) { console.error('Failed to send queued message', e); }
+        try { this._write(m); console.debug('WSClient: flushed queued message', m); } catch (e) { console.error('Failed to send queued message', e); }
       }
     });
 
     this.ws.addEventListener('close', (ev) => {
       console.debug('WSClient: closed', ev);
+      // a new connection starts from a full state again
+      this._state = null;
+      this._seq = null;
       this.dispatchEvent(new CustomEvent('status', { detail: 'closed' }));
       if (this._shouldReconnect) this._scheduleReconnect();
     });
@@ -47,15 +64,43 @@ class WSClient extends EventTarget {
 
     this.ws.addEventListener('message', (ev) => {
       try {
-        const msg = JSON.parse(ev.data);
+        const msg = typeof ev.data === 'string' ? JSON.parse(ev.data) : window.MsgPack.decode(ev.data);
         console.debug('WSClient: received', msg);
+        if (this.delta) this._applyDelta(msg);
         this.dispatchEvent(new CustomEvent('message', { detail: msg }));
       } catch (e) {
-        console.error('Invalid JSON from server', e);
+        console.error('Invalid message from server', e);
       }
     });
   }
 
+  // Turn delta messages back into full states: after this, msg.state is the
+  // complete state and msg.changed lists the keys that changed.
+  _applyDelta(msg) {
+    if (typeof msg.seq !== 'number') return;
+    if (msg.state) {
+      this._state = msg.state;
+      this._seq = msg.seq;
+      msg.changed = Object.keys(msg.state);
+      return;
+    }
+    if (!msg.patch) return;
+    if (this._state === null || msg.base !== this._seq) {
+      // gap: we missed a patch; ask for a full state and let this one go
+      console.debug('WSClient: delta gap (have', this._seq, 'got base', msg.base, ')');
+      if (msg.room) this.send({ action: 'state', room: msg.room });
+      return;
+    }
+    // patch values (null included) replace fields; `removed` lists dropped fields
+    const next = Object.assign({}, this._state, msg.patch);
+    const removed = msg.removed || [];
+    for (const k of removed) delete next[k];
+    this._state = next;
+    this._seq = msg.seq;
+    msg.state = next;
+    msg.changed = Object.keys(msg.patch).concat(removed);
+  }
+
   _scheduleReconnect() {
     if (!this._shouldReconnect) return;
     this._reconnectAttempts += 1;
@@ -81,7 +126,12 @@ class WSClient extends EventTarget {
       return;
     }
     console.debug('WSClient: sending', obj);
-    this.ws.send(JSON.stringify(obj));
+    this._write(obj);
+  }
+
+  _write(obj) {
+    if (this.ws.protocol === 'cah.v1.msgpack') this.ws.send(window.MsgPack.encode(obj));
+    else this.ws.send(JSON.stringify(obj));
   }
 }
 